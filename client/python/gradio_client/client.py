@@ -10,6 +10,7 @@ import os
 import re
 import secrets
 import shutil
+import ssl
 import tempfile
 import threading
 import time
@@ -34,6 +35,9 @@ from huggingface_hub.utils import (
     send_telemetry,
 )
 from packaging import version
+from websockets.exceptions import ConnectionClosed, InvalidHandshake
+from websockets.sync.client import ClientConnection
+from websockets.sync.client import connect as websockets_connect
 
 from gradio_client import utils
 from gradio_client.compatibility import EndpointV3Compatibility
@@ -50,6 +54,11 @@ from gradio_client.utils import (
     StatusUpdate,
 )
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
 DEFAULT_TEMP_DIR = os.environ.get("GRADIO_TEMP_DIR") or str(
     Path(tempfile.gettempdir()) / "gradio"
 )
@@ -85,6 +94,8 @@ class Client:
         headers: dict[str, str] | None = None,
         download_files: str | Path | Literal[False] = DEFAULT_TEMP_DIR,
         ssl_verify: bool = True,
+        wire_format: Literal["json", "msgpack"] = "json",
+        transport: Literal["sse", "websocket"] = "sse",
         _skip_components: bool = True,  # internal parameter to skip values certain components (e.g. State) that do not need to be displayed to users.
     ):
         """
@@ -97,7 +108,14 @@ class Client:
             download_files: directory where the client should download output files  on the local machine from the remote API. By default, uses the value of the GRADIO_TEMP_DIR environment variable which, if not set by the user, is a temporary directory on your machine. If False, the client does not download files and returns a FileData dataclass object with the filepath on the remote machine instead.
             ssl_verify: if False, skips certificate validation which allows the client to connect to Gradio apps that are using self-signed certificates.
             httpx_kwargs: additional keyword arguments to pass to `httpx.Client`, `httpx.stream`, `httpx.get` and `httpx.post`. This can be used to set timeouts, proxies, http auth, etc.
+            wire_format: the format in which the client asks to receive results. If "msgpack" (requires the `msgpack` package), results are received as MessagePack, with small output files sent inline instead of being downloaded separately, which is faster for apps that return a lot of media. Falls back to "json" if the app does not support it.
+            transport: how the client exchanges messages with the app. If "sse", jobs are submitted with HTTP requests and their results are received as Server-Sent Events. If "websocket", a single websocket connection carries the submissions, results and heartbeat of the session, which saves a round trip per job. Falls back to "sse" if the app does not support it.
         """
+        if wire_format == "msgpack" and msgpack is None:
+            raise ModuleNotFoundError(
+                "'msgpack' must be installed to use wire_format='msgpack'. Please run `pip install msgpack`."
+            )
+        self.wire_format = wire_format
         self.verbose = verbose
         self.hf_token = hf_token
         self.download_files = download_files
@@ -173,6 +191,9 @@ class Client:
         self.ws_url = urllib.parse.urljoin(
             self.src_prefixed.replace("http", "ws", 1), utils.WS_URL
         )
+        self.queue_ws_url = urllib.parse.urljoin(
+            self.src_prefixed.replace("http", "ws", 1), utils.QUEUE_WS_URL
+        )
         self.upload_url = urllib.parse.urljoin(self.src_prefixed, utils.UPLOAD_URL)
         self.reset_url = urllib.parse.urljoin(self.src_prefixed, utils.RESET_URL)
         self.app_version = version.parse(self.config.get("version", "2.0"))
@@ -197,17 +218,89 @@ class Client:
         self._refresh_heartbeat = threading.Event()
         self._kill_heartbeat = threading.Event()
 
-        self.heartbeat = threading.Thread(target=self._stream_heartbeat, daemon=True)
-        self.heartbeat.start()
-
         self.stream_open = False
         self.streaming_future: Future | None = None
         self.pending_messages_per_event: dict[str, list[Message | None]] = {}
         self.pending_event_ids: set[str] = set()
 
+        self.websocket: ClientConnection | None = None
+        self._pending_joins: dict[str, Future] = {}
+        if transport == "websocket" and self.protocol == "sse_v3":
+            self._connect_websocket()
+
+        self.heartbeat = threading.Thread(target=self._stream_heartbeat, daemon=True)
+        # The websocket keeps the session alive, so no heartbeat is needed
+        if self.websocket is None:
+            self.heartbeat.start()
+
     def close(self):
+        if self.websocket is not None:
+            self.websocket.close()
         self._kill_heartbeat.set()
-        self.heartbeat.join(timeout=1)
+        if self.heartbeat.is_alive():
+            self.heartbeat.join(timeout=1)
+
+    def _connect_websocket(self):
+        """Opens the websocket that carries the submissions, results and heartbeat of the session, if the app supports it."""
+        params = {"session_hash": self.session_hash, "wire_format": self.wire_format}
+        headers = dict(self.headers)
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        ssl_context = None
+        if self.queue_ws_url.startswith("wss") and not self.ssl_verify:
+            ssl_context = ssl.create_default_context()
+            ssl_context.check_hostname = False
+            ssl_context.verify_mode = ssl.CERT_NONE
+        try:
+            self.websocket = websockets_connect(
+                f"{self.queue_ws_url}?{urllib.parse.urlencode(params)}",
+                additional_headers=headers,
+                ssl_context=ssl_context,
+                max_size=None,
+            )
+        except (InvalidHandshake, OSError):
+            # The app is too old to have the endpoint, or a proxy does not allow websockets
+            return
+        self._pending_joins = {}
+        threading.Thread(
+            target=self._receive_websocket_messages,
+            args=(self.websocket, self._pending_joins),
+            daemon=True,
+        ).start()
+
+    def _receive_websocket_messages(
+        self, websocket: ClientConnection, pending_joins: dict[str, Future]
+    ):
+        event_ids = set()
+        try:
+            for frame in websocket:
+                resp = (
+                    msgpack.unpackb(frame)
+                    if isinstance(frame, bytes)
+                    else json.loads(frame)
+                )
+                if resp["msg"] in ("joined", "join_failed"):
+                    if resp["msg"] == "joined":
+                        # The messages of the event come after this reply, so it must
+                        # be registered before they are read
+                        event_ids.add(resp["event_id"])
+                        self.pending_event_ids.add(resp["event_id"])
+                        self.pending_messages_per_event[resp["event_id"]] = []
+                    pending_joins.pop(resp["id"]).set_result(resp)
+                elif resp["msg"] == "frame_failed":
+                    warnings.warn(f"The app rejected a message: {resp['detail']}")
+                elif self._handle_message(resp, "sse_v3"):
+                    return
+        except ConnectionClosed:
+            pass
+        finally:
+            for future in list(pending_joins.values()):
+                future.set_exception(
+                    ConnectionError("The connection to the app was closed.")
+                )
+            for event_id in event_ids:
+                if event_id in self.pending_messages_per_event:
+                    self.pending_messages_per_event[event_id].append(None)
 
     def _stream_heartbeat(self):
         while True:
@@ -242,43 +335,38 @@ class Client:
                 verify=self.ssl_verify,
                 **httpx_kwargs,
             ) as client:
+                headers = self.headers
+                if self.wire_format == "msgpack":
+                    headers = {
+                        **headers,
+                        "Accept": f"{utils.MSGPACK_MEDIA_TYPE}, text/event-stream",
+                    }
                 with client.stream(
                     "GET",
                     self.sse_url,
                     params={"session_hash": self.session_hash},
-                    headers=self.headers,
+                    headers=headers,
                     cookies=self.cookies,
                 ) as response:
+                    # The app may not support MessagePack, in which case it sends
+                    # Server-Sent Events as usual
+                    if response.headers.get("content-type", "").startswith(
+                        utils.MSGPACK_MEDIA_TYPE
+                    ):
+                        unpacker = msgpack.Unpacker()
+                        for chunk in response.iter_bytes():
+                            unpacker.feed(chunk)
+                            for resp in unpacker:
+                                if self._handle_message(resp, protocol):
+                                    return
+                        return
                     for line in response.iter_lines():
                         line = line.rstrip("\n")
                         if not len(line):
                             continue
                         if line.startswith("data:"):
                             resp = json.loads(line[5:])
-                            if resp["msg"] == ServerMessage.heartbeat:
-                                continue
-                            elif (
-                                resp.get("message", "") == ServerMessage.server_stopped
-                            ):
-                                for (
-                                    pending_messages
-                                ) in self.pending_messages_per_event.values():
-                                    pending_messages.append(resp)
-                                return
-                            elif resp["msg"] == ServerMessage.close_stream:
-                                self.stream_open = False
-                                return
-                            event_id = resp["event_id"]
-                            if event_id not in self.pending_messages_per_event:
-                                self.pending_messages_per_event[event_id] = []
-                            self.pending_messages_per_event[event_id].append(resp)
-                            if resp["msg"] == ServerMessage.process_completed:
-                                self.pending_event_ids.remove(event_id)
-                            if (
-                                len(self.pending_event_ids) == 0
-                                and protocol != "sse_v3"
-                            ):
-                                self.stream_open = False
+                            if self._handle_message(resp, protocol):
                                 return
                         else:
                             raise ValueError(f"Unexpected SSE line: '{line}'")
@@ -293,7 +381,31 @@ class Client:
             traceback.print_exc()
             raise e
 
+    def _handle_message(self, resp: dict, protocol: str) -> bool:
+        """Passes a message received from the app on to the job it is for. Returns whether the stream is over."""
+        if resp["msg"] == ServerMessage.heartbeat:
+            return False
+        elif resp.get("message", "") == ServerMessage.server_stopped:
+            for pending_messages in self.pending_messages_per_event.values():
+                pending_messages.append(resp)
+            return True
+        elif resp["msg"] == ServerMessage.close_stream:
+            self.stream_open = False
+            return True
+        event_id = resp["event_id"]
+        if event_id not in self.pending_messages_per_event:
+            self.pending_messages_per_event[event_id] = []
+        self.pending_messages_per_event[event_id].append(resp)
+        if resp["msg"] == ServerMessage.process_completed:
+            self.pending_event_ids.remove(event_id)
+        if len(self.pending_event_ids) == 0 and protocol != "sse_v3":
+            self.stream_open = False
+            return True
+        return False
+
     def send_data(self, data, hash_data, protocol):
+        if self.websocket is not None:
+            return self._send_data_over_websocket(data, hash_data)
         req = httpx.post(
             self.sse_data_url,
             json={**data, **hash_data},
@@ -304,9 +416,13 @@ class Client:
         )
         if req.status_code == 503:
             raise QueueError("Queue is full! Please try again.")
+        if req.status_code == 429:
+            raise QueueError(req.json()["detail"])
         req.raise_for_status()
         resp = req.json()
         event_id = resp["event_id"]
+        self.pending_event_ids.add(event_id)
+        self.pending_messages_per_event[event_id] = []
 
         if not self.stream_open:
             self.stream_open = True
@@ -325,6 +441,25 @@ class Client:
 
         return event_id
 
+    def _send_data_over_websocket(self, data, hash_data) -> str:
+        assert self.websocket is not None  # noqa: S101
+        join_id = uuid.uuid4().hex
+        future: Future = Future()
+        self._pending_joins[join_id] = future
+        message = {"type": "join", "id": join_id, "body": {**data, **hash_data}}
+        if self.wire_format == "msgpack":
+            self.websocket.send(msgpack.packb(message))
+        else:
+            self.websocket.send(json.dumps(message))
+        resp = future.result()
+        if resp["msg"] == "join_failed":
+            if resp["status_code"] == 503:
+                raise QueueError("Queue is full! Please try again.")
+            if resp["status_code"] == 429:
+                raise QueueError(resp["detail"])
+            raise ValueError(f"Could not submit the job: {resp['detail']}")
+        return resp["event_id"]
+
     @classmethod
     def duplicate(
         cls,
@@ -701,6 +836,16 @@ class Client:
 
     def reset_session(self) -> None:
         self.session_hash = str(uuid.uuid4())
+        if self.websocket is not None:
+            # The websocket belongs to the previous session, which is closed with it
+            self.websocket.close()
+            self.websocket = None
+            self._connect_websocket()
+            if self.websocket is None:
+                self.heartbeat = threading.Thread(
+                    target=self._stream_heartbeat, daemon=True
+                )
+                self.heartbeat.start()
         self._refresh_heartbeat.set()
 
     def _render_endpoints_info(
@@ -1232,8 +1377,6 @@ class Endpoint:
                 result = self._sse_fn_v0(data, hash_data, helper)  # type: ignore
             elif self.protocol in ("sse_v1", "sse_v2", "sse_v2.1", "sse_v3"):
                 event_id = self.client.send_data(data, hash_data, self.protocol)
-                self.client.pending_event_ids.add(event_id)
-                self.client.pending_messages_per_event[event_id] = []
                 helper.event_id = event_id
                 result = self._sse_fn_v1plus(helper, event_id, self.protocol)
             else:
@@ -1379,6 +1522,16 @@ class Endpoint:
         if self.client.output_dir is not None:
             os.makedirs(self.client.output_dir, exist_ok=True)
 
+        # Files sent inline (see the `wire_format` parameter of Client) are not downloaded
+        if isinstance(x.get("bytes"), bytes):
+            directory = (
+                Path(self.client.output_dir) / hashlib.sha256(x["bytes"]).hexdigest()
+            )
+            directory.mkdir(exist_ok=True, parents=True)
+            dest = directory / Path(url_path).name
+            dest.write_bytes(x["bytes"])
+            return str(dest.resolve())
+
         sha = hashlib.sha256()
         temp_dir = Path(tempfile.gettempdir()) / secrets.token_hex(20)
         temp_dir.mkdir(exist_ok=True, parents=True)
@@ -35,7 +35,9 @@ SSE_URL_V0 = "queue/join"
 SSE_DATA_URL_V0 = "queue/data"
 SSE_URL = "queue/data"
 SSE_DATA_URL = "queue/join"
+MSGPACK_MEDIA_TYPE = "application/vnd.msgpack"
 WS_URL = "queue/join"
+QUEUE_WS_URL = "queue/ws"
 UPLOAD_URL = "upload"
 LOGIN_URL = "login"
 CONFIG_URL = "config"
@@ -200,6 +200,24 @@ class TestClientPredictions:
             output = client.predict(api_name="/increment_with_queue")
             assert output == 2
 
+    def test_websocket_transport(self, increment_demo, count_generator_demo):
+        with connect(
+            increment_demo, client_kwargs={"transport": "websocket"}
+        ) as client:
+            assert client.websocket is not None
+            assert not client.heartbeat.is_alive()
+            assert client.predict(api_name="/increment_with_queue") == 1
+            assert client.predict(api_name="/increment_with_queue") == 2
+            client.reset_session()
+            assert client.predict(api_name="/increment_with_queue") == 1
+
+        with connect(
+            count_generator_demo, client_kwargs={"transport": "websocket"}
+        ) as client:
+            jobs = [client.submit(3, fn_index=0) for _ in range(5)]
+            for job in jobs:
+                assert list(job) == [str(i) for i in range(3)]
+
     def test_job_status(self, calculator_demo):
         with connect(calculator_demo) as client:
             statuses = []
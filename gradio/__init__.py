@@ -8,6 +8,7 @@ from gradio import components, layouts, themes
 from gradio.blocks import Blocks
 from gradio.chat_interface import ChatInterface
 from gradio.components import (
+    FINISHED,
     HTML,
     JSON,
     AnnotatedImage,
@@ -91,8 +92,11 @@ from gradio.helpers import create_examples as Examples  # noqa: N812
 from gradio.interface import Interface, TabbedInterface, close_all
 from gradio.layouts import Accordion, Column, Group, Row, Tab, TabItem, Tabs
 from gradio.oauth import OAuthProfile, OAuthToken
+from gradio.process_pool import ProcessPool
 from gradio.renderable import render
+from gradio.result_cache import ResultCache
 from gradio.routes import Request, mount_gradio_app
+from gradio.state_backends import SQLiteStateBackend, StateBackend
 from gradio.templates import (
     Files,
     ImageMask,
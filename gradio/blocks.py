@@ -15,7 +15,14 @@ import time
 import warnings
 import webbrowser
 from collections import defaultdict
-from collections.abc import AsyncIterator, Callable, Coroutine, Sequence, Set
+from collections.abc import (
+    AsyncIterator,
+    Callable,
+    Coroutine,
+    MutableMapping,
+    Sequence,
+    Set,
+)
 from pathlib import Path
 from types import ModuleType
 from typing import (
@@ -71,8 +78,10 @@ from gradio.exceptions import (
     InvalidApiNameError,
     InvalidComponentError,
 )
-from gradio.helpers import create_tracker, skip, special_args
+from gradio.helpers import create_tracker, skip, special_args, uses_request
 from gradio.node_server import start_node_server
+from gradio.process_pool import ProcessGenerator, ProcessPool
+from gradio.result_cache import ResultCache
 from gradio.route_utils import API_PREFIX, MediaStream
 from gradio.state_holder import SessionState, StateHolder
 from gradio.themes import Default as DefaultTheme
@@ -103,6 +112,7 @@ except Exception:
 if TYPE_CHECKING:  # Only import for type checking (is False at runtime).
     from gradio.components.base import Component
     from gradio.renderable import Renderable
+    from gradio.state_backends import StateBackend
 
 BUILT_IN_THEMES: dict[str, Theme] = {
     t.name: t
@@ -144,6 +154,8 @@ class Block:
         self.is_rendered: bool = False
         self._constructor_args: list[dict]
         self.state_session_capacity = 10000
+        self.max_state_memory: int | None = None
+        self.state_backend: StateBackend | None = None
         self.temp_files: set[str] = set()
         self.GRADIO_CACHE = get_upload_folder()
         self.key = key
@@ -501,7 +513,8 @@ class BlockFunction:
         _id: int,
         batch: bool = False,
         max_batch_size: int = 4,
-        concurrency_limit: int | None | Literal["default"] = "default",
+        max_batch_wait: float = 0,
+        concurrency_limit: int | None | Literal["default", "auto"] = "default",
         concurrency_id: str | None = None,
         tracks_progress: bool = False,
         api_name: str | Literal[False] = False,
@@ -523,6 +536,12 @@ class BlockFunction:
         stream_every: float = 0.5,
         like_user_message: bool = False,
         event_specific_args: list[str] | None = None,
+        priority: int = 0,
+        backpressure: Literal["buffer", "latest"] = "buffer",
+        max_threads: int | None = None,
+        executor: Literal["thread", "process"] | ProcessPool = "thread",
+        cache: bool | ResultCache = False,
+        coalesce: bool = False,
     ):
         self.fn = fn
         self._id = _id
@@ -531,10 +550,17 @@ class BlockFunction:
         self.preprocess = preprocess
         self.postprocess = postprocess
         self.tracks_progress = tracks_progress
-        self.concurrency_limit: int | None | Literal["default"] = concurrency_limit
+        self.concurrency_limit: int | None | Literal["default", "auto"] = (
+            concurrency_limit
+        )
         self.concurrency_id = concurrency_id or str(id(fn))
+        self.priority = priority
+        self.backpressure = backpressure
+        self.max_threads = max_threads
+        self.coalesce = coalesce
         self.batch = batch
         self.max_batch_size = max_batch_size
+        self.max_batch_wait = max_batch_wait
         self.total_runtime = 0
         self.total_runs = 0
         self.inputs_as_dict = inputs_as_dict
@@ -545,6 +571,7 @@ class BlockFunction:
         self.show_progress = show_progress
         self.cancels = cancels or []
         self.collects_event_data = collects_event_data
+        self.uses_request = fn is not None and uses_request(fn)
         self.trigger_after = trigger_after
         self.trigger_only_on_success = trigger_only_on_success
         self.trigger_mode = trigger_mode
@@ -557,6 +584,20 @@ class BlockFunction:
         ) or inspect.isasyncgenfunction(self.fn)
         self.renderable = renderable
         self.rendered_in = rendered_in
+        self.cache: ResultCache | None = self.get_result_cache(cache)
+        if executor not in ("thread", "process") and not isinstance(
+            executor, ProcessPool
+        ):
+            raise ValueError(
+                f"Invalid executor: {executor!r}. Must be 'thread', 'process' or a gr.ProcessPool."
+            )
+        if executor != "thread" and (
+            inspect.iscoroutinefunction(self.fn) or inspect.isasyncgenfunction(self.fn)
+        ):
+            raise ValueError(
+                "Async functions cannot be run in a process pool, so executor must be 'thread'."
+            )
+        self.executor = executor
 
         # We need to keep track of which events are cancel events
         # so that the client can call the /cancel route directly
@@ -569,6 +610,24 @@ class BlockFunction:
 
         self.spaces_auto_wrap()
 
+    def get_result_cache(self, cache: bool | ResultCache) -> ResultCache | None:
+        if cache is False or self.fn is None:
+            return None
+        if self.batch or self.types_generator:
+            raise ValueError(
+                "Caching results is not supported for batched or generator functions."
+            )
+        if any(block.stateful for block in [*self.inputs, *self.outputs]):
+            raise ValueError(
+                "Caching results is not supported for functions with gr.State inputs or outputs."
+            )
+        if self.collects_event_data or self.uses_request:
+            raise ValueError(
+                "Caching results is not supported for functions that take event data, a gr.Request or an OAuth profile or token."
+            )
+        self.cache_namespace = ResultCache.get_namespace(self.fn, self._id)
+        return ResultCache() if cache is True else cache
+
     def spaces_auto_wrap(self):
         if spaces is None:
             return
@@ -678,8 +737,8 @@ class BlocksConfig:
     def __init__(self, root_block: Blocks):
         self._id: int = 0
         self.root_block = root_block
-        self.blocks: dict[int, Component | Block] = {}
-        self.fns: dict[int, BlockFunction] = {}
+        self.blocks: MutableMapping[int, Component | Block] = {}
+        self.fns: MutableMapping[int, BlockFunction] = {}
         self.fn_id: int = 0
 
     def set_event_trigger(
@@ -710,12 +769,13 @@ class BlocksConfig:
         queue: bool = True,
         batch: bool = False,
         max_batch_size: int = 4,
+        max_batch_wait: float = 0,
         cancels: list[int] | None = None,
         collects_event_data: bool | None = None,
         trigger_after: int | None = None,
         trigger_only_on_success: bool = False,
         trigger_mode: Literal["once", "multiple", "always_last"] | None = "once",
-        concurrency_limit: int | None | Literal["default"] = "default",
+        concurrency_limit: int | None | Literal["default", "auto"] = "default",
         concurrency_id: str | None = None,
         show_api: bool = True,
         renderable: Renderable | None = None,
@@ -725,6 +785,12 @@ class BlocksConfig:
         stream_every: float = 0.5,
         like_user_message: bool = False,
         event_specific_args: list[str] | None = None,
+        priority: int = 0,
+        backpressure: Literal["buffer", "latest"] = "buffer",
+        max_threads: int | None = None,
+        executor: Literal["thread", "process"] | ProcessPool = "thread",
+        cache: bool | ResultCache = False,
+        coalesce: bool = False,
     ) -> tuple[BlockFunction, int]:
         """
         Adds an event to the component's dependencies.
@@ -743,18 +809,25 @@ class BlocksConfig:
             queue: If True, will place the request on the queue, if the queue has been enabled. If False, will not put this event on the queue, even if the queue has been enabled. If None, will use the queue setting of the gradio app.
             batch: whether this function takes in a batch of inputs
             max_batch_size: the maximum batch size to send to the function
+            max_batch_wait: the maximum number of seconds to hold a batch open for more events before sending it to the function (only relevant if batch=True). The actual wait adapts to how often events arrive and how long the function takes, and is never longer than this value. If 0, batches are sent with whichever events are already queued.
             cancels: a list of other events to cancel when this event is triggered. For example, setting cancels=[click_event] will cancel the click_event, where click_event is the return value of another components .click method.
             collects_event_data: whether to collect event data for this event
             trigger_after: if set, this event will be triggered after 'trigger_after' function index
             trigger_only_on_success: if True, this event will only be triggered if the previous event was successful (only applies if `trigger_after` is set)
             trigger_mode: If "once" (default for all events except `.change()`) would not allow any submissions while an event is pending. If set to "multiple", unlimited submissions are allowed while pending, and "always_last" (default for `.change()` and `.key_up()` events) would allow a second submission after the pending event is complete.
-            concurrency_limit: If set, this is the maximum number of this event that can be running simultaneously. Can be set to None to mean no concurrency_limit (any number of this event can be running simultaneously). Set to "default" to use the default concurrency limit (defined by the `default_concurrency_limit` parameter in `queue()`, which itself is 1 by default).
+            concurrency_limit: If set, this is the maximum number of this event that can be running simultaneously. Can be set to None to mean no concurrency_limit (any number of this event can be running simultaneously). Set to "default" to use the default concurrency limit (defined by the `default_concurrency_limit` parameter in `queue()`, which itself is 1 by default). Set to "auto" to have the limit adjusted at runtime, between 1 and the `max_threads` of `launch()`, to get the most throughput without letting the latency of this event grow.
             concurrency_id: If set, this is the id of the concurrency group. Events with the same concurrency_id will be limited by the lowest set concurrency_limit.
             show_api: whether to show this event in the "view API" page of the Gradio app, or in the ".view_api()" method of the Gradio clients. Unlike setting api_name to False, setting show_api to False will still allow downstream apps as well as the Clients to use this event. If fn is None, show_api will automatically be set to False.
             is_cancel_function: whether this event cancels another running event.
             connection: The connection format, either "sse" or "stream".
             time_limit: The time limit for the function to run. Parameter only used for the `.stream()` event.
             stream_every: The latency (in seconds) at which stream chunks are sent to the backend. Defaults to 0.5 seconds. Parameter only used for the `.stream()` event.
+            priority: Queued events with a higher priority are run before queued events with a lower priority, whatever the `scheduling` policy set in `queue()`. Defaults to 0.
+            backpressure: How the outputs of a generator are sent to a client that reads them slower than they are generated. "buffer" sends every output. "latest" merges the outputs that the client has not read yet into one, so that a slow client only gets the latest value once it catches up, and the memory used for it stays bounded. Use "latest" when only the current value matters, e.g. for a chatbot that streams its response. Does not apply to streaming listeners (`stream_every`). Defaults to "buffer".
+            max_threads: If set, synchronous calls of this listener run in a dedicated pool of this many threads, shared with the other listeners that have the same `concurrency_id`, instead of the pool shared by the whole app (whose size is set by `max_threads` in `launch()`). This way, a slow listener cannot take every thread away from the rest of the app. The number of events of this listener that run at the same time is also capped at this value. Defaults to None.
+            executor: If "thread" (default), synchronous functions are run in a thread of the server. If "process", they are run in a pool of worker processes shared by all such listeners of the app (see `gr.ProcessPool`), which lets CPU-bound Python functions run in parallel instead of being serialized on the GIL. Can also be set to a `gr.ProcessPool` to use that pool. The function, its inputs and its outputs must be picklable. Async functions are always run in the event loop.
+            cache: If True, or set to a `gr.ResultCache`, the outputs of this listener are cached, keyed on its preprocessed inputs, so that calls with the same inputs as an earlier call skip both the function and the postprocessing of its outputs. Only use this for functions whose output depends only on their inputs. Not supported for batched or streaming listeners, for listeners with `gr.State` among their inputs or outputs, or for functions that take event data, a `gr.Request` or an OAuth profile or token. Defaults to False.
+            coalesce: If True, identical calls to this listener (same inputs, and no `gr.State` among its inputs or outputs) that are queued or running at the same time are run only once, and the result is sent to every caller. Only use this for functions whose output depends only on their inputs. Not supported for batched or streaming listeners. Defaults to False.
         Returns: dependency information, dependency index
         """
         # Support for singular parameter
@@ -851,6 +924,7 @@ class BlocksConfig:
             targets=_targets,
             batch=batch,
             max_batch_size=max_batch_size,
+            max_batch_wait=max_batch_wait,
             concurrency_limit=concurrency_limit,
             concurrency_id=concurrency_id,
             tracks_progress=progress_index is not None,
@@ -873,6 +947,12 @@ class BlocksConfig:
             stream_every=stream_every,
             like_user_message=like_user_message,
             event_specific_args=event_specific_args,
+            priority=priority,
+            backpressure=backpressure,
+            max_threads=max_threads,
+            executor=executor,
+            cache=cache,
+            coalesce=coalesce,
         )
 
         self.fns[self.fn_id] = block_fn
@@ -938,12 +1018,23 @@ class BlocksConfig:
         return config
 
     def __copy__(self):
+        """
+        Copies the config for a session. The blocks and functions of the copy are copy-on-write views of those of
+        this config, so that a session only stores the blocks and functions that it changes (e.g. the components
+        whose properties are updated by a function, or those created by gr.render).
+        """
         new = BlocksConfig(self.root_block)
-        new.blocks = copy.copy(self.blocks)
-        new.fns = copy.copy(self.fns)
+        new.blocks = self._copy_on_write(self.blocks)
+        new.fns = self._copy_on_write(self.fns)
         new.fn_id = self.fn_id
         return new
 
+    @staticmethod
+    def _copy_on_write(mapping: MutableMapping) -> MutableMapping:
+        if isinstance(mapping, utils.CopyOnWriteDict):
+            return copy.copy(mapping)
+        return utils.CopyOnWriteDict(mapping)
+
 
 @document("launch", "queue", "integrate", "load", "unload")
 class Blocks(BlockContext, BlocksEvents, metaclass=BlocksMeta):
@@ -1013,6 +1104,9 @@ class Blocks(BlockContext, BlocksEvents, metaclass=BlocksMeta):
             delete_cache: A tuple corresponding [frequency, age] both expressed in number of seconds. Every `frequency` seconds, the temporary files created by this Blocks instance will be deleted if more than `age` seconds have passed since the file was created. For example, setting this to (86400, 86400) will delete temporary files every day. The cache will be deleted entirely when the server restarts. If None, no cache deletion will occur.
         """
         self.limiter = None
+        self.thread_pool = utils.ThreadPool()
+        self.thread_pool_per_concurrency_id: dict[str, utils.ThreadPool] = {}
+        self.process_pool: ProcessPool | None = None
         if theme is None:
             theme = DefaultTheme()
         elif isinstance(theme, str):
@@ -1104,6 +1198,7 @@ class Blocks(BlockContext, BlocksEvents, metaclass=BlocksMeta):
         self.api_mode = None
 
         self.progress_tracking = None
+        self.state_ids_with_change_listeners: set[int] | None = None
         self.ssl_verify = True
         self.allowed_paths = []
         self.blocked_paths = []
@@ -1127,15 +1222,15 @@ class Blocks(BlockContext, BlocksEvents, metaclass=BlocksMeta):
         self.queue()
 
     @property
-    def blocks(self) -> dict[int, Component | Block]:
+    def blocks(self) -> MutableMapping[int, Component | Block]:
         return self.default_config.blocks
 
     @blocks.setter
-    def blocks(self, value: dict[int, Component | Block]):
+    def blocks(self, value: MutableMapping[int, Component | Block]):
         self.default_config.blocks = value
 
     @property
-    def fns(self) -> dict[int, BlockFunction]:
+    def fns(self) -> MutableMapping[int, BlockFunction]:
         return self.default_config.fns
 
     def get_component(self, id: int) -> Component | BlockContext:
@@ -1563,9 +1658,19 @@ class Blocks(BlockContext, BlocksEvents, metaclass=BlocksMeta):
 
             if inspect.iscoroutinefunction(fn):
                 prediction = await fn(*processed_input)
+            elif block_fn.executor != "thread":
+                if progress_tracker is not None:
+                    raise ValueError(
+                        "gr.Progress is not supported for functions run in a process pool."
+                    )
+                prediction = await self.get_thread_pool(block_fn).run_sync(
+                    self.get_process_pool(block_fn).call,
+                    block_fn.fn,
+                    *processed_input,
+                )
             else:
-                prediction = await anyio.to_thread.run_sync(  # type: ignore
-                    fn, *processed_input, limiter=self.limiter
+                prediction = await self.get_thread_pool(block_fn).run_sync(
+                    fn, *processed_input
                 )
         else:
             prediction = None
@@ -1574,8 +1679,12 @@ class Blocks(BlockContext, BlocksEvents, metaclass=BlocksMeta):
             try:
                 if iterator is None:
                     iterator = cast(AsyncIterator[Any], prediction)
-                if inspect.isgenerator(iterator):
-                    iterator = utils.SyncToAsyncIterator(iterator, self.limiter)
+                if inspect.isgenerator(iterator) or isinstance(
+                    iterator, ProcessGenerator
+                ):
+                    iterator = utils.SyncToAsyncIterator(
+                        iterator, self.get_thread_pool(block_fn)
+                    )
                 prediction = await utils.async_iteration(iterator)
                 is_generating = True
             except StopAsyncIteration:
@@ -1596,6 +1705,53 @@ class Blocks(BlockContext, BlocksEvents, metaclass=BlocksMeta):
             "iterator": iterator,
         }
 
+    def get_thread_pool(self, block_fn: BlockFunction) -> utils.ThreadPool:
+        """
+        Returns the pool of threads that runs the sync calls of `block_fn`: the app's shared pool, or, if `block_fn`
+        sets `max_threads`, the dedicated pool of its concurrency group, whose size is the lowest `max_threads` set
+        by the listeners in that group.
+        """
+        if block_fn.max_threads is None:
+            return self.thread_pool
+        concurrency_id = block_fn.concurrency_id
+        if concurrency_id not in self.thread_pool_per_concurrency_id:
+            max_threads = self.get_dedicated_thread_counts().get(
+                concurrency_id, block_fn.max_threads
+            )
+            self.thread_pool_per_concurrency_id[concurrency_id] = utils.ThreadPool(
+                CapacityLimiter(total_tokens=max_threads)
+            )
+        return self.thread_pool_per_concurrency_id[concurrency_id]
+
+    def get_dedicated_thread_counts(self) -> dict[str, int]:
+        """Returns the size of the dedicated thread pool of every concurrency group that has one."""
+        thread_counts: dict[str, int] = {}
+        for fn in self.fns.values():
+            if fn.max_threads is not None:
+                thread_counts[fn.concurrency_id] = min(
+                    fn.max_threads,
+                    thread_counts.get(fn.concurrency_id, fn.max_threads),
+                )
+        return thread_counts
+
+    def get_thread_pool_metrics(self) -> dict[str, dict[str, Any]]:
+        """
+        Returns the number of threads, busy threads and waiting calls, and the number of calls that found every thread
+        busy, of the app's shared thread pool (keyed "default") and of the dedicated thread pool of every concurrency
+        group that has started one (keyed by concurrency_id).
+        """
+        metrics = {"default": self.thread_pool.get_metrics()}
+        for concurrency_id, pool in self.thread_pool_per_concurrency_id.items():
+            metrics[concurrency_id] = pool.get_metrics()
+        return metrics
+
+    def get_process_pool(self, block_fn: BlockFunction) -> ProcessPool:
+        if isinstance(block_fn.executor, ProcessPool):
+            return block_fn.executor
+        if self.process_pool is None:
+            self.process_pool = ProcessPool()
+        return self.process_pool
+
     def serialize_data(self, fn_index: int, inputs: list[Any]) -> list[Any]:
         dependency = self.fns[fn_index]
         processed_input = []
@@ -1900,7 +2056,7 @@ Received inputs:
         block_fn: BlockFunction,
         data: list,
         session_hash: str | None,
-        run: int | None,
+        run: int | tuple[int, int] | None,
         final: bool,
         simple_format: bool = False,
     ) -> list:
@@ -1908,21 +2064,20 @@ Received inputs:
             return data
         first_run = run not in self.pending_diff_streams[session_hash]
         if first_run:
-            self.pending_diff_streams[session_hash][run] = [None] * len(data)
-        last_diffs = self.pending_diff_streams[session_hash][run]
+            self.pending_diff_streams[session_hash][run] = [
+                utils.StreamingDiff() for _ in data
+            ]
+        streaming_diffs = self.pending_diff_streams[session_hash][run]
 
         for i in range(len(block_fn.outputs)):
             if final:
-                data[i] = last_diffs[i]
+                data[i] = streaming_diffs[i].value
                 continue
 
-            if first_run:
-                last_diffs[i] = data[i]
+            if first_run or simple_format:
+                streaming_diffs[i].value = data[i]
             else:
-                prev_chunk = last_diffs[i]
-                last_diffs[i] = data[i]
-                if not simple_format:
-                    data[i] = utils.diff(prev_chunk, data[i])
+                data[i] = streaming_diffs[i].update(data[i])
 
         if final:
             del self.pending_diff_streams[session_hash][run]
@@ -1971,10 +2126,6 @@ Received inputs:
             max_batch_size = block_fn.max_batch_size
             batch_sizes = [len(inp) for inp in inputs]
             batch_size = batch_sizes[0]
-            if inspect.isasyncgenfunction(block_fn.fn) or inspect.isgeneratorfunction(
-                block_fn.fn
-            ):
-                raise ValueError("Gradio does not support generators in batch mode.")
             if not all(x == batch_size for x in batch_sizes):
                 raise ValueError(
                     f"All inputs to a batch function must have the same length but instead have sizes: {batch_sizes}."
@@ -1983,29 +2134,64 @@ Received inputs:
                 raise ValueError(
                     f"Batch size ({batch_size}) exceeds the max_batch_size for this function ({max_batch_size})"
                 )
-            inputs = [
-                await self.preprocess_data(block_fn, list(i), state, explicit_call)
-                for i in zip(*inputs, strict=False)
-            ]
+            old_iterator = iterator
+            was_generating = old_iterator is not None
+            if was_generating:
+                inputs = []
+            else:
+                inputs = [
+                    await self.preprocess_data(block_fn, list(i), state, explicit_call)
+                    for i in zip(*inputs, strict=False)
+                ]
+                inputs = list(zip(*inputs, strict=False))
             result = await self.call_function(
                 block_fn,
-                list(zip(*inputs, strict=False)),
-                None,
+                inputs,
+                old_iterator,
                 request,
                 event_id,
                 event_data,
                 in_event_listener,
                 state,
             )
+            is_generating, iterator = result["is_generating"], result["iterator"]
             preds = result["prediction"]
+            if block_fn.types_generator and not is_generating:
+                # The generator is exhausted, so every item in the batch is finished
+                preds = [
+                    [components._Keywords.FINISHED_ITERATING] * batch_size
+                    for _ in block_fn.outputs
+                ]
+            item_preds = list(zip(*preds, strict=False))
             data = [
                 await self.postprocess_data(block_fn, list(o), state)
-                for o in zip(*preds, strict=False)
+                for o in item_preds
             ]
             if root_path is not None:
                 data = processing_utils.add_root_url(data, root_path, None)  # type: ignore
+            if is_generating or was_generating:
+                # Each item in the batch is streamed to a different event, so the
+                # diffs are tracked per item. An item is finished once the generator
+                # yields FINISHED_ITERATING for all of its outputs.
+                run = id(old_iterator) if was_generating else id(iterator)
+                finished_items = [
+                    all(p is components._Keywords.FINISHED_ITERATING for p in item_pred)
+                    for item_pred in item_preds
+                ]
+                data = [
+                    self.handle_streaming_diffs(
+                        block_fn,
+                        item_data,
+                        session_hash=session_hash,
+                        run=(run, i),
+                        final=finished,
+                        simple_format=simple_format,
+                    )
+                    for i, (item_data, finished) in enumerate(
+                        zip(data, finished_items, strict=False)
+                    )
+                ]
             data = list(zip(*data, strict=False))
-            is_generating, iterator = None, None
         else:
             old_iterator = iterator
             if old_iterator:
@@ -2015,24 +2201,48 @@ Received inputs:
                     block_fn, inputs, state, explicit_call
                 )
             was_generating = old_iterator is not None
-            result = await self.call_function(
-                block_fn,
-                inputs,
-                old_iterator,
-                request,
-                event_id,
-                event_data,
-                in_event_listener,
-                state,
-            )
-            data = await self.postprocess_data(block_fn, result["prediction"], state)
+            cache_key = None
+            cached_data = None
+            if block_fn.cache is not None and not was_generating:
+                cache_key = block_fn.cache.get_key(block_fn.cache_namespace, inputs)
+                if cache_key is not None:
+                    cached_data = await block_fn.cache.async_get(cache_key)
+            if cached_data is not None:
+                # A cached result skips both the function and the postprocessing
+                result = {
+                    "prediction": None,
+                    "is_generating": False,
+                    "iterator": None,
+                    "duration": 0,
+                }
+                data = cached_data
+            else:
+                result = await self.call_function(
+                    block_fn,
+                    inputs,
+                    old_iterator,
+                    request,
+                    event_id,
+                    event_data,
+                    in_event_listener,
+                    state,
+                )
+                data = await self.postprocess_data(
+                    block_fn, result["prediction"], state
+                )
+                # Updates to the properties of components change the session's copy
+                # of those components, so they are not cached
+                if cache_key is not None and not any(
+                    utils.is_prop_update(d) for d in data
+                ):
+                    await block_fn.cache.async_set(cache_key, data)  # type: ignore
             if state:
                 changed_state_ids = [
                     state_id
                     for hash_value, state_id in zip(
                         hashed_values, state_ids_to_track, strict=False
                     )
-                    if hash_value != utils.deep_hash(state[state_id])
+                    if hash_value != utils.state_fingerprint(state[state_id])
                 ]
 
             if root_path is not None:
@@ -2068,6 +2278,11 @@ Received inputs:
             "render_config": None,
             "changed_state_ids": changed_state_ids,
         }
+        if batch and (is_generating or was_generating):
+            output["finished_items"] = finished_items
+        if isinstance(state, SessionState) and state.backend is not None:
+            # Pickling and writing the state can be slow, so it is not done on the event loop
+            await anyio.to_thread.run_sync(state.save)
         if block_fn.renderable and state:
             output["render_config"] = state.blocks_config.get_config(
                 block_fn.renderable
@@ -2085,23 +2300,35 @@ Received inputs:
     ) -> tuple[list[int], list]:
         if state is None:
             return [], []
+        ids_with_change_listeners = self.state_ids_with_change_listeners
+        if ids_with_change_listeners is None:
+            ids_with_change_listeners = self.get_state_ids_with_change_listeners()
         state_ids_to_track = []
         hashed_values = []
         for block in block_fn.outputs:
-            if block.stateful and any(
-                (block._id, "change") in fn.targets for fn in self.fns.values()
-            ):
+            if block.stateful and block._id in ids_with_change_listeners:
                 value = state[block._id]
                 state_ids_to_track.append(block._id)
-                hashed_values.append(utils.deep_hash(value))
+                hashed_values.append(utils.state_fingerprint(value))
         return state_ids_to_track, hashed_values
 
+    def get_state_ids_with_change_listeners(self) -> set[int]:
+        """Returns the ids of the components that are the target of a .change() event listener."""
+        return {
+            target_id
+            for fn in self.fns.values()
+            for target_id, event_name in fn.targets
+            if event_name == "change"
+        }
+
     def create_limiter(self):
         self.limiter = (
             None
             if self.max_threads == 40
             else CapacityLimiter(total_tokens=self.max_threads)
         )
+        self.thread_pool = utils.ThreadPool(self.limiter)
+        self.thread_pool_per_concurrency_id = {}
 
     def get_config(self):
         return {"type": "column"}
@@ -2178,6 +2405,9 @@ Received inputs:
         self.progress_tracking = any(
             block_fn.tracks_progress for block_fn in self.fns.values()
         )
+        self.state_ids_with_change_listeners = (
+            self.get_state_ids_with_change_listeners()
+        )
         self.exited = True
 
     def clear(self):
@@ -2185,6 +2415,7 @@ Received inputs:
         self.default_config.blocks = {}
         self.default_config.fns = {}
         self.children = []
+        self.state_ids_with_change_listeners = None
         return self
 
     @document()
@@ -2195,6 +2426,12 @@ Received inputs:
         max_size: int | None = None,
         *,
         default_concurrency_limit: int | None | Literal["not_set"] = "not_set",
+        scheduling: Literal["random", "fifo", "fair", "user_fair"]
+        | queueing.SchedulingPolicy = "random",
+        max_wait: float | None = None,
+        max_events_per_user: int | None = None,
+        max_requests_per_minute: int | None = None,
+        max_session_memory: int | None = 64 * 1024 * 1024,
     ):
         """
         By enabling the queue you can control when users know their position in the queue, and set a limit on maximum number of events allowed.
@@ -2203,6 +2440,11 @@ Received inputs:
             api_open: If True, the REST routes of the backend will be open, allowing requests made directly to those endpoints to skip the queue.
             max_size: The maximum number of events the queue will store at any given moment. If the queue is full, new events will not be added and a user will receive a message saying that the queue is full. If None, the queue size will be unlimited.
             default_concurrency_limit: The default value of `concurrency_limit` to use for event listeners that don't specify a value. Can be set by environment variable GRADIO_DEFAULT_CONCURRENCY_LIMIT. Defaults to 1 if not set otherwise.
+            scheduling: How the queue picks the next event to run when a worker is free. "random" (default) serves the concurrency groups in a random order, "fifo" runs events in the order they were submitted, "fair" shares processing time equally between concurrency groups, and "user_fair" shares it equally between users. A `gradio.queueing.SchedulingPolicy` instance (e.g. `FairScheduling(weights={"gpu": 2})`) can be passed for custom scheduling. In all cases, events with a higher `priority` run first.
+            max_wait: If set, new events are rejected with a message saying that the queue is full when they are expected to wait for longer than this many seconds before they start processing. The expected wait is based on the recent process times of the events ahead of them. If None, events are not rejected based on their expected wait.
+            max_events_per_user: The maximum number of events a single user can have queued or processing at any given moment. Users are identified by their username if they are logged in, and by their session otherwise (so an anonymous user who opens the app in several tabs gets a quota per tab, but users behind the same proxy never share one). If None, there is no per-user limit.
+            max_requests_per_minute: The maximum number of events a single user can submit to the queue per minute. Users are identified as in `max_events_per_user`. If None, there is no rate limit.
+            max_session_memory: The memory (in bytes) that the sessions connected to the queue, and the messages waiting to be sent to them, can use before idle sessions (those with no open connection and no pending events) are evicted, oldest first. Sessions that are still in use are never evicted. If None, sessions are never evicted, and the size of the messages is not measured.
         Example: (Blocks)
             with gr.Blocks() as demo:
                 button = gr.Button(label="Generate Image")
@@ -2225,6 +2467,11 @@ Received inputs:
             max_size=max_size,
             blocks=self,
             default_concurrency_limit=default_concurrency_limit,
+            scheduling=scheduling,
+            max_wait=max_wait,
+            max_events_per_user=max_events_per_user,
+            max_requests_per_minute=max_requests_per_minute,
+            max_session_memory=max_session_memory,
         )
         self.config = self.get_config_file()
         self.app = routes.App.create_app(self)
@@ -2274,6 +2521,8 @@ Received inputs:
         root_path: str | None = None,
         app_kwargs: dict[str, Any] | None = None,
         state_session_capacity: int = 10000,
+        max_state_memory: int | None = None,
+        state_backend: StateBackend | None = None,
         share_server_address: str | None = None,
         share_server_protocol: Literal["http", "https"] | None = None,
         auth_dependency: Callable[[fastapi.Request], str | None] | None = None,
@@ -2314,6 +2563,8 @@ Received inputs:
             root_path: The root path (or "mount point") of the application, if it's not served from the root ("/") of the domain. Often used when the application is behind a reverse proxy that forwards requests to the application. For example, if the application is served at "https://example.com/myapp", the `root_path` should be set to "/myapp". A full URL beginning with http:// or https:// can be provided, which will be used as the root path in its entirety. Can be set by environment variable GRADIO_ROOT_PATH. Defaults to "".
             app_kwargs: Additional keyword arguments to pass to the underlying FastAPI app as a dictionary of parameter keys and argument values. For example, `{"docs_url": "/docs"}`
             state_session_capacity: The maximum number of sessions whose information to store in memory. If the number of sessions exceeds this number, the oldest sessions will be removed. Reduce capacity to reduce memory usage when using gradio.State or returning updated components from functions. Defaults to 10000.
+            max_state_memory: The memory (in bytes) that the gradio.State values of all sessions can use. When it is exceeded, the state of the least recently used sessions (except those with pending events) is pickled to a temporary directory on disk, and loaded back into memory the next time the session makes a request. Sessions whose state cannot be pickled are removed instead. If None, the state is only bounded by `state_session_capacity`. Defaults to None.
+            state_backend: A store (such as gradio.SQLiteStateBackend) that shares the gradio.State values of sessions between several server processes, so that the requests of a session can be served by any of them without sticky sessions. The values returned by functions are saved to the store after every event, and loaded by the other processes when the session next makes a request to them. The values must be picklable. Updates to the properties of components are not shared. If None, the state is only kept in the memory of this process. Defaults to None.
             share_server_address: Use this to specify a custom FRP server and port for sharing Gradio apps (only applies if share=True). If not provided, will use the default FRP server at https://gradio.live. See https://github.com/huggingface/frp for more information.
             share_server_protocol: Use this to specify the protocol to use for the share links. Defaults to "https", unless a custom share_server_address is provided, in which case it defaults to "http". If you are using a custom share_server_address and want to use https, you must set this to "https".
             auth_dependency: A function that takes a FastAPI request and returns a string user ID or None. If the function returns None for a specific request, that user is not authorized to access the app (they will see a 401 Unauthorized response). To be used with external authentication systems like OAuth. Cannot be used with `auth`.
@@ -2380,6 +2631,8 @@ Received inputs:
         self.favicon_path = favicon_path
         self.ssl_verify = ssl_verify
         self.state_session_capacity = state_session_capacity
+        self.max_state_memory = max_state_memory
+        self.state_backend = state_backend
         if root_path is None:
             self.root_path = os.environ.get("GRADIO_ROOT_PATH", "")
         else:
@@ -2813,6 +3066,9 @@ Received inputs:
                 self._queue._cancel_asyncio_tasks()
                 self.server_app._cancel_asyncio_tasks()
             self._queue.close()
+            if self.process_pool is not None:
+                self.process_pool.close()
+                self.process_pool = None
             # set this before closing server to shut down heartbeats
             self.is_running = False
             self.app.stop_event.set()
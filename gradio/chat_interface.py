@@ -90,7 +90,7 @@ class ChatInterface(Blocks):
         analytics_enabled: bool | None = None,
         autofocus: bool = True,
         autoscroll: bool = True,
-        concurrency_limit: int | None | Literal["default"] = "default",
+        concurrency_limit: int | None | Literal["default", "auto"] = "default",
         fill_height: bool = True,
         delete_cache: tuple[int, int] | None = None,
         show_progress: Literal["full", "minimal", "hidden"] = "minimal",
@@ -123,7 +123,7 @@ class ChatInterface(Blocks):
             analytics_enabled: whether to allow basic telemetry. If None, will use GRADIO_ANALYTICS_ENABLED environment variable if defined, or default to True.
             autofocus: if True, autofocuses to the textbox when the page loads.
             autoscroll: If True, will automatically scroll to the bottom of the textbox when the value changes, unless the user scrolls up. If False, will not scroll to the bottom of the textbox when the value changes.
-            concurrency_limit: if set, this is the maximum number of chatbot submissions that can be running simultaneously. Can be set to None to mean no limit (any number of chatbot submissions can be running simultaneously). Set to "default" to use the default concurrency limit (defined by the `default_concurrency_limit` parameter in `.queue()`, which is 1 by default).
+            concurrency_limit: if set, this is the maximum number of chatbot submissions that can be running simultaneously. Can be set to None to mean no limit (any number of chatbot submissions can be running simultaneously). Set to "default" to use the default concurrency limit (defined by the `default_concurrency_limit` parameter in `.queue()`, which is 1 by default). Set to "auto" to have the limit adjusted at runtime, between 1 and the `max_threads` of `launch()`, to get the most throughput without letting the latency of this event grow.
             fill_height: if True, the chat interface will expand to the height of window.
             delete_cache: a tuple corresponding [frequency, age] both expressed in number of seconds. Every `frequency` seconds, the temporary files created by this Blocks instance will be deleted if more than `age` seconds have passed since the file was created. For example, setting this to (86400, 86400) will delete temporary files every day. The cache will be deleted entirely when the server restarts. If None, no cache deletion will occur.
             show_progress: how to show the progress animation while event is running: "full" shows a spinner which covers the output component area as well as a runtime display in the upper right corner, "minimal" only shows the runtime display, "hidden" shows no progress animation at all
@@ -337,7 +337,7 @@ class ChatInterface(Blocks):
                 [self.chatbot],
                 show_api=False,
                 concurrency_limit=cast(
-                    Union[int, Literal["default"], None], self.concurrency_limit
+                    Union[int, Literal["default", "auto"], None], self.concurrency_limit
                 ),
                 show_progress=cast(
                     Literal["full", "minimal", "hidden"], self.show_progress
@@ -375,7 +375,8 @@ class ChatInterface(Blocks):
                     [self.chatbot],
                     show_api=False,
                     concurrency_limit=cast(
-                        Union[int, Literal["default"], None], self.concurrency_limit
+                        Union[int, Literal["default", "auto"], None],
+                        self.concurrency_limit,
                     ),
                     show_progress=cast(
                         Literal["full", "minimal", "hidden"], self.show_progress
@@ -408,7 +409,7 @@ class ChatInterface(Blocks):
                 [self.chatbot],
                 show_api=False,
                 concurrency_limit=cast(
-                    Union[int, Literal["default"], None], self.concurrency_limit
+                    Union[int, Literal["default", "auto"], None], self.concurrency_limit
                 ),
                 show_progress=cast(
                     Literal["full", "minimal", "hidden"], self.show_progress
@@ -508,7 +509,7 @@ class ChatInterface(Blocks):
             [self.fake_response_textbox, self.chatbot_state],
             api_name="chat",
             concurrency_limit=cast(
-                Union[int, Literal["default"], None], self.concurrency_limit
+                Union[int, Literal["default", "auto"], None], self.concurrency_limit
             ),
         )
 
@@ -18,6 +18,8 @@ INTERFACE_TEMPLATE = '''
     from gradio.blocks import Block
     if TYPE_CHECKING:
         from gradio.components import Timer
+        from gradio.process_pool import ProcessPool
+        from gradio.result_cache import ResultCache
 
     {% for event in events %}
     def {{ event.event_name }}(self,
@@ -30,15 +32,22 @@ INTERFACE_TEMPLATE = '''
         queue: bool | None = None,
         batch: bool = False,
         max_batch_size: int = 4,
+        max_batch_wait: float = 0,
         preprocess: bool = True,
         postprocess: bool = True,
         cancels: dict[str, Any] | list[dict[str, Any]] | None = None,
         every: Timer | float | None = None,
         trigger_mode: Literal["once", "multiple", "always_last"] | None = None,
         js: str | None = None,
-        concurrency_limit: int | None | Literal["default"] = "default",
+        concurrency_limit: int | None | Literal["default", "auto"] = "default",
         concurrency_id: str | None = None,
         show_api: bool = True,
+        priority: int = 0,
+        backpressure: Literal["buffer", "latest"] = "buffer",
+        max_threads: int | None = None,
+        executor: Literal["thread", "process"] | ProcessPool = "thread",
+        cache: bool | ResultCache = False,
+        coalesce: bool = False,
     {% for arg in event.event_specific_args %}
         {{ arg.name }}: {{ arg.type }},
     {% endfor %}
@@ -52,17 +61,24 @@ INTERFACE_TEMPLATE = '''
             scroll_to_output: if True, will scroll to output component on completion
             show_progress: how to show the progress animation while event is running: "full" shows a spinner which covers the output component area as well as a runtime display in the upper right corner, "minimal" only shows the runtime display, "hidden" shows no progress animation at all
             queue: if True, will place the request on the queue, if the queue has been enabled. If False, will not put this event on the queue, even if the queue has been enabled. If None, will use the queue setting of the gradio app.
-            batch: if True, then the function should process a batch of inputs, meaning that it should accept a list of input values for each parameter. The lists should be of equal length (and be up to length `max_batch_size`). The function is then *required* to return a tuple of lists (even if there is only 1 output component), with each list in the tuple corresponding to one output component.
+            batch: if True, then the function should process a batch of inputs, meaning that it should accept a list of input values for each parameter. The lists should be of equal length (and be up to length `max_batch_size`). The function is then *required* to return a tuple of lists (even if there is only 1 output component), with each list in the tuple corresponding to one output component. If the function is a generator, it can yield `gr.FINISHED` in place of the output values of an item in the batch to finish that item's event early, while the rest of the batch keeps generating.
             max_batch_size: maximum number of inputs to batch together if this is called from the queue (only relevant if batch=True)
+            max_batch_wait: maximum number of seconds to hold a batch open for more events before running it (only relevant if batch=True). The actual wait adapts to how often events arrive and how long the function takes, and is never longer than this value. If 0, batches are run with whichever events are already queued.
             preprocess: if False, will not run preprocessing of component data before running 'fn' (e.g. leaving it as a base64 string if this method is called with the `Image` component).
             postprocess: if False, will not run postprocessing of component data before returning 'fn' output to the browser.
             cancels: a list of other events to cancel when this listener is triggered. For example, setting cancels=[click_event] will cancel the click_event, where click_event is the return value of another components .click method. Functions that have not yet run (or generators that are iterating) will be cancelled, but functions that are currently running will be allowed to finish.
             every: continously calls `value` to recalculate it if `value` is a function (has no effect otherwise). Can provide a Timer whose tick resets `value`, or a float that provides the regular interval for the reset Timer.
             trigger_mode: if "once" (default for all events except `.change()`) would not allow any submissions while an event is pending. If set to "multiple", unlimited submissions are allowed while pending, and "always_last" (default for `.change()` and `.key_up()` events) would allow a second submission after the pending event is complete.
             js: optional frontend js method to run before running 'fn'. Input arguments for js method are values of 'inputs' and 'outputs', return should be a list of values for output components.
-            concurrency_limit: if set, this is the maximum number of this event that can be running simultaneously. Can be set to None to mean no concurrency_limit (any number of this event can be running simultaneously). Set to "default" to use the default concurrency limit (defined by the `default_concurrency_limit` parameter in `Blocks.queue()`, which itself is 1 by default).
+            concurrency_limit: if set, this is the maximum number of this event that can be running simultaneously. Can be set to None to mean no concurrency_limit (any number of this event can be running simultaneously). Set to "default" to use the default concurrency limit (defined by the `default_concurrency_limit` parameter in `Blocks.queue()`, which itself is 1 by default). Set to "auto" to have the limit adjusted at runtime, between 1 and the `max_threads` of `launch()`, to get the most throughput without letting the latency of this event grow.
             concurrency_id: if set, this is the id of the concurrency group. Events with the same concurrency_id will be limited by the lowest set concurrency_limit.
             show_api: whether to show this event in the "view API" page of the Gradio app, or in the ".view_api()" method of the Gradio clients. Unlike setting api_name to False, setting show_api to False will still allow downstream apps as well as the Clients to use this event. If fn is None, show_api will automatically be set to False.
+            priority: if set, queued events of this listener with a higher priority are run before queued events with a lower priority, whatever the `scheduling` policy set in `Blocks.queue()`. Defaults to 0.
+            backpressure: how the outputs of a generator are sent to a client that reads them slower than they are generated. "buffer" sends every output. "latest" merges the outputs that the client has not read yet into one, so that a slow client only gets the latest value once it catches up, and the memory used for it stays bounded. Use "latest" when only the current value matters, e.g. for a chatbot that streams its response. Does not apply to streaming listeners (`stream_every`). Defaults to "buffer".
+            max_threads: if set, synchronous calls of this listener run in a dedicated pool of this many threads, shared with the other listeners that have the same `concurrency_id`, instead of the pool shared by the whole app (whose size is set by `max_threads` in `launch()`). This way, a slow listener cannot take every thread away from the rest of the app. The number of events of this listener that run at the same time is also capped at this value. Defaults to None.
+            executor: if "thread" (default), synchronous functions are run in a thread of the server. If "process", they are run in a pool of worker processes shared by all such listeners of the app (see `gr.ProcessPool`), which lets CPU-bound Python functions run in parallel instead of being serialized on the GIL. Can also be set to a `gr.ProcessPool` to use that pool. The function, its inputs and its outputs must be picklable. Async functions are always run in the event loop.
+            cache: if True, or set to a `gr.ResultCache`, the outputs of this listener are cached, keyed on its preprocessed inputs, so that calls with the same inputs as an earlier call skip both the function and the postprocessing of its outputs. Only use this for functions whose output depends only on their inputs. Not supported for batched or streaming listeners, for listeners with `gr.State` among their inputs or outputs, or for functions that take event data, a `gr.Request` or an OAuth profile or token. Defaults to False.
+            coalesce: if True, identical calls to this listener (same inputs, and no `gr.State` among its inputs or outputs) that are queued or running at the same time are run only once, and the result is sent to every caller. Only use this for functions whose output depends only on their inputs. Not supported for batched or streaming listeners. Defaults to False.
         {% for arg in event.event_specific_args %}
             {{ arg.name }}: {{ arg.doc }},
         {% endfor %}
@@ -1,6 +1,7 @@
 from gradio.components.annotated_image import AnnotatedImage
 from gradio.components.audio import Audio
 from gradio.components.base import (
+    FINISHED,
     Component,
     FormComponent,
     StreamingInput,
@@ -68,6 +69,7 @@ __all__ = [
     "component",
     "get_component_instance",
     "_Keywords",
+    "FINISHED",
     "Checkbox",
     "CheckboxGroup",
     "Code",
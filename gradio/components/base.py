@@ -47,6 +47,12 @@ class _Keywords(Enum):
     FINISHED_ITERATING = "FINISHED_ITERATING"  # Used to skip processing of a component's value (needed for generators + state)
 
 
+# A batched generator can yield FINISHED in place of the output values of an item in the
+# batch, to finish the event of that item with its last outputs, while the generator keeps
+# running for the rest of the batch.
+FINISHED = _Keywords.FINISHED_ITERATING
+
+
 class ComponentBase(ABC, metaclass=ComponentMeta):
     EVENTS: list[EventListener | str] = []
 
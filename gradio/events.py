@@ -22,6 +22,8 @@ from gradio.data_classes import FileData, FileDataDict
 if TYPE_CHECKING:
     from gradio.blocks import Block, BlockContext, Component
     from gradio.components import Timer
+    from gradio.process_pool import ProcessPool
+    from gradio.result_cache import ResultCache
 
 from gradio.context import get_blocks_context
 from gradio.utils import get_cancelled_fn_indices
@@ -395,7 +397,7 @@ if TYPE_CHECKING:
             Union[float, None],
             Union[Literal["once", "multiple", "always_last"], None],
             Union[str, None],
-            Union[int, None, Literal["default"]],
+            Union[int, None, Literal["default", "auto"]],
             Union[str, None],
             bool,
         ],
@@ -493,17 +495,24 @@ class EventListener(str):
             queue: bool = True,
             batch: bool = False,
             max_batch_size: int = 4,
+            max_batch_wait: float = 0,
             preprocess: bool = True,
             postprocess: bool = True,
             cancels: dict[str, Any] | list[dict[str, Any]] | None = None,
             trigger_mode: Literal["once", "multiple", "always_last"] | None = None,
             js: str | None = None,
-            concurrency_limit: int | None | Literal["default"] = "default",
+            concurrency_limit: int | None | Literal["default", "auto"] = "default",
             concurrency_id: str | None = None,
             show_api: bool = True,
             time_limit: int | None = None,
             stream_every: float = 0.5,
             like_user_message: bool = False,
+            priority: int = 0,
+            backpressure: Literal["buffer", "latest"] = "buffer",
+            max_threads: int | None = None,
+            executor: Literal["thread", "process"] | ProcessPool = "thread",
+            cache: bool | ResultCache = False,
+            coalesce: bool = False,
         ) -> Dependency:
             """
             Parameters:
@@ -514,16 +523,23 @@ class EventListener(str):
                 scroll_to_output: If True, will scroll to output component on completion
                 show_progress: how to show the progress animation while event is running: "full" shows a spinner which covers the output component area as well as a runtime display in the upper right corner, "minimal" only shows the runtime display, "hidden" shows no progress animation at all
                 queue: If True, will place the request on the queue, if the queue has been enabled. If False, will not put this event on the queue, even if the queue has been enabled. If None, will use the queue setting of the gradio app.
-                batch: If True, then the function should process a batch of inputs, meaning that it should accept a list of input values for each parameter. The lists should be of equal length (and be up to length `max_batch_size`). The function is then *required* to return a tuple of lists (even if there is only 1 output component), with each list in the tuple corresponding to one output component.
+                batch: If True, then the function should process a batch of inputs, meaning that it should accept a list of input values for each parameter. The lists should be of equal length (and be up to length `max_batch_size`). The function is then *required* to return a tuple of lists (even if there is only 1 output component), with each list in the tuple corresponding to one output component. If the function is a generator, it can yield `gr.FINISHED` in place of the output values of an item in the batch to finish that item's event early, while the rest of the batch keeps generating.
                 max_batch_size: Maximum number of inputs to batch together if this is called from the queue (only relevant if batch=True)
+                max_batch_wait: Maximum number of seconds to hold a batch open for more events before running it (only relevant if batch=True). The actual wait adapts to how often events arrive and how long the function takes, and is never longer than this value. If 0, batches are run with whichever events are already queued.
                 preprocess: If False, will not run preprocessing of component data before running 'fn' (e.g. leaving it as a base64 string if this method is called with the `Image` component).
                 postprocess: If False, will not run postprocessing of component data before returning 'fn' output to the browser.
                 cancels: A list of other events to cancel when this listener is triggered. For example, setting cancels=[click_event] will cancel the click_event, where click_event is the return value of another components .click method. Functions that have not yet run (or generators that are iterating) will be cancelled, but functions that are currently running will be allowed to finish.
                 trigger_mode: If "once" (default for all events except `.change()`) would not allow any submissions while an event is pending. If set to "multiple", unlimited submissions are allowed while pending, and "always_last" (default for `.change()` and `.key_up()` events) would allow a second submission after the pending event is complete.
                 js: Optional frontend js method to run before running 'fn'. Input arguments for js method are values of 'inputs' and 'outputs', return should be a list of values for output components.
-                concurrency_limit: If set, this is the maximum number of this event that can be running simultaneously. Can be set to None to mean no concurrency_limit (any number of this event can be running simultaneously). Set to "default" to use the default concurrency limit (defined by the `default_concurrency_limit` parameter in `Blocks.queue()`, which itself is 1 by default).
+                concurrency_limit: If set, this is the maximum number of this event that can be running simultaneously. Can be set to None to mean no concurrency_limit (any number of this event can be running simultaneously). Set to "default" to use the default concurrency limit (defined by the `default_concurrency_limit` parameter in `Blocks.queue()`, which itself is 1 by default). Set to "auto" to have the limit adjusted at runtime, between 1 and the `max_threads` of `launch()`, to get the most throughput without letting the latency of this event grow.
                 concurrency_id: If set, this is the id of the concurrency group. Events with the same concurrency_id will be limited by the lowest set concurrency_limit.
                 show_api: whether to show this event in the "view API" page of the Gradio app, or in the ".view_api()" method of the Gradio clients. Unlike setting api_name to False, setting show_api to False will still allow downstream apps as well as the Clients to use this event. If fn is None, show_api will automatically be set to False.
+                priority: If set, queued events of this listener with a higher priority are run before queued events with a lower priority, whatever the `scheduling` policy set in `Blocks.queue()`. Defaults to 0.
+                backpressure: How the outputs of a generator are sent to a client that reads them slower than they are generated. "buffer" sends every output. "latest" merges the outputs that the client has not read yet into one, so that a slow client only gets the latest value once it catches up, and the memory used for it stays bounded. Use "latest" when only the current value matters, e.g. for a chatbot that streams its response. Does not apply to streaming listeners (`stream_every`). Defaults to "buffer".
+                max_threads: If set, synchronous calls of this listener run in a dedicated pool of this many threads, shared with the other listeners that have the same `concurrency_id`, instead of the pool shared by the whole app (whose size is set by `max_threads` in `launch()`). This way, a slow listener cannot take every thread away from the rest of the app. The number of events of this listener that run at the same time is also capped at this value. Defaults to None.
+                executor: If "thread" (default), synchronous functions are run in a thread of the server. If "process", they are run in a pool of worker processes shared by all such listeners of the app (see `gr.ProcessPool`), which lets CPU-bound Python functions run in parallel instead of being serialized on the GIL. Can also be set to a `gr.ProcessPool` to use that pool. The function, its inputs and its outputs must be picklable. Async functions are always run in the event loop.
+                cache: If True, or set to a `gr.ResultCache`, the outputs of this listener are cached, keyed on its preprocessed inputs, so that calls with the same inputs as an earlier call skip both the function and the postprocessing of its outputs. Only use this for functions whose output depends only on their inputs. Not supported for batched or streaming listeners, for listeners with `gr.State` among their inputs or outputs, or for functions that take event data, a `gr.Request` or an OAuth profile or token. Defaults to False.
+                coalesce: If True, identical calls to this listener (same inputs, and no `gr.State` among its inputs or outputs) that are queued or running at the same time are run only once, and the result is sent to every caller. Only use this for functions whose output depends only on their inputs. Not supported for batched or streaming listeners. Defaults to False.
             """
 
             if fn == "decorator":
@@ -540,6 +556,7 @@ class EventListener(str):
                         queue=queue,
                         batch=batch,
                         max_batch_size=max_batch_size,
+                        max_batch_wait=max_batch_wait,
                         preprocess=preprocess,
                         postprocess=postprocess,
                         cancels=cancels,
@@ -548,6 +565,12 @@ class EventListener(str):
                         concurrency_limit=concurrency_limit,
                         concurrency_id=concurrency_id,
                         show_api=show_api,
+                        priority=priority,
+                        backpressure=backpressure,
+                        max_threads=max_threads,
+                        executor=executor,
+                        cache=cache,
+                        coalesce=coalesce,
                     )
 
                     @wraps(func)
@@ -591,6 +614,7 @@ class EventListener(str):
                 queue=queue,
                 batch=batch,
                 max_batch_size=max_batch_size,
+                max_batch_wait=max_batch_wait,
                 trigger_after=_trigger_after,
                 trigger_only_on_success=_trigger_only_on_success,
                 trigger_mode=trigger_mode,
@@ -599,6 +623,12 @@ class EventListener(str):
                 time_limit=time_limit,
                 stream_every=stream_every,
                 like_user_message=like_user_message,
+                priority=priority,
+                backpressure=backpressure,
+                max_threads=max_threads,
+                executor=executor,
+                cache=cache,
+                coalesce=coalesce,
                 event_specific_args=[
                     d["name"]
                     for d in _event_specific_args
@@ -642,14 +672,21 @@ def on(
     queue: bool = True,
     batch: bool = False,
     max_batch_size: int = 4,
+    max_batch_wait: float = 0,
     preprocess: bool = True,
     postprocess: bool = True,
     cancels: dict[str, Any] | list[dict[str, Any]] | None = None,
     trigger_mode: Literal["once", "multiple", "always_last"] | None = None,
     js: str | None = None,
-    concurrency_limit: int | None | Literal["default"] = "default",
+    concurrency_limit: int | None | Literal["default", "auto"] = "default",
     concurrency_id: str | None = None,
     show_api: bool = True,
+    priority: int = 0,
+    backpressure: Literal["buffer", "latest"] = "buffer",
+    max_threads: int | None = None,
+    executor: Literal["thread", "process"] | ProcessPool = "thread",
+    cache: bool | ResultCache = False,
+    coalesce: bool = False,
 ) -> Dependency:
     """
     Sets up an event listener that triggers a function when the specified event(s) occur. This is especially
@@ -665,16 +702,23 @@ def on(
         scroll_to_output: If True, will scroll to output component on completion
         show_progress: how to show the progress animation while event is running: "full" shows a spinner which covers the output component area as well as a runtime display in the upper right corner, "minimal" only shows the runtime display, "hidden" shows no progress animation at all
         queue: If True, will place the request on the queue, if the queue has been enabled. If False, will not put this event on the queue, even if the queue has been enabled. If None, will use the queue setting of the gradio app.
-        batch: If True, then the function should process a batch of inputs, meaning that it should accept a list of input values for each parameter. The lists should be of equal length (and be up to length `max_batch_size`). The function is then *required* to return a tuple of lists (even if there is only 1 output component), with each list in the tuple corresponding to one output component.
+        batch: If True, then the function should process a batch of inputs, meaning that it should accept a list of input values for each parameter. The lists should be of equal length (and be up to length `max_batch_size`). The function is then *required* to return a tuple of lists (even if there is only 1 output component), with each list in the tuple corresponding to one output component. If the function is a generator, it can yield `gr.FINISHED` in place of the output values of an item in the batch to finish that item's event early, while the rest of the batch keeps generating.
         max_batch_size: Maximum number of inputs to batch together if this is called from the queue (only relevant if batch=True)
+        max_batch_wait: Maximum number of seconds to hold a batch open for more events before running it (only relevant if batch=True). The actual wait adapts to how often events arrive and how long the function takes, and is never longer than this value. If 0, batches are run with whichever events are already queued.
         preprocess: If False, will not run preprocessing of component data before running 'fn' (e.g. leaving it as a base64 string if this method is called with the `Image` component).
         postprocess: If False, will not run postprocessing of component data before returning 'fn' output to the browser.
         cancels: A list of other events to cancel when this listener is triggered. For example, setting cancels=[click_event] will cancel the click_event, where click_event is the return value of another components .click method. Functions that have not yet run (or generators that are iterating) will be cancelled, but functions that are currently running will be allowed to finish.
         trigger_mode: If "once" (default for all events except `.change()`) would not allow any submissions while an event is pending. If set to "multiple", unlimited submissions are allowed while pending, and "always_last" (default for `.change()` and `.key_up()` events) would allow a second submission after the pending event is complete.
         js: Optional frontend js method to run before running 'fn'. Input arguments for js method are values of 'inputs', return should be a list of values for output components.
-        concurrency_limit: If set, this is the maximum number of this event that can be running simultaneously. Can be set to None to mean no concurrency_limit (any number of this event can be running simultaneously). Set to "default" to use the default concurrency limit (defined by the `default_concurrency_limit` parameter in `Blocks.queue()`, which itself is 1 by default).
+        concurrency_limit: If set, this is the maximum number of this event that can be running simultaneously. Can be set to None to mean no concurrency_limit (any number of this event can be running simultaneously). Set to "default" to use the default concurrency limit (defined by the `default_concurrency_limit` parameter in `Blocks.queue()`, which itself is 1 by default). Set to "auto" to have the limit adjusted at runtime, between 1 and the `max_threads` of `launch()`, to get the most throughput without letting the latency of this event grow.
         concurrency_id: If set, this is the id of the concurrency group. Events with the same concurrency_id will be limited by the lowest set concurrency_limit.
         show_api: whether to show this event in the "view API" page of the Gradio app, or in the ".view_api()" method of the Gradio clients. Unlike setting api_name to False, setting show_api to False will still allow downstream apps as well as the Clients to use this event. If fn is None, show_api will automatically be set to False.
+        priority: If set, queued events of this listener with a higher priority are run before queued events with a lower priority, whatever the `scheduling` policy set in `Blocks.queue()`. Defaults to 0.
+        backpressure: How the outputs of a generator are sent to a client that reads them slower than they are generated. "buffer" sends every output. "latest" merges the outputs that the client has not read yet into one, so that a slow client only gets the latest value once it catches up, and the memory used for it stays bounded. Use "latest" when only the current value matters, e.g. for a chatbot that streams its response. Does not apply to streaming listeners (`stream_every`). Defaults to "buffer".
+        max_threads: If set, synchronous calls of this listener run in a dedicated pool of this many threads, shared with the other listeners that have the same `concurrency_id`, instead of the pool shared by the whole app (whose size is set by `max_threads` in `launch()`). This way, a slow listener cannot take every thread away from the rest of the app. The number of events of this listener that run at the same time is also capped at this value. Defaults to None.
+        executor: If "thread" (default), synchronous functions are run in a thread of the server. If "process", they are run in a pool of worker processes shared by all such listeners of the app (see `gr.ProcessPool`), which lets CPU-bound Python functions run in parallel instead of being serialized on the GIL. Can also be set to a `gr.ProcessPool` to use that pool. The function, its inputs and its outputs must be picklable. Async functions are always run in the event loop.
+        cache: If True, or set to a `gr.ResultCache`, the outputs of this listener are cached, keyed on its preprocessed inputs, so that calls with the same inputs as an earlier call skip both the function and the postprocessing of its outputs. Only use this for functions whose output depends only on their inputs. Not supported for batched or streaming listeners, for listeners with `gr.State` among their inputs or outputs, or for functions that take event data, a `gr.Request` or an OAuth profile or token. Defaults to False.
+        coalesce: If True, identical calls to this listener (same inputs, and no `gr.State` among its inputs or outputs) that are queued or running at the same time are run only once, and the result is sent to every caller. Only use this for functions whose output depends only on their inputs. Not supported for batched or streaming listeners. Defaults to False.
     Example:
         import gradio as gr
         with gr.Blocks() as demo:
@@ -713,6 +757,7 @@ def on(
                 queue=queue,
                 batch=batch,
                 max_batch_size=max_batch_size,
+                max_batch_wait=max_batch_wait,
                 preprocess=preprocess,
                 postprocess=postprocess,
                 cancels=cancels,
@@ -721,6 +766,12 @@ def on(
                 concurrency_id=concurrency_id,
                 show_api=show_api,
                 trigger_mode=trigger_mode,
+                priority=priority,
+                backpressure=backpressure,
+                max_threads=max_threads,
+                executor=executor,
+                cache=cache,
+                coalesce=coalesce,
             )
 
             @wraps(func)
@@ -766,8 +817,15 @@ def on(
         queue=queue,
         batch=batch,
         max_batch_size=max_batch_size,
+        max_batch_wait=max_batch_wait,
         show_api=show_api,
         trigger_mode=trigger_mode,
+        priority=priority,
+        backpressure=backpressure,
+        max_threads=max_threads,
+        executor=executor,
+        cache=cache,
+        coalesce=coalesce,
     )
     set_cancel_events(methods, cancels)
     return Dependency(None, dep.get_config(), dep_index, fn)
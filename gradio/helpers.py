@@ -880,6 +880,20 @@ def create_tracker(fn, track_tqdm):
     )
 
 
+def get_request_arg_type(type_hint: Any) -> type | None:
+    """
+    Returns the type of the value that is passed to a parameter of an event listener annotated with `type_hint`, if it
+    depends on the request: routes.Request, oauth.OAuthProfile or oauth.OAuthToken (whether optional or not). Returns
+    None otherwise.
+    Parameters:
+        type_hint: the annotation of the parameter.
+    """
+    for arg_type in (routes.Request, oauth.OAuthProfile, oauth.OAuthToken):
+        if type_hint in (arg_type, Optional[arg_type]):
+            return arg_type
+    return None
+
+
 def special_args(
     fn: Callable,
     inputs: list[Any] | None = None,
@@ -911,19 +925,15 @@ def special_args(
     event_data_index = None
     for i, param in enumerate(positional_args):
         type_hint = type_hints.get(param.name)
+        request_arg_type = get_request_arg_type(type_hint)
         if isinstance(param.default, Progress):
             progress_index = i
             if inputs is not None:
                 inputs.insert(i, param.default)
-        elif type_hint in (routes.Request, Optional[routes.Request]):
+        elif request_arg_type is routes.Request:
             if inputs is not None:
                 inputs.insert(i, request)
-        elif type_hint in (
-            oauth.OAuthProfile | None,
-            oauth.OAuthToken | None,
-            oauth.OAuthProfile,
-            oauth.OAuthToken,
-        ):
+        elif request_arg_type is not None:
             if inputs is not None:
                 # Retrieve session from gr.Request, if it exists (i.e. if user is logged in)
                 session = (
@@ -935,7 +945,7 @@ def special_args(
                 )
 
                 # Inject user profile
-                if type_hint in (Optional[oauth.OAuthProfile], oauth.OAuthProfile):
+                if request_arg_type is oauth.OAuthProfile:
                     oauth_profile = (
                         session["oauth_info"]["userinfo"]
                         if "oauth_info" in session
@@ -950,7 +960,7 @@ def special_args(
                     inputs.insert(i, oauth_profile)
 
                 # Inject user token
-                elif type_hint in (Optional[oauth.OAuthToken], oauth.OAuthToken):
+                else:
                     oauth_info = session.get("oauth_info", None)
                     oauth_token = (
                         oauth.OAuthToken(
@@ -991,6 +1001,26 @@ def special_args(
     return inputs or [], progress_index, event_data_index
 
 
+def uses_request(fn: Callable) -> bool:
+    """
+    Checks if function has special arguments that depend on the user calling it, i.e. Request, OAuthProfile or
+    OAuthToken (via annotation).
+    Parameters:
+        fn: function to check.
+    """
+    try:
+        signature = inspect.signature(fn)
+    except ValueError:
+        return False
+    type_hints = utils.get_type_hints(fn)
+    for param in signature.parameters.values():
+        if param.kind not in (param.POSITIONAL_ONLY, param.POSITIONAL_OR_KEYWORD):
+            break
+        if get_request_arg_type(type_hints.get(param.name)) is not None:
+            return True
+    return False
+
+
 def update(
     elem_id: str | None = None,
     elem_classes: list[str] | str | None = None,
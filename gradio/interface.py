@@ -38,6 +38,8 @@ if TYPE_CHECKING:  # Only import for type checking (is False at runtime).
     from diffusers import DiffusionPipeline  # type: ignore
     from transformers.pipelines.base import Pipeline
 
+    from gradio.result_cache import ResultCache
+
 
 @document("launch", "load", "from_pipeline", "integrate", "queue")
 class Interface(Blocks):
@@ -121,10 +123,12 @@ class Interface(Blocks):
         analytics_enabled: bool | None = None,
         batch: bool = False,
         max_batch_size: int = 4,
+        max_batch_wait: float = 0,
         api_name: str | Literal[False] | None = "predict",
         _api_mode: bool = False,
         allow_duplication: bool = False,
-        concurrency_limit: int | None | Literal["default"] = "default",
+        concurrency_limit: int | None | Literal["default", "auto"] = "default",
+        cache: bool | ResultCache = False,
         css: str | None = None,
         css_paths: str | Path | Sequence[str | Path] | None = None,
         js: str | None = None,
@@ -163,11 +167,13 @@ class Interface(Blocks):
             flagging_dir: path to the the directory where flagged data is stored. If the directory does not exist, it will be created.
             flagging_callback: either None or an instance of a subclass of FlaggingCallback which will be called when a sample is flagged. If set to None, an instance of gradio.flagging.CSVLogger will be created and logs will be saved to a local CSV file in flagging_dir. Default to None.
             analytics_enabled: whether to allow basic telemetry. If None, will use GRADIO_ANALYTICS_ENABLED environment variable if defined, or default to True.
-            batch: if True, then the function should process a batch of inputs, meaning that it should accept a list of input values for each parameter. The lists should be of equal length (and be up to length `max_batch_size`). The function is then *required* to return a tuple of lists (even if there is only 1 output component), with each list in the tuple corresponding to one output component.
+            batch: if True, then the function should process a batch of inputs, meaning that it should accept a list of input values for each parameter. The lists should be of equal length (and be up to length `max_batch_size`). The function is then *required* to return a tuple of lists (even if there is only 1 output component), with each list in the tuple corresponding to one output component. If the function is a generator, it can yield `gr.FINISHED` in place of the output values of an item in the batch to finish that item's event early, while the rest of the batch keeps generating.
             max_batch_size: the maximum number of inputs to batch together if this is called from the queue (only relevant if batch=True)
+            max_batch_wait: the maximum number of seconds to hold a batch open for more events before running it (only relevant if batch=True). The actual wait adapts to how often events arrive and how long the function takes, and is never longer than this value. If 0, batches are run with whichever events are already queued.
             api_name: defines how the endpoint appears in the API docs. Can be a string, None, or False. If set to a string, the endpoint will be exposed in the API docs with the given name. If None, the name of the prediction function will be used as the API endpoint. If False, the endpoint will not be exposed in the API docs and downstream apps (including those that `gr.load` this app) will not be able to use this event.
             allow_duplication: if True, then will show a 'Duplicate Spaces' button on Hugging Face Spaces.
-            concurrency_limit: if set, this is the maximum number of this event that can be running simultaneously. Can be set to None to mean no concurrency_limit (any number of this event can be running simultaneously). Set to "default" to use the default concurrency limit (defined by the `default_concurrency_limit` parameter in `.queue()`, which itself is 1 by default).
+            concurrency_limit: if set, this is the maximum number of this event that can be running simultaneously. Can be set to None to mean no concurrency_limit (any number of this event can be running simultaneously). Set to "default" to use the default concurrency limit (defined by the `default_concurrency_limit` parameter in `.queue()`, which itself is 1 by default). Set to "auto" to have the limit adjusted at runtime, between 1 and the `max_threads` of `launch()`, to get the most throughput without letting the latency of this event grow.
+            cache: if True, or set to a `gr.ResultCache`, the outputs of `fn` are cached, keyed on its preprocessed inputs, so that calls with the same inputs as an earlier call skip both `fn` and the postprocessing of its outputs. Only use this if the output of `fn` depends only on its inputs. Not supported if `batch` is True, if `fn` is a generator, or if it takes event data, a `gr.Request` or an OAuth profile or token.
             css: Custom css as a code string. This css will be included in the demo webpage.
             css_paths: Custom css as a pathlib.Path to a css file or a list of such paths. This css files will be read, concatenated, and included in the demo webpage. If the `css` parameter is also set, the css from `css` will be included first.
             js: Custom js as a code string. The custom js should be in the form of a single js function. This function will automatically be executed when the page loads. For more flexibility, use the head parameter to insert js inside <script> tags.
@@ -429,8 +435,12 @@ class Interface(Blocks):
 
         self.batch = batch
         self.max_batch_size = max_batch_size
+        self.max_batch_wait = max_batch_wait
         self.allow_duplication = allow_duplication
-        self.concurrency_limit: int | None | Literal["default"] = concurrency_limit
+        self.concurrency_limit: int | None | Literal["default", "auto"] = (
+            concurrency_limit
+        )
+        self.cache = cache
 
         self.share = None
         self.share_url = None
@@ -683,6 +693,8 @@ class Interface(Blocks):
                     postprocess=not (self.api_mode),
                     batch=self.batch,
                     max_batch_size=self.max_batch_size,
+                    max_batch_wait=self.max_batch_wait,
+                    cache=self.cache,
                 )
             else:
                 events: list[Callable] = []
@@ -702,6 +714,7 @@ class Interface(Blocks):
                     preprocess=not (self.api_mode),
                     postprocess=not (self.api_mode),
                     show_progress="hidden" if streaming_event else self.show_progress,
+                    cache=self.cache,
                     trigger_mode="always_last",
                 )
         else:
@@ -744,7 +757,9 @@ class Interface(Blocks):
                     postprocess=not (self.api_mode),
                     batch=self.batch,
                     max_batch_size=self.max_batch_size,
+                    max_batch_wait=self.max_batch_wait,
                     concurrency_limit=self.concurrency_limit,
+                    cache=self.cache,
                     show_progress=self.show_progress,
                 )
 
@@ -777,7 +792,9 @@ class Interface(Blocks):
                     postprocess=not (self.api_mode),
                     batch=self.batch,
                     max_batch_size=self.max_batch_size,
+                    max_batch_wait=self.max_batch_wait,
                     concurrency_limit=self.concurrency_limit,
+                    cache=self.cache,
                     show_progress=self.show_progress,
                 )
 
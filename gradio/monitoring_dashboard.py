@@ -4,8 +4,9 @@ import time
 import pandas as pd
 
 import gradio as gr
+from gradio.queueing import EventAnalytics
 
-data = {"data": {}}
+data = {"data": EventAnalytics()}
 
 with gr.Blocks() as demo:
     gr.Markdown("# Monitoring Dashboard")
@@ -21,8 +22,7 @@ with gr.Blocks() as demo:
         )
         demo.load(
             lambda: gr.Dropdown(
-                choices=["All"]
-                + list({row["function"] for row in data["data"].values()})  # type: ignore
+                choices=["All"] + sorted(fn for fn in data["data"].functions if fn)
             ),
             None,
             selected_fn,
@@ -36,16 +36,17 @@ with gr.Blocks() as demo:
 
     plot = gr.BarPlot(
         x="time",
-        y="function",
+        y="count",
         color="status",
         title="Requests over Time",
         y_title="Requests",
         x_bin="1m",
-        y_aggregate="count",
+        y_aggregate="sum",
         color_map={
             "success": "#22c55e",
-            "failure": "#ef4444",
-            "pending": "#eab308",
+            "failed": "#ef4444",
+            "cancelled": "#6b7280",
+            "processing": "#eab308",
             "queued": "#3b82f6",
         },
     )
@@ -56,15 +57,22 @@ with gr.Blocks() as demo:
         outputs=[plot, unique_users, total_requests, process_time],
     )
     def gen_plot(start, end, selected_fn):
-        df = pd.DataFrame(list(data["data"].values()))
-        if selected_fn != "All":
-            df = df[df["function"] == selected_fn]
-        df = df[(df["time"] >= start) & (df["time"] <= end)]
+        analytics = data["data"]
+        function = None if selected_fn == "All" else selected_fn
+        summary = analytics.get_summary(start, end, function)
+        df = pd.DataFrame(
+            analytics.get_status_counts(start, end, function),
+            columns=["time", "function", "status", "count"],
+        )
         df["time"] = pd.to_datetime(df["time"], unit="s")
 
-        unique_users = len(df["session_hash"].unique())  # type: ignore
-        total_requests = len(df)
-        process_time = round(df["process_time"].mean(), 2)
+        unique_users = summary["unique_users"]
+        total_requests = summary["total_requests"]
+        process_time = (
+            round(summary["avg_process_time"], 2)
+            if summary["avg_process_time"] is not None
+            else None
+        )
 
         duration = end - start
         x_bin = (
@@ -74,8 +82,6 @@ with gr.Blocks() as demo:
             if duration >= 60 * 60 * 3
             else "1m"
         )
-        df = df.drop(columns=["session_hash"])  # type: ignore
-        assert isinstance(df, pd.DataFrame)  # noqa: S101
         return (
             gr.BarPlot(value=df, x_bin=x_bin, x_lim=[start, end]),
             unique_users,
@@ -85,19 +91,22 @@ with gr.Blocks() as demo:
 
 
 if __name__ == "__main__":
-    data["data"] = {}
-    for _ in range(random.randint(300, 500)):
+    analytics = EventAnalytics()
+    for event_id in range(random.randint(300, 500)):
         timedelta = random.randint(0, 60 * 60 * 24 * 3)
-        data["data"][random.randint(1, 100000)] = {
-            "time": time.time() - timedelta,
-            "status": random.choice(
-                ["success", "success", "failure"]
-                if timedelta > 30 * 60
-                else ["queued", "pending"]
-            ),
-            "function": random.choice(["predict", "chat", "chat"]),
-            "process_time": random.randint(0, 10),
-            "session_hash": str(random.randint(0, 4)),
-        }
+        analytics.add(
+            str(event_id),
+            random.choice(["predict", "chat", "chat"]),
+            str(random.randint(0, 4)),
+            timestamp=time.time() - timedelta,
+        )
+        if timedelta > 30 * 60:
+            analytics.set_process_time(str(event_id), random.randint(0, 10))
+            analytics.set_status(
+                str(event_id), random.choice(["success", "success", "failed"])
+            )
+        elif random.random() < 0.5:
+            analytics.set_status(str(event_id), "processing")
+    data["data"] = analytics
 
     demo.launch()
@@ -0,0 +1,363 @@
+from __future__ import annotations
+
+import inspect
+import multiprocessing
+import os
+import pickle
+import threading
+import traceback
+from collections.abc import Callable
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any
+
+import numpy as np
+
+
+@dataclass
+class SharedArray:
+    """A NumPy array that is passed to or from a worker process through a shared memory segment."""
+
+    name: str
+    shape: tuple[int, ...]
+    dtype: str
+
+
+def to_shared_memory(
+    value: Any, threshold: int, segments: list[shared_memory.SharedMemory]
+) -> Any:
+    """
+    Copies every NumPy array in `value` (which may be nested in lists, tuples and dicts) of at least `threshold` bytes
+    into a new shared memory segment, which is added to `segments`, and replaces it with a SharedArray, so that it does
+    not have to be pickled to be sent to another process.
+    """
+    if (
+        isinstance(value, np.ndarray)
+        and value.nbytes >= threshold
+        and not value.dtype.hasobject
+    ):
+        shm = shared_memory.SharedMemory(create=True, size=max(value.nbytes, 1))
+        segments.append(shm)
+        array = np.ndarray(value.shape, dtype=value.dtype, buffer=shm.buf)
+        array[...] = value
+        del array
+        return SharedArray(shm.name, value.shape, value.dtype.str)
+    if type(value) in (list, tuple):
+        return type(value)(to_shared_memory(v, threshold, segments) for v in value)
+    if isinstance(value, dict):
+        return {k: to_shared_memory(v, threshold, segments) for k, v in value.items()}
+    return value
+
+
+def from_shared_memory(
+    value: Any, segments: list[shared_memory.SharedMemory], copy: bool
+) -> Any:
+    """
+    Replaces every SharedArray in `value` with a NumPy array. If `copy` is False, the arrays are views of the shared
+    memory segments, which are added to `segments` and must stay open for as long as the arrays are used.
+    """
+    if isinstance(value, SharedArray):
+        shm = shared_memory.SharedMemory(name=value.name)
+        segments.append(shm)
+        array = np.ndarray(value.shape, dtype=np.dtype(value.dtype), buffer=shm.buf)
+        return array.copy() if copy else array
+    if type(value) in (list, tuple):
+        return type(value)(from_shared_memory(v, segments, copy) for v in value)
+    if isinstance(value, dict):
+        return {k: from_shared_memory(v, segments, copy) for k, v in value.items()}
+    return value
+
+
+def close_segments(segments: list[shared_memory.SharedMemory], unlink: bool):
+    for shm in segments:
+        try:
+            shm.close()
+        except BufferError:
+            # The function kept a reference to one of its input arrays, so the segment
+            # stays mapped until that reference is released
+            pass
+        if unlink:
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+    segments.clear()
+
+
+def picklable_error(error: BaseException) -> BaseException:
+    try:
+        pickle.dumps(error)
+    except Exception:
+        return RuntimeError(
+            "".join(traceback.format_exception(type(error), error, None))
+        )
+    return error
+
+
+def worker_main(conn, threshold: int):
+    """
+    The loop run by each worker process. Messages are ("call", fn, args), ("next",) to get the next value of the
+    generator returned by the last call, ("close",) to discard that generator, and ("stop",). Every message except
+    ("close",) and ("stop",) is answered with a (kind, value) tuple, where kind is "result", "generator", "stop" (the
+    generator is exhausted) or "error".
+    """
+    generator = None
+    arg_segments: list[shared_memory.SharedMemory] = []
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            return
+        kind = message[0]
+        if kind == "stop":
+            return
+        if kind == "close":
+            if generator is not None:
+                generator.close()
+                generator = None
+            close_segments(arg_segments, unlink=False)
+            continue
+        try:
+            if kind == "call":
+                args = from_shared_memory(message[2], arg_segments, copy=False)
+                result = message[1](*args)
+                del args
+                if inspect.isgenerator(result):
+                    generator = result
+                    reply = ("generator", None)
+                else:
+                    reply = ("result", result)
+                del result
+            else:
+                try:
+                    reply = ("result", next(generator))  # type: ignore
+                except StopIteration:
+                    generator = None
+                    reply = ("stop", None)
+        except BaseException as e:
+            generator = None
+            reply = ("error", picklable_error(e))
+        result_segments: list[shared_memory.SharedMemory] = []
+        try:
+            conn.send(
+                (reply[0], to_shared_memory(reply[1], threshold, result_segments))
+            )
+        except Exception as e:
+            close_segments(result_segments, unlink=True)
+            conn.send(("error", picklable_error(e)))
+        else:
+            # The segments are unlinked by the parent process once it has read them
+            close_segments(result_segments, unlink=False)
+        del reply
+        if generator is None:
+            # The input arrays are views of these segments, so they are only closed
+            # once the call (or the generator it returned) is done with them
+            close_segments(arg_segments, unlink=False)
+
+
+class Worker:
+    def __init__(self, context, threshold: int):
+        self.threshold = threshold
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=worker_main, args=(child_conn, threshold), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.calls = 0
+
+    def send(self, message: tuple):
+        self.conn.send(message)
+
+    def request(self, message: tuple) -> tuple[str, Any]:
+        self.conn.send(message)
+        try:
+            kind, value = self.conn.recv()
+        except (EOFError, OSError) as e:
+            raise RuntimeError(
+                "The worker process running the function exited unexpectedly."
+            ) from e
+        segments: list[shared_memory.SharedMemory] = []
+        value = from_shared_memory(value, segments, copy=True)
+        close_segments(segments, unlink=True)
+        return kind, value
+
+    def stop(self):
+        try:
+            self.conn.send(("stop",))
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+
+
+class ProcessGenerator:
+    """Iterates over a generator that is running in a worker process, which is reserved until the generator is done."""
+
+    def __init__(
+        self,
+        pool: ProcessPool,
+        worker: Worker,
+        segments: list[shared_memory.SharedMemory],
+    ):
+        self.pool = pool
+        self.worker: Worker | None = worker
+        self.segments = segments
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.worker is None:
+            raise StopIteration
+        try:
+            kind, value = self.worker.request(("next",))
+        except BaseException:
+            self.finish(broken=True)
+            raise
+        if kind == "result":
+            return value
+        self.finish()
+        if kind == "error":
+            raise value
+        raise StopIteration
+
+    def close(self):
+        if self.worker is not None:
+            try:
+                self.worker.send(("close",))
+            except (OSError, ValueError):
+                self.finish(broken=True)
+                return
+            self.finish()
+
+    def finish(self, broken: bool = False):
+        close_segments(self.segments, unlink=True)
+        if self.worker is not None:
+            self.pool.release(self.worker, broken=broken)
+            self.worker = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ProcessPool:
+    """
+    A pool of worker processes that runs the functions of event listeners set to `executor="process"`, so that
+    CPU-bound Python functions are not serialized on the GIL. The function, its inputs and its outputs must be
+    picklable, so the function must be defined at the top level of a module. Since workers are started with the
+    "spawn" method by default, the script that launches the app should be guarded by `if __name__ == "__main__":`.
+
+    Large NumPy arrays are passed to and from the workers through shared memory instead of being pickled. A generator
+    function runs in the same worker from its first to its last value, and that worker is not used for other calls
+    in the meantime.
+    Example:
+        import gradio as gr
+        pool = gr.ProcessPool(max_workers=4, max_calls_per_worker=50)
+        with gr.Blocks() as demo:
+            ...
+            btn.click(render, inp, out, executor=pool)
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        max_calls_per_worker: int | None = 100,
+        shared_memory_threshold: int = 64 * 1024,
+        start_method: str = "spawn",
+    ):
+        """
+        Parameters:
+            max_workers: the maximum number of worker processes. Defaults to the number of CPUs.
+            max_calls_per_worker: a worker process is replaced by a new one after running this many calls, to contain memory leaks. If None, workers are never replaced.
+            shared_memory_threshold: NumPy arrays of at least this many bytes are passed through shared memory instead of being pickled.
+            start_method: the multiprocessing start method used to start worker processes ("spawn", "forkserver" or "fork").
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_calls_per_worker = max_calls_per_worker
+        self.shared_memory_threshold = shared_memory_threshold
+        self.context = multiprocessing.get_context(start_method)
+        self.idle_workers: list[Worker] = []
+        self.num_workers = 0
+        self.condition = threading.Condition()
+        self.closed = False
+
+    def acquire(self) -> Worker:
+        with self.condition:
+            while True:
+                if self.closed:
+                    raise RuntimeError("The process pool has been closed.")
+                if self.idle_workers:
+                    return self.idle_workers.pop()
+                if self.num_workers < self.max_workers:
+                    self.num_workers += 1
+                    break
+                self.condition.wait()
+        try:
+            return Worker(self.context, self.shared_memory_threshold)
+        except BaseException:
+            with self.condition:
+                self.num_workers -= 1
+                self.condition.notify()
+            raise
+
+    def release(self, worker: Worker, broken: bool = False):
+        with self.condition:
+            retire = (
+                broken
+                or self.closed
+                or (
+                    self.max_calls_per_worker is not None
+                    and worker.calls >= self.max_calls_per_worker
+                )
+            )
+            if retire:
+                self.num_workers -= 1
+            else:
+                self.idle_workers.append(worker)
+            self.condition.notify()
+        if retire:
+            worker.stop()
+
+    def call(self, fn: Callable, *args: Any) -> Any:
+        """
+        Runs `fn(*args)` in a worker process, blocking until it returns, and returns its result. If `fn` is a
+        generator function, returns an iterator over the values it generates instead.
+        """
+        worker = self.acquire()
+        segments: list[shared_memory.SharedMemory] = []
+        try:
+            message = (
+                "call",
+                fn,
+                to_shared_memory(args, self.shared_memory_threshold, segments),
+            )
+            worker.calls += 1
+            kind, value = worker.request(message)
+        except BaseException:
+            close_segments(segments, unlink=True)
+            self.release(worker, broken=True)
+            raise
+        if kind == "generator":
+            return ProcessGenerator(self, worker, segments)
+        close_segments(segments, unlink=True)
+        self.release(worker)
+        if kind == "error":
+            raise value
+        return value
+
+    def close(self):
+        """Stops the idle worker processes. Busy worker processes are stopped once their call has finished."""
+        with self.condition:
+            self.closed = True
+            workers, self.idle_workers = self.idle_workers, []
+            self.num_workers -= len(workers)
+            self.condition.notify_all()
+        for worker in workers:
+            worker.stop()
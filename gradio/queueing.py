@@ -1,17 +1,27 @@
 from __future__ import annotations
 
 import asyncio
+import bisect
 import copy
+import hashlib
+import heapq
+import math
 import os
 import random
+import threading
 import time
 import traceback
 import uuid
-from collections import defaultdict
-from queue import Queue as ThreadQueue
-from typing import TYPE_CHECKING, Literal, cast
+from collections import Counter, OrderedDict, defaultdict, deque
+from collections.abc import Callable, Iterator
+from functools import partial
+from itertools import islice
+from queue import Empty as EmptyQueue
+from typing import TYPE_CHECKING, Any, Literal, cast
 
 import fastapi
+import orjson
+from gradio_client import utils as client_utils
 
 from gradio import route_utils, routes
 from gradio.data_classes import (
@@ -33,6 +43,7 @@ from gradio.server_messages import (
 from gradio.utils import (
     LRUCache,
     error_payload,
+    merge_diffs,
     run_coro_in_background,
     safe_get_lock,
     set_task_name,
@@ -56,6 +67,8 @@ class Event:
         self.request = request
         self.username = username
         self.concurrency_id = fn.concurrency_id
+        self.priority = fn.priority
+        self.created_at = time.monotonic()
         self.data: PredictBodyInternal | None = None
         self.progress: ProgressMessage | None = None
         self.progress_pending: bool = False
@@ -63,11 +76,27 @@ class Event:
         self.n_calls = 0
         self.run_time: float = 0
         self.signal = asyncio.Event()
+        self.last_estimation: EstimationMessage | None = None
+        self.last_estimation_time: float = 0
+        self.quota_key: str | None = None
+        self.coalesce_key: str | None = None
+        self.leader: Event | None = None
+        self.followers: list[Event] = []
+        self.sent_generating_output = False
 
     @property
     def streaming(self):
         return self.fn.connection == "stream"
 
+    @property
+    def has_listeners(self) -> bool:
+        """Whether the client of this event, or of any event coalesced with it, is still connected."""
+        return self.alive or any(follower.alive for follower in self.followers)
+
+    @property
+    def user_key(self) -> str:
+        return self.username or self.session_hash
+
     @property
     def is_finished(self):
         if not self.streaming:
@@ -77,27 +106,1097 @@ class Event:
         return self.run_time >= self.fn.time_limit
 
 
+def _add_to_index(index: dict, key, event: Event):
+    index.setdefault(key, OrderedDict())[event._id] = event
+
+
+def _remove_from_index(index: dict, key, event: Event):
+    events = index[key]
+    del events[event._id]
+    if not events:
+        del index[key]
+
+
 class EventQueue:
-    def __init__(self, concurrency_id: str, concurrency_limit: int | None):
-        self.queue: list[Event] = []
+    """
+    The pending events of a single concurrency group. Events are indexed by priority, function, session and user,
+    so that pushing an event, popping the next batch and removing events by id or session do not require scanning
+    the whole queue. Within each index, events are kept in the order in which they were pushed.
+    """
+
+    def __init__(
+        self,
+        concurrency_id: str,
+        concurrency_limit: int | None,
+        scheduling: SchedulingPolicy | None = None,
+    ):
+        self.events: dict[str, Event] = {}
+        self.events_per_priority: dict[int, OrderedDict[str, Event]] = {}
+        self.events_per_fn: dict[BlockFunction, OrderedDict[str, Event]] = {}
+        self.events_per_session: dict[str, OrderedDict[str, Event]] = {}
+        self.events_per_user: dict[str, OrderedDict[str, Event]] = {}
         self.concurrency_id = concurrency_id
         self.concurrency_limit = concurrency_limit
         self.current_concurrency = 0
         self.start_times_per_fn: defaultdict[BlockFunction, set[float]] = defaultdict(
             set
         )
+        # Set if a listener of this group sets concurrency_limit="auto"
+        self.adaptive_limit: AdaptiveConcurrencyLimit | None = None
+        # Notified of the events added to and removed from this queue
+        self.scheduling = scheduling
 
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def __iter__(self) -> Iterator[Event]:
+        """Iterates over the events in the order in which they would be run: by priority, then in push order."""
+        for priority in sorted(self.events_per_priority, reverse=True):
+            yield from self.events_per_priority[priority].values()
+
+    @property
+    def max_priority(self) -> int:
+        return max(self.events_per_priority)
+
+    def head(self, priority: int | None = None) -> Event:
+        if priority is None:
+            priority = self.max_priority
+        return next(iter(self.events_per_priority[priority].values()))
+
+    def append(self, event: Event):
+        self.events[event._id] = event
+        _add_to_index(self.events_per_priority, event.priority, event)
+        _add_to_index(self.events_per_fn, event.fn, event)
+        _add_to_index(self.events_per_session, event.session_hash, event)
+        _add_to_index(self.events_per_user, event.user_key, event)
+        if self.scheduling is not None:
+            self.scheduling.on_push(self, event)
+
+    def remove(self, event: Event) -> bool:
+        if self.events.pop(event._id, None) is None:
+            return False
+        _remove_from_index(self.events_per_priority, event.priority, event)
+        _remove_from_index(self.events_per_fn, event.fn, event)
+        _remove_from_index(self.events_per_session, event.session_hash, event)
+        _remove_from_index(self.events_per_user, event.user_key, event)
+        if self.scheduling is not None:
+            self.scheduling.on_remove(self, event)
+        return True
+
+    def remove_session(self, session_hash: str) -> list[Event]:
+        events = list(self.events_per_session.get(session_hash, {}).values())
+        for event in events:
+            self.remove(event)
+        return events
+
+    def pop_batch(self, first_event: Event | None = None) -> list[Event]:
+        """
+        Removes and returns `first_event` (by default, the event at the head of the queue). If its function is
+        batched, the earliest other events for the same function are returned with it, up to the function's
+        `max_batch_size`.
+        """
+        if first_event is None:
+            first_event = self.head()
+        block_fn = first_event.fn
+        events = [first_event]
+        if block_fn.batch:
+            events += islice(
+                (
+                    event
+                    for event in self.events_per_fn[block_fn].values()
+                    if event is not first_event
+                ),
+                block_fn.max_batch_size - 1,
+            )
+        for event in events:
+            self.remove(event)
+        return events
+
+
+class SchedulingPolicy:
+    """
+    Decides which pending event the queue runs next whenever a worker is free. Events with a higher `priority` are
+    always considered first: `select_event_queue` is given the concurrency groups that have spare capacity and
+    pending events of the highest such priority, and `select_event` picks the event to run from the chosen group.
+    Subclass this and pass an instance as the `scheduling` parameter of `Blocks.queue()` to use a custom policy.
+    """
+
+    def select(
+        self, event_queues: list[EventQueue], priority: int
+    ) -> tuple[EventQueue, Event]:
+        """Returns the concurrency group and the event to run next. Override to select both at once."""
+        event_queue = self.select_event_queue(event_queues, priority)
+        return event_queue, self.select_event(event_queue, priority)
+
+    def select_event_queue(
+        self, event_queues: list[EventQueue], priority: int
+    ) -> EventQueue:
+        raise NotImplementedError
+
+    def select_event(self, event_queue: EventQueue, priority: int) -> Event:
+        return event_queue.head(priority)
+
+    def on_push(self, event_queue: EventQueue, event: Event) -> None:
+        """Called when `event` is added to `event_queue`."""
+        pass
+
+    def on_remove(self, event_queue: EventQueue, event: Event) -> None:
+        """Called when `event` is removed from `event_queue`, whether it is about to run or was cancelled."""
+        pass
+
+    def on_dispatch(
+        self, event_queue: EventQueue, events: list[Event], cost: float
+    ) -> None:
+        """Called when `events` start running. `cost` is the expected processing time of the batch, in seconds."""
+        pass
+
+    def on_finish(self, events: list[Event]) -> None:
+        """Called when `events` have finished running, whether they succeeded or not."""
+        pass
+
+
+class RandomScheduling(SchedulingPolicy):
+    """Serves the concurrency groups in a random order, and each group in push order."""
+
+    def select_event_queue(
+        self,
+        event_queues: list[EventQueue],
+        priority: int,  # noqa: ARG002
+    ) -> EventQueue:
+        return random.choice(event_queues)
+
+
+class FIFOScheduling(SchedulingPolicy):
+    """Runs events in the order in which they were pushed, across all concurrency groups."""
+
+    def select_event_queue(
+        self, event_queues: list[EventQueue], priority: int
+    ) -> EventQueue:
+        return min(
+            event_queues, key=lambda event_queue: event_queue.head(priority).created_at
+        )
+
+
+class FairScheduling(SchedulingPolicy):
+    """
+    Weighted fair queuing across concurrency groups: while several groups have pending events, each group receives
+    a share of processing time proportional to its weight, however many events are waiting in the other groups.
+    Parameters:
+        weights: a dictionary mapping a `concurrency_id` to its weight. Groups that are not listed have a weight of 1.
+    """
+
+    def __init__(self, weights: dict[str, float] | None = None):
+        self.weights = weights or {}
+        self.virtual_time = 0.0
+        self.finish_tags: dict[str, float] = {}
+
+    def start_tag(self, concurrency_id: str) -> float:
+        return max(self.finish_tags.get(concurrency_id, 0.0), self.virtual_time)
+
+    def select_event_queue(
+        self, event_queues: list[EventQueue], priority: int
+    ) -> EventQueue:
+        return min(
+            event_queues,
+            key=lambda event_queue: (
+                self.start_tag(event_queue.concurrency_id),
+                event_queue.head(priority).created_at,
+            ),
+        )
+
+    def on_dispatch(
+        self,
+        event_queue: EventQueue,
+        events: list[Event],  # noqa: ARG002
+        cost: float,
+    ) -> None:
+        concurrency_id = event_queue.concurrency_id
+        start = self.start_tag(concurrency_id)
+        self.virtual_time = start
+        self.finish_tags[concurrency_id] = start + cost / self.weights.get(
+            concurrency_id, 1
+        )
+
+
+class UserFairScheduling(SchedulingPolicy):
+    """
+    Shares the workers fairly between users, so that a single user submitting many events cannot hold back everyone
+    else. Users are identified by their username if they are logged in, or by their session otherwise. The next
+    event is taken from the user with the fewest running events, breaking ties in favour of the user who was served
+    least recently.
+    """
 
-class ProcessTime:
     def __init__(self):
+        self.running_per_user: dict[str, int] = {}
+        self.last_served: LRUCache[str, int] = LRUCache(10000)
+        self.dispatch_count = 0
+        self.pending_per_user: dict[str, int] = {}
+        # The users with pending events, ordered by rank. An entry is outdated, and
+        # skipped, if the user's rank has changed since it was pushed, in which case
+        # a new entry was pushed for them
+        self.heap: list[tuple[int, int, int, str]] = []
+        self.rank_per_user: dict[str, tuple[int, int]] = {}
+        self.push_count = 0
+
+    def user_rank(self, user_key: str) -> tuple[int, int]:
+        return (
+            self.running_per_user.get(user_key, 0),
+            self.last_served.get(user_key, -1),
+        )
+
+    def update_rank(self, user_key: str):
+        if user_key not in self.pending_per_user:
+            return
+        rank = self.user_rank(user_key)
+        if self.rank_per_user.get(user_key) != rank:
+            self.rank_per_user[user_key] = rank
+            # Users with the same rank are served in the order in which they were pushed
+            heapq.heappush(self.heap, (*rank, self.push_count, user_key))
+            self.push_count += 1
+
+    def select(
+        self, event_queues: list[EventQueue], priority: int
+    ) -> tuple[EventQueue, Event]:
+        skipped = []
+        selected = None
+        while self.heap:
+            running, last_served, _, user_key = self.heap[0]
+            if self.rank_per_user.get(user_key) != (running, last_served):
+                heapq.heappop(self.heap)
+                continue
+            selected = self.first_event(user_key, event_queues, priority)
+            if selected is not None:
+                break
+            # The user's events are of a lower priority, or in a group that is full
+            skipped.append(heapq.heappop(self.heap))
+        for entry in skipped:
+            heapq.heappush(self.heap, entry)
+        if selected is None:
+            event_queue = min(
+                event_queues,
+                key=lambda event_queue: event_queue.head(priority).created_at,
+            )
+            return event_queue, event_queue.head(priority)
+        return selected
+
+    @staticmethod
+    def first_event(
+        user_key: str, event_queues: list[EventQueue], priority: int
+    ) -> tuple[EventQueue, Event] | None:
+        selected = None
+        for event_queue in event_queues:
+            event = next(
+                (
+                    event
+                    for event in event_queue.events_per_user.get(user_key, {}).values()
+                    if event.priority == priority
+                ),
+                None,
+            )
+            if event is not None and (
+                selected is None or event.created_at < selected[1].created_at
+            ):
+                selected = event_queue, event
+        return selected
+
+    def select_event_queue(
+        self, event_queues: list[EventQueue], priority: int
+    ) -> EventQueue:
+        return self.select(event_queues, priority)[0]
+
+    def select_event(self, event_queue: EventQueue, priority: int) -> Event:
+        return self.select([event_queue], priority)[1]
+
+    def on_push(
+        self,
+        event_queue: EventQueue,  # noqa: ARG002
+        event: Event,
+    ) -> None:
+        user_key = event.user_key
+        self.pending_per_user[user_key] = self.pending_per_user.get(user_key, 0) + 1
+        self.update_rank(user_key)
+
+    def on_remove(
+        self,
+        event_queue: EventQueue,  # noqa: ARG002
+        event: Event,
+    ) -> None:
+        user_key = event.user_key
+        pending = self.pending_per_user.get(user_key, 0) - 1
+        if pending > 0:
+            self.pending_per_user[user_key] = pending
+        else:
+            self.pending_per_user.pop(user_key, None)
+            self.rank_per_user.pop(user_key, None)
+
+    def on_dispatch(
+        self,
+        event_queue: EventQueue,  # noqa: ARG002
+        events: list[Event],
+        cost: float,  # noqa: ARG002
+    ) -> None:
+        for event in events:
+            user_key = event.user_key
+            self.running_per_user[user_key] = self.running_per_user.get(user_key, 0) + 1
+            self.last_served[user_key] = self.dispatch_count
+            self.dispatch_count += 1
+            self.update_rank(user_key)
+
+    def on_finish(self, events: list[Event]) -> None:
+        for event in events:
+            user_key = event.user_key
+            running = self.running_per_user.get(user_key, 0) - 1
+            if running > 0:
+                self.running_per_user[user_key] = running
+            else:
+                self.running_per_user.pop(user_key, None)
+            self.update_rank(user_key)
+
+
+SCHEDULING_POLICIES: dict[str, type[SchedulingPolicy]] = {
+    "random": RandomScheduling,
+    "fifo": FIFOScheduling,
+    "fair": FairScheduling,
+    "user_fair": UserFairScheduling,
+}
+
+
+class AdaptiveConcurrencyLimit:
+    """
+    Adjusts the concurrency limit of a concurrency group with additive increase, multiplicative decrease (AIMD). By
+    Little's law, the throughput of a group is its concurrency divided by its latency, so raising the limit only helps
+    while the latency does not grow with it. The baseline latency is the lowest latency seen recently. While the
+    smoothed latency stays within `tolerance` times the baseline and the group uses its whole limit, the limit grows
+    by about one for every `limit` events that finish. Once the smoothed latency rises above that, the limit is
+    multiplied by `backoff`, at most once per smoothed latency so that the events of a single episode of congestion,
+    which all finish late, only decrease it once. The limit is always between `min_limit` and `max_limit`.
+    """
+
+    def __init__(
+        self,
+        min_limit: int = 1,
+        max_limit: int = 40,
+        tolerance: float = 2.0,
+        backoff: float = 0.75,
+        smoothing: float = 0.2,
+        baseline_drift: float = 0.01,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max(min_limit, max_limit)
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.smoothing = smoothing
+        # The baseline creeps up towards the latest latencies, so that it follows
+        # lasting changes in the work done by each event
+        self.baseline_drift = baseline_drift
+        self.limit = float(min_limit)
+        self.baseline: float | None = None
+        self.recent_latency: float | None = None
+        self.last_decrease = 0.0
+
+    @property
+    def concurrency_limit(self) -> int:
+        return max(self.min_limit, min(self.max_limit, int(self.limit)))
+
+    def update(self, latency: float, concurrency: int) -> int:
+        """
+        Records the `latency` (in seconds) of an event that has finished while `concurrency` events of the group
+        (including itself) were running, and returns the new concurrency limit.
+        """
+        if self.baseline is None or latency < self.baseline:
+            self.baseline = latency
+        else:
+            self.baseline += self.baseline_drift * (latency - self.baseline)
+        if self.recent_latency is None:
+            self.recent_latency = latency
+        else:
+            self.recent_latency += self.smoothing * (latency - self.recent_latency)
+
+        if self.recent_latency > self.tolerance * self.baseline:
+            now = time.monotonic()
+            if now - self.last_decrease >= self.recent_latency:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self.last_decrease = now
+        elif concurrency >= self.concurrency_limit:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        return self.concurrency_limit
+
+
+class ProcessTime:
+    """
+    Tracks how long a function takes to process an event. Besides the all-time average, it keeps an exponentially
+    weighted moving average, which is used for ETAs, and a histogram whose counts decay by `decay` with every new
+    sample, which is used for quantiles. Both follow changes in process time (e.g. after a warmup) instead of being
+    dominated by the function's whole history. Histogram buckets grow geometrically by `bucket_ratio`, so quantiles
+    have a relative error of at most `bucket_ratio - 1`.
+    """
+
+    MIN_TIME = 0.001
+
+    def __init__(
+        self, smoothing: float = 0.1, decay: float = 0.99, bucket_ratio: float = 1.1
+    ):
+        self.smoothing = smoothing
+        self.decay = decay
+        self.bucket_ratio = bucket_ratio
         self.process_time = 0
         self.count = 0
         self.avg_time = 0
+        self.recent_avg_time: float | None = None
+        self.histogram: dict[int, float] = {}
 
     def add(self, time: float):
         self.process_time += time
         self.count += 1
         self.avg_time = self.process_time / self.count
+        if self.recent_avg_time is None:
+            self.recent_avg_time = time
+        else:
+            self.recent_avg_time += self.smoothing * (time - self.recent_avg_time)
+
+        for bucket in list(self.histogram):
+            self.histogram[bucket] *= self.decay
+            if self.histogram[bucket] < 1e-6:
+                del self.histogram[bucket]
+        bucket = (
+            int(math.log(time / self.MIN_TIME, self.bucket_ratio))
+            if time > self.MIN_TIME
+            else 0
+        )
+        self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+
+    @property
+    def estimate(self) -> float:
+        """The expected process time of the next event, in seconds."""
+        return self.avg_time if self.recent_avg_time is None else self.recent_avg_time
+
+    def quantile(self, q: float) -> float | None:
+        """Returns the `q`-quantile (0 <= q <= 1) of the recent process times, or None if there are none."""
+        total = sum(self.histogram.values())
+        if not total:
+            return None
+        cumulative = 0.0
+        for bucket in sorted(self.histogram):
+            cumulative += self.histogram[bucket]
+            if cumulative >= q * total:
+                break
+        return self.MIN_TIME * self.bucket_ratio ** (bucket + 0.5)
+
+    def get_metrics(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg_time": self.avg_time,
+            "recent_avg_time": self.recent_avg_time,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class BatchStats:
+    """
+    Tracks how often events arrive for a batched function, which is used to decide how long a batch is held open for
+    more events, and the sizes of the batches that were run.
+    """
+
+    def __init__(self, smoothing: float = 0.5):
+        self.smoothing = smoothing
+        self.last_arrival: float | None = None
+        self.interarrival_time: float | None = None
+        self.batch_size_counts: Counter[int] = Counter()
+
+    def add_arrival(self, arrival_time: float, max_interval: float | None = None):
+        """
+        Records that an event arrived at `arrival_time`. Intervals longer than `max_interval` are counted as
+        `max_interval`, so that a burst of events that follows an idle period is picked up quickly.
+        """
+        if self.last_arrival is not None:
+            delta = max(arrival_time - self.last_arrival, 0)
+            if max_interval is not None:
+                delta = min(delta, max_interval)
+            if self.interarrival_time is None:
+                self.interarrival_time = delta
+            else:
+                self.interarrival_time += self.smoothing * (
+                    delta - self.interarrival_time
+                )
+        self.last_arrival = arrival_time
+
+    def add_batch(self, size: int):
+        self.batch_size_counts[size] += 1
+
+    def wait_time(
+        self, missing: int, max_wait: float, process_time: float | None
+    ) -> float:
+        """
+        Returns how long to hold a batch that is `missing` events short of its maximum size. The batch is not held if
+        no interval between events has been seen yet, or if the next event is not expected to arrive within
+        `max_wait`. Otherwise, it is held until the batch is expected
+        to be full, but never longer than `max_wait` or than the time it takes to process a batch.
+        """
+        if self.interarrival_time is None or self.interarrival_time > max_wait:
+            return 0
+        wait = min(max_wait, missing * self.interarrival_time)
+        if process_time:
+            wait = min(wait, process_time)
+        return wait
+
+    def get_metrics(self) -> dict[str, Any]:
+        batches = sum(self.batch_size_counts.values())
+        events = sum(size * count for size, count in self.batch_size_counts.items())
+        return {
+            "batches": batches,
+            "mean_batch_size": events / batches if batches else None,
+            "batch_size_counts": dict(sorted(self.batch_size_counts.items())),
+        }
+
+
+class UniqueCounter:
+    """
+    Estimates the number of distinct values added to it in a fixed amount of memory (using HyperLogLog). Counters can
+    be merged to estimate the number of distinct values added to any of them. Small counts are close to exact, larger
+    counts have a relative error of about 3%.
+    """
+
+    PRECISION = 10
+
+    def __init__(self):
+        self.registers = bytearray(1 << self.PRECISION)
+
+    def add(self, value: str | None):
+        digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+        value_hash = int.from_bytes(digest, "big")
+        index = value_hash >> (64 - self.PRECISION)
+        remaining_bits = 64 - self.PRECISION
+        rest = value_hash & ((1 << remaining_bits) - 1)
+        rank = remaining_bits - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, other: UniqueCounter):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def __len__(self) -> int:
+        m = len(self.registers)
+        zeros = self.registers.count(0)
+        if zeros == m:
+            return 0
+        estimate = (
+            0.7213 / (1 + 1.079 / m) * m * m / sum(2.0**-r for r in self.registers)
+        )
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small counts
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+
+class FunctionStats:
+    """
+    The aggregated analytics of a single function over one time bucket.
+    """
+
+    def __init__(self):
+        self.status_counts: Counter[str] = Counter()
+        self.process_time_total = 0.0
+        self.process_time_count = 0
+        self.latency_histogram: Counter[int] = Counter()
+        self.sessions = UniqueCounter()
+
+    def add_process_time(self, process_time: float):
+        self.process_time_total += process_time
+        self.process_time_count += 1
+        self.latency_histogram[
+            bisect.bisect_left(EventAnalytics.LATENCY_BOUNDARIES, process_time)
+        ] += 1
+
+    def update(self, other: FunctionStats):
+        """Adds the analytics of `other` to these, e.g. to merge two time buckets."""
+        self.status_counts.update(other.status_counts)
+        self.process_time_total += other.process_time_total
+        self.process_time_count += other.process_time_count
+        self.latency_histogram.update(other.latency_histogram)
+        self.sessions.update(other.sessions)
+
+
+class EventAnalytics:
+    """
+    Keeps track of the events pushed to the queue for the monitoring dashboard, using a bounded amount of memory. The
+    events that are still queued or processing are kept in full, as are the most recent `max_events` finished events.
+    The status counts, process times and users of every event are also aggregated per function into time buckets of
+    `bucket_size` seconds, of which the most recent `max_buckets` are kept. Buckets that are older than `rollup_after`
+    seconds are merged into coarser buckets of `rollup_size` seconds, so that a long history does not take much more
+    memory than its first few hours.
+    """
+
+    FINISHED_STATUSES = ("success", "failed", "cancelled")
+    LATENCY_BOUNDARIES = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100)
+
+    def __init__(
+        self,
+        max_events: int = 10_000,
+        bucket_size: int = 60,
+        max_buckets: int = 7 * 24 * 60,
+        rollup_size: int = 60 * 60,
+        rollup_after: int = 3 * 60 * 60,
+    ):
+        self.bucket_size = bucket_size
+        self.max_buckets = max_buckets
+        self.rollup_size = rollup_size
+        self.rollup_after = rollup_after
+        self.active_events: dict[str, dict[str, Any]] = {}
+        self.recent_events: deque[dict[str, Any]] = deque(maxlen=max_events)
+        self.buckets: dict[int, defaultdict[str | None, FunctionStats]] = {}
+        self.rolled_up_buckets: dict[int, defaultdict[str | None, FunctionStats]] = {}
+        self.latest_bucket: int | None = None
+        self.functions: set[str | None] = set()
+
+    def __len__(self) -> int:
+        return len(self.active_events) + len(self.recent_events)
+
+    def _get_stats(self, bucket: int, function: str | None) -> FunctionStats | None:
+        if bucket in self.buckets:
+            return self.buckets[bucket][function]
+        rolled_up_bucket = bucket // self.rollup_size * self.rollup_size
+        if rolled_up_bucket in self.rolled_up_buckets:
+            return self.rolled_up_buckets[rolled_up_bucket][function]
+
+    def _add_bucket(self, bucket: int):
+        if self.latest_bucket is None or bucket > self.latest_bucket:
+            self.latest_bucket = bucket
+            self._roll_up(bucket)
+        oldest = self.latest_bucket - self.max_buckets * self.bucket_size
+        if bucket <= oldest:
+            return
+        if bucket <= self.latest_bucket - self.rollup_after:
+            self.rolled_up_buckets.setdefault(
+                bucket // self.rollup_size * self.rollup_size,
+                defaultdict(FunctionStats),
+            )
+        elif bucket not in self.buckets:
+            self.buckets[bucket] = defaultdict(FunctionStats)
+
+    def _roll_up(self, latest_bucket: int):
+        """
+        Merges the buckets that are older than `rollup_after` (relative to `latest_bucket`) into coarser buckets, and
+        deletes the buckets that are older than `max_buckets` (the coarser ones once all of their time is).
+        """
+        oldest = latest_bucket - self.max_buckets * self.bucket_size
+        threshold = max(oldest, latest_bucket - self.rollup_after)
+        for key in [key for key in self.buckets if key <= threshold]:
+            stats_per_fn = self.buckets.pop(key)
+            if key <= oldest:
+                continue
+            rolled_up = self.rolled_up_buckets.setdefault(
+                key // self.rollup_size * self.rollup_size, defaultdict(FunctionStats)
+            )
+            for function, stats in stats_per_fn.items():
+                rolled_up[function].update(stats)
+        for key in [
+            key
+            for key in self.rolled_up_buckets
+            if key + self.rollup_size <= oldest + self.bucket_size
+        ]:
+            del self.rolled_up_buckets[key]
+
+    def add(
+        self,
+        event_id: str,
+        function: str | None,
+        session_hash: str | None,
+        timestamp: float | None = None,
+    ):
+        timestamp = time.time() if timestamp is None else timestamp
+        bucket = int(timestamp // self.bucket_size) * self.bucket_size
+        self._add_bucket(bucket)
+        self.active_events[event_id] = {
+            "time": timestamp,
+            "bucket": bucket,
+            "status": "queued",
+            "process_time": None,
+            "function": function,
+            "session_hash": session_hash,
+        }
+        self.functions.add(function)
+        if stats := self._get_stats(bucket, function):
+            stats.status_counts["queued"] += 1
+            stats.sessions.add(session_hash)
+
+    def set_process_time(self, event_id: str, process_time: float):
+        if event_id in self.active_events:
+            self.active_events[event_id]["process_time"] = process_time
+
+    def set_status(self, event_id: str, status: str):
+        """
+        Updates the status of an active event. Once an event has finished, it is moved to the recent events and its
+        process time is added to the aggregates.
+        """
+        record = self.active_events.get(event_id)
+        if record is None:
+            return
+        stats = self._get_stats(record["bucket"], record["function"])
+        if stats:
+            stats.status_counts[record["status"]] -= 1
+            stats.status_counts[status] += 1
+        record["status"] = status
+        if status in self.FINISHED_STATUSES:
+            del self.active_events[event_id]
+            self.recent_events.append(record)
+            if stats and record["process_time"] is not None:
+                stats.add_process_time(record["process_time"])
+
+    def _iter_stats(
+        self, start: float, end: float, function: str | None = None
+    ) -> Iterator[tuple[int, str | None, FunctionStats]]:
+        for buckets, size in [
+            (self.rolled_up_buckets, self.rollup_size),
+            (self.buckets, self.bucket_size),
+        ]:
+            for bucket, stats_per_fn in buckets.items():
+                if bucket + size <= start or bucket > end:
+                    continue
+                for fn, stats in stats_per_fn.items():
+                    if function is None or fn == function:
+                        yield bucket, fn, stats
+
+    def get_status_counts(
+        self, start: float, end: float, function: str | None = None
+    ) -> list[dict[str, Any]]:
+        """
+        Returns the number of events per time bucket, function and status for the events created between `start` and
+        `end`, optionally only for `function`.
+        """
+        return [
+            {"time": bucket, "function": fn, "status": status, "count": count}
+            for bucket, fn, stats in self._iter_stats(start, end, function)
+            for status, count in stats.status_counts.items()
+            if count > 0
+        ]
+
+    def get_summary(
+        self, start: float, end: float, function: str | None = None
+    ) -> dict[str, Any]:
+        """
+        Returns the number of unique users, the number of requests and the average process time of the events
+        created between `start` and `end`, optionally only for `function`.
+        """
+        sessions = UniqueCounter()
+        total_requests = 0
+        process_time_total = 0.0
+        process_time_count = 0
+        for _, _, stats in self._iter_stats(start, end, function):
+            sessions.update(stats.sessions)
+            total_requests += sum(stats.status_counts.values())
+            process_time_total += stats.process_time_total
+            process_time_count += stats.process_time_count
+        return {
+            "unique_users": len(sessions),
+            "total_requests": total_requests,
+            "avg_process_time": process_time_total / process_time_count
+            if process_time_count
+            else None,
+        }
+
+    def get_latency_histogram(
+        self,
+        start: float | None = None,
+        end: float | None = None,
+        function: str | None = None,
+    ) -> dict[float, int]:
+        """
+        Returns the number of finished events per process time, keyed by the upper bound (in seconds) of each
+        histogram bucket.
+        """
+        histogram: Counter[int] = Counter()
+        for _, _, stats in self._iter_stats(
+            -math.inf if start is None else start,
+            math.inf if end is None else end,
+            function,
+        ):
+            histogram.update(stats.latency_histogram)
+        boundaries = (*self.LATENCY_BOUNDARIES, math.inf)
+        return {boundaries[index]: histogram[index] for index in sorted(histogram)}
+
+
+# Rough estimates of the memory used by a session and by a message, besides its outputs
+SESSION_OVERHEAD = 1024
+MESSAGE_OVERHEAD = 256
+
+
+class MessageChannel:
+    """
+    The messages waiting to be streamed to one session. Messages can be put from any thread (e.g. by `gr.Info()` in a
+    worker thread), while the session's stream awaits them on the event loop, so that an idle stream costs nothing
+    and a new message is delivered as soon as it is put.
+    """
+
+    def __init__(self, on_resize: Callable[[int], None] | None = None):
+        """
+        Parameters:
+            on_resize: called with the change in `nbytes` whenever a message is put or taken.
+        """
+        # [message, estimated size in bytes]
+        self.messages: deque[list] = deque()
+        # event_id -> (entry in `messages`, whether its outputs are diffs), for the unread
+        # outputs that later outputs of the same event can be merged into
+        self.latest_outputs: dict[str, tuple[list, bool]] = {}
+        self.nbytes = 0
+        self.waiters: list[asyncio.Future] = []
+        # The number of open streams that read from this channel
+        self.streams = 0
+        self.on_resize = on_resize
+        # Whether the size of outputs is estimated, which is only needed if the memory of sessions is bounded
+        self.measure_outputs = True
+        self.lock = threading.Lock()
+
+    def qsize(self) -> int:
+        return len(self.messages)
+
+    def empty(self) -> bool:
+        return not self.messages
+
+    def put_nowait(self, message: EventMessage):
+        """Adds `message` to the channel and wakes up the streams waiting for it. Can be called from any thread."""
+        size = self.message_size(message)
+        with self.lock:
+            self.messages.append([message, size])
+            self.nbytes += size
+        if self.on_resize is not None:
+            self.on_resize(size)
+        self.wake()
+
+    def put_latest(self, message: ProcessGeneratingMessage, is_diff: bool) -> bool:
+        """
+        Like `put_nowait()`, but if an output of the same event has not been read yet, `message` is merged into it
+        instead of being added, so that the channel holds at most one output per event. `is_diff` is whether the
+        outputs of `message` are diffs from the previous outputs of the event rather than full values. Returns whether
+        `message` was merged.
+        """
+        with self.lock:
+            latest = self.latest_outputs.get(cast(str, message.event_id))
+            if latest is None:
+                size = self.message_size(message)
+                entry = [message, size]
+                self.messages.append(entry)
+                self.latest_outputs[cast(str, message.event_id)] = (entry, is_diff)
+                change = size
+            else:
+                entry, latest_is_diff = latest
+                entry[0] = message.model_copy(
+                    update={
+                        "output": self.merge_outputs(
+                            entry[0].output, latest_is_diff, message.output, is_diff
+                        )
+                    }
+                )
+                self.latest_outputs[cast(str, message.event_id)] = (
+                    entry,
+                    latest_is_diff and is_diff,
+                )
+                change = self.message_size(entry[0]) - entry[1]
+                entry[1] += change
+            self.nbytes += change
+        if self.on_resize is not None:
+            self.on_resize(change)
+        self.wake()
+        return latest is not None
+
+    def get_nowait(self) -> EventMessage:
+        """Returns the oldest message in the channel, or raises `queue.Empty` if there is none."""
+        message = self.pop()
+        if message is None:
+            raise EmptyQueue
+        return message
+
+    async def get(self, timeout: float | None = None) -> EventMessage | None:
+        """
+        Returns the oldest message in the channel, waiting for one to be put if needed. Returns None if no message
+        was put within `timeout` seconds, or if the channel was woken up by `wake()` without a message.
+        """
+        while True:
+            message = self.pop()
+            if message is not None:
+                return message
+            with self.lock:
+                # A message may have been put since it was checked
+                if self.messages:
+                    continue
+                waiter = asyncio.get_running_loop().create_future()
+                self.waiters.append(waiter)
+                break
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self.lock:
+                if waiter in self.waiters:
+                    self.waiters.remove(waiter)
+        return self.pop()
+
+    def pop(self) -> EventMessage | None:
+        """Takes the oldest message in the channel, or returns None if there is none."""
+        with self.lock:
+            if not self.messages:
+                return None
+            entry = self.messages.popleft()
+            message, size = entry
+            self.nbytes -= size
+            latest = self.latest_outputs.get(cast(str, message.event_id))
+            if latest is not None and latest[0] is entry:
+                del self.latest_outputs[cast(str, message.event_id)]
+        if self.on_resize is not None:
+            self.on_resize(-size)
+        return message
+
+    def wake(self):
+        """Wakes up the streams waiting in `get()`, e.g. so that they notice that the queue has stopped. Can be called from any thread."""
+        with self.lock:
+            waiters, self.waiters = self.waiters, []
+        for waiter in waiters:
+            loop = waiter.get_loop()
+            try:
+                running_loop = asyncio.get_running_loop()
+            except RuntimeError:
+                running_loop = None
+            if running_loop is loop:
+                self.resolve(waiter)
+            else:
+                try:
+                    loop.call_soon_threadsafe(self.resolve, waiter)
+                except RuntimeError:
+                    # The loop has been closed, so nobody is waiting anymore
+                    pass
+
+    @staticmethod
+    def resolve(waiter: asyncio.Future):
+        if not waiter.done():
+            waiter.set_result(None)
+
+    @staticmethod
+    def merge_outputs(
+        output: dict[str, Any],
+        is_diff: bool,
+        new_output: dict[str, Any],
+        new_is_diff: bool,
+    ) -> dict[str, Any]:
+        """
+        Merges two consecutive outputs of a generator into one that has the same effect on the client: the latest
+        full values, or the earlier values (or diffs) followed by the diffs of `new_output`.
+        """
+        if not new_is_diff or len(output["data"]) != len(new_output["data"]):
+            return new_output
+        data = [
+            merge_diffs(value, new_value)
+            if is_diff
+            else client_utils.apply_diff(value, new_value)
+            for value, new_value in zip(output["data"], new_output["data"], strict=True)
+        ]
+        merged = {
+            **output,
+            **{key: value for key, value in new_output.items() if value is not None},
+            "data": data,
+        }
+        if output.get("changed_state_ids") and new_output.get("changed_state_ids"):
+            merged["changed_state_ids"] = list(
+                dict.fromkeys(
+                    output["changed_state_ids"] + new_output["changed_state_ids"]
+                )
+            )
+        return merged
+
+    def message_size(self, message: EventMessage) -> int:
+        """
+        Estimates the memory used by `message`, from the size of its outputs once serialized (unless
+        `measure_outputs` is False).
+        """
+        output = getattr(message, "output", None)
+        if not output or not self.measure_outputs:
+            return MESSAGE_OVERHEAD
+        try:
+            return MESSAGE_OVERHEAD + len(orjson.dumps(output, default=str))
+        except TypeError:
+            return MESSAGE_OVERHEAD
+
+
+class SessionRegistry(OrderedDict):
+    """
+    The message channels of the sessions connected to the queue, keyed by session hash. The registry is bounded by
+    the memory used by the sessions and their pending messages rather than by their number: when a session is added
+    and the registry is over `max_memory`, the least recently added sessions are evicted, skipping those that have an
+    open stream or pending events, so that an active session never loses its messages.
+    """
+
+    def __init__(
+        self,
+        max_memory: int | None = None,
+        is_active: Callable[[str], bool] | None = None,
+    ):
+        """
+        Parameters:
+            max_memory: the memory (in bytes) above which idle sessions are evicted. If None, sessions are never evicted.
+            is_active: returns whether a session has pending events, in which case it is not evicted.
+        """
+        super().__init__()
+        self.max_memory = max_memory
+        self.is_active = is_active
+        self.nbytes = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __setitem__(self, session_hash: str, channel: MessageChannel):
+        if session_hash in self:
+            self.pop(session_hash)
+        channel.on_resize = self.resize
+        channel.measure_outputs = self.max_memory is not None
+        self.resize(SESSION_OVERHEAD + channel.nbytes)
+        super().__setitem__(session_hash, channel)
+        # The new session is kept, since its stream has not been opened yet
+        self.evict(keep=session_hash)
+
+    def __delitem__(self, session_hash: str):
+        channel = self[session_hash]
+        super().__delitem__(session_hash)
+        channel.on_resize = None
+        self.resize(-SESSION_OVERHEAD - channel.nbytes)
+
+    def pop(self, session_hash: str, *default: Any) -> Any:
+        if session_hash not in self:
+            if default:
+                return default[0]
+            raise KeyError(session_hash)
+        channel = self[session_hash]
+        del self[session_hash]
+        return channel
+
+    def resize(self, nbytes: int):
+        with self.lock:
+            self.nbytes += nbytes
+
+    def evict(self, keep: str | None = None):
+        """Evicts the oldest idle sessions, except `keep`, until the registry is no longer over `max_memory`."""
+        if self.max_memory is None:
+            return
+        for session_hash in list(self):
+            if self.nbytes <= self.max_memory:
+                return
+            channel = self[session_hash]
+            if (
+                session_hash == keep
+                or channel.streams
+                or (self.is_active and self.is_active(session_hash))
+            ):
+                continue
+            del self[session_hash]
+            self.evictions += 1
+
+    def get_metrics(self) -> dict[str, Any]:
+        """Returns the number of sessions, the memory they use (in bytes) and the number of sessions evicted so far."""
+        return {
+            "sessions": len(self),
+            "memory_bytes": self.nbytes,
+            "max_memory": self.max_memory,
+            "evictions": self.evictions,
+        }
 
 
 class Queue:
@@ -109,36 +1208,73 @@ class Queue:
         max_size: int | None,
         blocks: Blocks,
         default_concurrency_limit: int | None | Literal["not_set"] = "not_set",
+        scheduling: Literal["random", "fifo", "fair", "user_fair"]
+        | SchedulingPolicy = "random",
+        max_wait: float | None = None,
+        max_events_per_user: int | None = None,
+        max_requests_per_minute: int | None = None,
+        max_session_memory: int | None = 64 * 1024 * 1024,
     ):
-        self.pending_messages_per_session: LRUCache[str, ThreadQueue[EventMessage]] = (
-            LRUCache(2000)
+        self.pending_messages_per_session = SessionRegistry(
+            max_session_memory, self.has_pending_events
         )
         self.pending_event_ids_session: dict[str, set[str]] = {}
+        self.coalesced_messages = 0
         self.event_ids_to_events: dict[str, Event] = {}
+        self.coalesce_leaders: dict[str, Event] = {}
+        self.followers_per_session: dict[str, dict[str, Event]] = {}
         self.pending_message_lock = safe_get_lock()
         self.event_queue_per_concurrency_id: dict[str, EventQueue] = {}
+        self.queue_size = 0
         self.stopped = False
         self.max_thread_count = concurrency_count
         self.update_intervals = update_intervals
+        self.estimation_interval = 0.1
+        self.min_eta_change = 1.0
+        self.pending_estimations: set[str] = set()
+        self.estimation_handle: asyncio.TimerHandle | None = None
         self.active_jobs: list[None | list[Event]] = []
+        self.active_events: dict[str, Event] = {}
+        self.pending_progress_events: set[Event] = set()
         self.delete_lock = safe_get_lock()
         self.server_app = None
         self.process_time_per_fn: defaultdict[BlockFunction, ProcessTime] = defaultdict(
             ProcessTime
         )
+        self.batch_stats_per_fn: defaultdict[BlockFunction, BatchStats] = defaultdict(
+            BatchStats
+        )
+        self.next_batch_deadline: float | None = None
         self.live_updates = live_updates
-        self.sleep_when_free = 0.05
         self.progress_update_sleep_when_free = 0.1
         self.max_size = max_size
+        self.max_wait = max_wait
+        self.max_events_per_user = max_events_per_user
+        self.max_requests_per_minute = max_requests_per_minute
+        self.events_per_quota_key: Counter[str] = Counter()
+        self.request_times_per_quota_key: LRUCache[str, deque[float]] = LRUCache(10_000)
         self.blocks = blocks
         self._asyncio_tasks: list[asyncio.Task] = []
         self.default_concurrency_limit = self._resolve_concurrency_limit(
             default_concurrency_limit
         )
-        self.event_analytics: dict[str, dict[str, float | str | None]] = {}
+        self.scheduling = self._resolve_scheduling(scheduling)
+        self.event_analytics = EventAnalytics()
+        self.processing_wakeup = asyncio.Event()
+        self.progress_wakeup = asyncio.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None
 
     def start(self):
-        self.active_jobs = [None] * self.max_thread_count
+        # Listeners with dedicated thread pools get extra workers, so that they do not
+        # take up the workers of the listeners that share the app's thread pool
+        dedicated_thread_count = sum(self.blocks.get_dedicated_thread_counts().values())
+        self.active_jobs = [None] * (self.max_thread_count + dedicated_thread_count)
+        self.processing_wakeup = asyncio.Event()
+        self.progress_wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        # These locks cannot be created if the queue was created outside of an event loop
+        self.pending_message_lock = self.pending_message_lock or asyncio.Lock()
+        self.delete_lock = self.delete_lock or asyncio.Lock()
 
         run_coro_in_background(self.start_processing)
         run_coro_in_background(self.start_progress_updates)
@@ -150,11 +1286,20 @@ class Queue:
         concurrency_limit: int | None
         if block_fn.concurrency_limit == "default":
             concurrency_limit = self.default_concurrency_limit
+        elif block_fn.concurrency_limit == "auto":
+            # Only bounds the adaptive limit, which is set below
+            concurrency_limit = None
         else:
             concurrency_limit = block_fn.concurrency_limit
+        if block_fn.max_threads is not None and (
+            concurrency_limit is None or concurrency_limit > block_fn.max_threads
+        ):
+            # Events of a listener with a dedicated thread pool cannot run faster than
+            # its threads, so they should not hold on to more of the queue's workers
+            concurrency_limit = block_fn.max_threads
         if concurrency_id not in self.event_queue_per_concurrency_id:
             self.event_queue_per_concurrency_id[concurrency_id] = EventQueue(
-                concurrency_id, concurrency_limit
+                concurrency_id, concurrency_limit, self.scheduling
             )
         elif (
             concurrency_limit is not None
@@ -165,21 +1310,90 @@ class Queue:
                 or concurrency_limit < existing_event_queue.concurrency_limit
             ):
                 existing_event_queue.concurrency_limit = concurrency_limit
+                self.wake_processing()
+        event_queue = self.event_queue_per_concurrency_id[concurrency_id]
+        if block_fn.concurrency_limit == "auto" and event_queue.adaptive_limit is None:
+            event_queue.adaptive_limit = AdaptiveConcurrencyLimit(
+                max_limit=min(
+                    self.max_thread_count,
+                    event_queue.concurrency_limit or self.max_thread_count,
+                )
+            )
+        elif event_queue.adaptive_limit is not None and concurrency_limit is not None:
+            event_queue.adaptive_limit.max_limit = max(
+                event_queue.adaptive_limit.min_limit,
+                min(event_queue.adaptive_limit.max_limit, concurrency_limit),
+            )
+        if event_queue.adaptive_limit is not None:
+            event_queue.concurrency_limit = event_queue.adaptive_limit.concurrency_limit
 
     def close(self):
         self.stopped = True
+        if self.estimation_handle is not None:
+            self.estimation_handle.cancel()
+            self.estimation_handle = None
+        self.wake_processing()
+        self.progress_wakeup.set()
+        for messages in list(self.pending_messages_per_session.values()):
+            messages.wake()
+
+    def call_in_loop(self, callback: Callable[[], Any]):
+        """
+        Calls `callback` on the queue's event loop: right away if called from the loop, and as soon as possible
+        otherwise. Can be called from any thread.
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            callback()
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is loop:
+            callback()
+        else:
+            loop.call_soon_threadsafe(callback)
+
+    def wake_processing(self):
+        """
+        Wakes up `start_processing` so that it checks again whether an event can be dispatched. Must be called
+        whenever an event is added to the queue, a worker becomes free or a concurrency limit changes. Can be
+        called from any thread.
+        """
+        self.call_in_loop(self.processing_wakeup.set)
 
     def send_message(
         self,
         event: Event,
         event_message: EventMessage,
     ):
+        for follower in event.followers:
+            if follower.alive:
+                self.send_message(follower, event_message.model_copy())
         if not event.alive:
             return
         event_message.event_id = event._id
         messages = self.pending_messages_per_session[event.session_hash]
+        if (
+            isinstance(event_message, ProcessGeneratingMessage)
+            and event_message.msg == ServerMessage.process_generating
+            and event.fn.backpressure == "latest"
+        ):
+            # Except for the first one, the outputs of a generator are sent as diffs
+            # from the previous outputs, unless the client asked for full values
+            is_diff = event.sent_generating_output and not (
+                event.data and event.data.simple_format
+            )
+            event.sent_generating_output = True
+            if messages.put_latest(event_message, is_diff):
+                self.coalesced_messages += 1
+            return
         messages.put_nowait(event_message)
 
+    def has_pending_events(self, session_hash: str) -> bool:
+        return bool(self.pending_event_ids_session.get(session_hash))
+
     def _resolve_concurrency_limit(
         self, default_concurrency_limit: int | None | Literal["not_set"]
     ) -> int | None:
@@ -202,11 +1416,27 @@ class Queue:
         else:
             return 1
 
+    @staticmethod
+    def _resolve_scheduling(
+        scheduling: Literal["random", "fifo", "fair", "user_fair"] | SchedulingPolicy,
+    ) -> SchedulingPolicy:
+        if isinstance(scheduling, SchedulingPolicy):
+            return scheduling
+        if scheduling not in SCHEDULING_POLICIES:
+            raise ValueError(
+                f"Invalid value for parameter `scheduling`: {scheduling}. Please choose from: {list(SCHEDULING_POLICIES)} or pass a `SchedulingPolicy` instance."
+            )
+        return SCHEDULING_POLICIES[scheduling]()
+
     def __len__(self):
-        total_len = 0
-        for event_queue in self.event_queue_per_concurrency_id.values():
-            total_len += len(event_queue.queue)
-        return total_len
+        return self.queue_size
+
+    async def get_session_channel(self, session_hash: str) -> MessageChannel:
+        """Returns the channel that the messages of the events of a session are put in, creating it if needed."""
+        async with self.pending_message_lock:
+            if session_hash not in self.pending_messages_per_session:
+                self.pending_messages_per_session[session_hash] = MessageChannel()
+            return self.pending_messages_per_session[session_hash]
 
     async def push(
         self, body: PredictBodyInternal, request: fastapi.Request, username: str | None
@@ -233,34 +1463,197 @@ class Queue:
             request,
             username,
         )
-        event.data = body
-        if body.session_hash is None:
-            body.session_hash = event.session_hash
-        async with self.pending_message_lock:
-            if body.session_hash not in self.pending_messages_per_session:
-                self.pending_messages_per_session[body.session_hash] = ThreadQueue()
-            if body.session_hash not in self.pending_event_ids_session:
-                self.pending_event_ids_session[body.session_hash] = set()
-        self.pending_event_ids_session[body.session_hash].add(event._id)
-        self.event_ids_to_events[event._id] = event
         try:
             event_queue = self.event_queue_per_concurrency_id[event.concurrency_id]
         except KeyError as e:
             raise KeyError(
                 "Event not found in queue. If you are deploying this Gradio app with multiple replicas, please enable stickiness to ensure that all requests from the same user are routed to the same instance."
             ) from e
-        event_queue.queue.append(event)
-        self.event_analytics[event._id] = {
-            "time": time.time(),
-            "status": "queued",
-            "process_time": None,
-            "function": fn.api_name,
-            "session_hash": body.session_hash,
-        }
+        if rejection := self.check_admission(event):
+            return False, rejection
+        event.data = body
+        if body.session_hash is None:
+            body.session_hash = event.session_hash
+        await self.get_session_channel(body.session_hash)
+        if body.session_hash not in self.pending_event_ids_session:
+            self.pending_event_ids_session[body.session_hash] = set()
+        self.pending_event_ids_session[body.session_hash].add(event._id)
+        self.event_ids_to_events[event._id] = event
+        if leader := self.coalesce(event):
+            self.event_analytics.add(event._id, fn.api_name, body.session_hash)
+            if leader.last_estimation:
+                self.send_message(event, leader.last_estimation.model_copy())
+            return True, event._id
+        event_queue.append(event)
+        self.queue_size += 1
+        if fn.batch:
+            self.batch_stats_per_fn[fn].add_arrival(
+                event.created_at, 2 * fn.max_batch_wait or None
+            )
+        self.wake_processing()
+        self.event_analytics.add(event._id, fn.api_name, body.session_hash)
 
-        self.broadcast_estimations(event.concurrency_id, len(event_queue.queue) - 1)
+        self.schedule_estimations(event.concurrency_id)
         return True, event._id
 
+    @staticmethod
+    def get_coalesce_key(event: Event) -> str | None:
+        """
+        Returns the key that identifies calls identical to `event`, or None if `event` cannot be coalesced with
+        other calls because its listener does not set `coalesce=True`, is batched or streaming, uses session state,
+        or takes the event data, request or OAuth profile of the user calling it.
+        """
+        fn = event.fn
+        if not fn.coalesce or fn.batch or event.streaming or event.data is None:
+            return None
+        if fn.collects_event_data or fn.uses_request:
+            return None
+        if any(block.stateful for block in [*fn.inputs, *fn.outputs]):
+            return None
+        try:
+            data = orjson.dumps(
+                [event.data.data, event.data.event_data], option=orjson.OPT_SORT_KEYS
+            )
+        except TypeError:
+            return None
+        return f"{fn._id}-{hashlib.sha256(data).hexdigest()}"
+
+    def coalesce(self, event: Event) -> Event | None:
+        """
+        If an identical call to `event` is queued or running, adds `event` as a follower of that call, so that it is
+        sent the same messages instead of being run, and returns the call. Otherwise, makes `event` the call that
+        later identical events are coalesced with, and returns None.
+        """
+        coalesce_key = self.get_coalesce_key(event)
+        if coalesce_key is None:
+            return None
+        leader = self.coalesce_leaders.get(coalesce_key)
+        if leader is None:
+            event.coalesce_key = coalesce_key
+            self.coalesce_leaders[coalesce_key] = event
+            return None
+        event.leader = leader
+        leader.followers.append(event)
+        self.followers_per_session.setdefault(event.session_hash, {})[event._id] = event
+        return leader
+
+    def forget_follower(self, follower: Event):
+        """Removes `follower` from the index of followers per session, e.g. because it was finished or promoted."""
+        followers = self.followers_per_session.get(follower.session_hash)
+        if followers is None:
+            return
+        followers.pop(follower._id, None)
+        if not followers:
+            del self.followers_per_session[follower.session_hash]
+
+    def release_coalesce_key(self, event: Event):
+        """Stops coalescing new events with `event`, e.g. because its generator has started streaming outputs."""
+        if (
+            event.coalesce_key is not None
+            and self.coalesce_leaders.get(event.coalesce_key) is event
+        ):
+            del self.coalesce_leaders[event.coalesce_key]
+
+    def promote_follower(self, leader: Event) -> Event | None:
+        """
+        Called when the queued `leader` is removed from the queue. Its first follower that is still connected takes
+        its place, and is returned so that it can be queued.
+        """
+        self.release_coalesce_key(leader)
+        followers = [follower for follower in leader.followers if follower.alive]
+        leader.followers = []
+        if not followers:
+            return None
+        new_leader, new_leader.followers = followers[0], followers[1:]
+        new_leader.leader = None
+        self.forget_follower(new_leader)
+        for follower in new_leader.followers:
+            follower.leader = new_leader
+        new_leader.coalesce_key = leader.coalesce_key
+        if new_leader.coalesce_key is not None:
+            self.coalesce_leaders[new_leader.coalesce_key] = new_leader
+        return new_leader
+
+    def finish_followers(self, event: Event, success: bool):
+        for follower in event.followers:
+            self.forget_follower(follower)
+            self.release_quota(follower)
+            if follower.alive:
+                self.event_analytics.set_status(
+                    follower._id, "success" if success else "failed"
+                )
+            else:
+                self.event_analytics.set_status(follower._id, "cancelled")
+
+    def predict_wait(self, event_queue: EventQueue) -> float:
+        """
+        Returns the expected time, in seconds, until an event pushed now to `event_queue` would start processing.
+        Functions that have not processed an event yet are assumed to take no time.
+        """
+        if event_queue.concurrency_limit is None:
+            return 0
+        work = 0.0
+        now = time.time()
+        for fn, start_times in event_queue.start_times_per_fn.items():
+            if fn in self.process_time_per_fn and start_times:
+                estimate = self.process_time_per_fn[fn].estimate
+                work += sum(max(start + estimate - now, 0) for start in start_times)
+        for fn, events in event_queue.events_per_fn.items():
+            if fn in self.process_time_per_fn:
+                batches = (
+                    math.ceil(len(events) / fn.max_batch_size)
+                    if fn.batch
+                    else len(events)
+                )
+                work += batches * self.process_time_per_fn[fn].estimate
+        return work / event_queue.concurrency_limit
+
+    def check_admission(self, event: Event) -> str | None:
+        """
+        Returns why `event` should not be added to the queue, or None if it can be added. Events are rejected if their
+        user already has `max_events_per_user` events queued or processing, has pushed `max_requests_per_minute`
+        events in the last minute, or if the event is expected to wait for longer than `max_wait` seconds. Admitted
+        events are counted towards the per-user quotas. Users are identified by their username if they are logged in,
+        and by their session otherwise (not by their IP, which is shared by every user behind a proxy).
+        """
+        quota_key = event.user_key
+        if (
+            self.max_events_per_user is not None
+            and self.events_per_quota_key[quota_key] >= self.max_events_per_user
+        ):
+            return f"Too many requests. You can have at most {self.max_events_per_user} requests in the queue at once."
+        now = time.monotonic()
+        if self.max_requests_per_minute is not None:
+            if quota_key not in self.request_times_per_quota_key:
+                self.request_times_per_quota_key[quota_key] = deque(
+                    maxlen=self.max_requests_per_minute
+                )
+            request_times = self.request_times_per_quota_key[quota_key]
+            if (
+                len(request_times) == self.max_requests_per_minute
+                and now - request_times[0] < 60
+            ):
+                return f"Too many requests. You can make at most {self.max_requests_per_minute} requests per minute."
+        if self.max_wait is not None:
+            event_queue = self.event_queue_per_concurrency_id[event.concurrency_id]
+            wait = self.predict_wait(event_queue)
+            if wait > self.max_wait:
+                return f"Queue is full. The expected wait time is {round(wait)} seconds, which is longer than the maximum of {self.max_wait} seconds."
+        if self.max_requests_per_minute is not None:
+            self.request_times_per_quota_key[quota_key].append(now)
+        event.quota_key = quota_key
+        self.events_per_quota_key[quota_key] += 1
+        return None
+
+    def release_quota(self, event: Event):
+        """Stops counting `event` towards the quota of its user. Safe to call more than once."""
+        if event.quota_key is None:
+            return
+        self.events_per_quota_key[event.quota_key] -= 1
+        if self.events_per_quota_key[event.quota_key] <= 0:
+            del self.events_per_quota_key[event.quota_key]
+        event.quota_key = None
+
     def _cancel_asyncio_tasks(self):
         for task in self._asyncio_tasks:
             task.cancel()
@@ -276,40 +1669,181 @@ class Queue:
                 count += 1
         return count
 
+    def get_batch_deadline(
+        self, event_queue: EventQueue, first_event: Event
+    ) -> float | None:
+        """
+        Returns the time (in `time.monotonic()` seconds) until which the batch starting with `first_event` should be
+        held open for more events, or None if it can be run straight away.
+        """
+        fn = first_event.fn
+        if not fn.batch or not fn.max_batch_wait:
+            return None
+        missing = fn.max_batch_size - len(event_queue.events_per_fn[fn])
+        if missing <= 0:
+            return None
+        process_time = (
+            self.process_time_per_fn[fn].estimate
+            if fn in self.process_time_per_fn
+            else None
+        )
+        wait = self.batch_stats_per_fn[fn].wait_time(
+            missing, fn.max_batch_wait, process_time
+        )
+        return first_event.created_at + wait
+
+    def is_held(
+        self,
+        event_queue: EventQueue,
+        event: Event,
+        held_fns: set[BlockFunction],
+        now: float,
+    ) -> bool:
+        """
+        Returns whether the batch starting with `event` is being held open for more events, in which case its
+        function is added to `held_fns` and `next_batch_deadline` is updated.
+        """
+        if event.fn in held_fns:
+            return True
+        deadline = self.get_batch_deadline(event_queue, event)
+        if deadline is None or now >= deadline:
+            return False
+        held_fns.add(event.fn)
+        if self.next_batch_deadline is None or deadline < self.next_batch_deadline:
+            self.next_batch_deadline = deadline
+        return True
+
+    def get_batch_metrics(self) -> dict[str, dict[str, Any]]:
+        """
+        Returns the number of batches run, the mean batch size and the number of batches of each size, for every
+        batched function that has received events. Functions are keyed by their api_name, or their index if they do
+        not have one.
+        """
+        return {
+            str(fn.api_name or fn._id): stats.get_metrics()
+            for fn, stats in self.batch_stats_per_fn.items()
+        }
+
+    def get_process_time_metrics(self) -> dict[str, dict[str, Any]]:
+        """
+        Returns the number of events processed, the all-time and recent average process times, and the p50, p95 and
+        p99 of the recent process times (in seconds), for every function that has processed an event. Functions are
+        keyed by their api_name, or their index if they do not have one.
+        """
+        return {
+            str(fn.api_name or fn._id): process_time.get_metrics()
+            for fn, process_time in self.process_time_per_fn.items()
+        }
+
+    def get_adaptive_concurrency_metrics(self) -> dict[str, dict[str, Any]]:
+        """
+        Returns the current concurrency limit, its bounds, and the baseline and smoothed recent latencies (in seconds)
+        of every concurrency group whose limit is set to "auto", keyed by concurrency_id.
+        """
+        return {
+            concurrency_id: {
+                "concurrency_limit": event_queue.adaptive_limit.concurrency_limit,
+                "min_limit": event_queue.adaptive_limit.min_limit,
+                "max_limit": event_queue.adaptive_limit.max_limit,
+                "baseline_latency": event_queue.adaptive_limit.baseline,
+                "recent_latency": event_queue.adaptive_limit.recent_latency,
+            }
+            for concurrency_id, event_queue in self.event_queue_per_concurrency_id.items()
+            if event_queue.adaptive_limit is not None
+        }
+
+    def get_result_cache_metrics(self) -> dict[str, dict[str, Any]]:
+        """
+        Returns the hit, miss and eviction counts and the size of the result cache of every function that caches its
+        results (see the `cache` parameter of event listeners). Functions are keyed by their api_name, or their index
+        if they do not have one.
+        """
+        return {
+            str(fn.api_name or fn._id): fn.cache.get_metrics()
+            for fn in self.blocks.fns.values()
+            if fn.cache is not None
+        }
+
+    def get_session_metrics(self) -> dict[str, Any]:
+        """
+        Returns the number of sessions whose messages are kept by the queue, the memory they use (in bytes), and the
+        number of idle sessions evicted so far to stay under `max_session_memory`, as well as the number of generator
+        outputs merged into an unread output so far (see the `backpressure` parameter of event listeners).
+        """
+        return {
+            **self.pending_messages_per_session.get_metrics(),
+            "coalesced_messages": self.coalesced_messages,
+        }
+
     def get_events(self) -> tuple[list[Event], bool, str] | None:
-        concurrency_ids = list(self.event_queue_per_concurrency_id.keys())
-        random.shuffle(concurrency_ids)
-        for concurrency_id in concurrency_ids:
-            event_queue = self.event_queue_per_concurrency_id[concurrency_id]
-            if len(event_queue.queue) and (
+        event_queues = [
+            event_queue
+            for event_queue in self.event_queue_per_concurrency_id.values()
+            if len(event_queue)
+            and (
                 event_queue.concurrency_limit is None
                 or event_queue.current_concurrency < event_queue.concurrency_limit
-            ):
-                first_event = event_queue.queue[0]
-                block_fn = first_event.fn
-                events = [first_event]
-                batch = block_fn.batch
-                if batch:
-                    events += [
+            )
+        ]
+        self.next_batch_deadline = None
+        now = time.monotonic()
+        held_fns: set[BlockFunction] = set()
+        while event_queues:
+            priority = max(event_queue.max_priority for event_queue in event_queues)
+            candidates = [
+                event_queue
+                for event_queue in event_queues
+                if priority in event_queue.events_per_priority
+            ]
+            event_queue, first_event = self.scheduling.select(candidates, priority)
+            if self.is_held(event_queue, first_event, held_fns, now):
+                # Hold this batch open and see whether another function can run meanwhile
+                first_event = next(
+                    (
                         event
-                        for event in event_queue.queue[1:]
-                        if event.fn == first_event.fn
-                    ][: block_fn.max_batch_size - 1]
-
-                for event in events:
-                    event_queue.queue.remove(event)
+                        for event in event_queue.events_per_priority[priority].values()
+                        if not self.is_held(event_queue, event, held_fns, now)
+                    ),
+                    None,
+                )
+                if first_event is None:
+                    event_queues.remove(event_queue)
+                    continue
 
-                return events, batch, concurrency_id
+            events = event_queue.pop_batch(first_event)
+            self.queue_size -= len(events)
+            fn = first_event.fn
+            if fn.batch:
+                self.batch_stats_per_fn[fn].add_batch(len(events))
+            cost = (
+                self.process_time_per_fn[fn].estimate
+                if fn in self.process_time_per_fn
+                else 1.0
+            )
+            self.scheduling.on_dispatch(event_queue, events, cost)
+            return events, fn.batch, event_queue.concurrency_id
+        return None
+
+    async def wait_for_wakeup(self, deadline: float | None = None):
+        """Waits until `wake_processing` is called, or until `deadline` (in `time.monotonic()` seconds) is reached."""
+        if deadline is None:
+            await self.processing_wakeup.wait()
+            return
+        try:
+            await asyncio.wait_for(
+                self.processing_wakeup.wait(), max(deadline - time.monotonic(), 0)
+            )
+        except asyncio.TimeoutError:
+            pass
 
     async def start_processing(self) -> None:
         try:
             while not self.stopped:
-                if len(self) == 0:
-                    await asyncio.sleep(self.sleep_when_free)
-                    continue
-
-                if None not in self.active_jobs:
-                    await asyncio.sleep(self.sleep_when_free)
+                # Cleared before checking for work so that any push, job completion or
+                # concurrency limit change from here on wakes up the wait below.
+                self.processing_wakeup.clear()
+                if len(self) == 0 or None not in self.active_jobs:
+                    await self.wait_for_wakeup()
                     continue
 
                 # Using mutex to avoid editing a list in use
@@ -319,12 +1853,19 @@ class Queue:
                 if event_batch:
                     events, batch, concurrency_id = event_batch
                     self.active_jobs[self.active_jobs.index(None)] = events
+                    for event in events:
+                        self.active_events[event._id] = event
+                        for follower in event.followers:
+                            self.event_analytics.set_status(follower._id, "processing")
+                        if event.fn.types_generator:
+                            # Later events would miss the outputs that were already streamed
+                            self.release_coalesce_key(event)
                     event_queue = self.event_queue_per_concurrency_id[concurrency_id]
                     event_queue.current_concurrency += 1
                     start_time = time.time()
                     event_queue.start_times_per_fn[events[0].fn].add(start_time)
                     for event in events:
-                        self.event_analytics[event._id]["status"] = "processing"
+                        self.event_analytics.set_status(event._id, "processing")
                     process_event_task = run_coro_in_background(
                         self.process_events, events, batch, start_time
                     )
@@ -338,9 +1879,9 @@ class Queue:
 
                     self._asyncio_tasks.append(process_event_task)
                     if self.live_updates:
-                        self.broadcast_estimations(concurrency_id)
+                        self.schedule_estimations(concurrency_id)
                 else:
-                    await asyncio.sleep(self.sleep_when_free)
+                    await self.wait_for_wakeup(self.next_batch_deadline)
         finally:
             self.stopped = True
             self._cancel_asyncio_tasks()
@@ -348,23 +1889,29 @@ class Queue:
     async def start_progress_updates(self) -> None:
         """
         Because progress updates can be very frequent, we do not necessarily want to send a message per update.
-        Rather, we check for progress updates at regular intervals, and send a message if there is a pending update.
+        Rather, `set_progress` marks the event as having a pending update and wakes up this loop, which sends the
+        pending updates and then waits for `progress_update_sleep_when_free` seconds before sending more.
         Consecutive progress updates between sends will overwrite each other so only the most recent update will be sent.
         """
         while not self.stopped:
-            events = [evt for job in self.active_jobs if job is not None for evt in job]
-
-            if len(events) == 0:
-                await asyncio.sleep(self.progress_update_sleep_when_free)
-                continue
-
+            await self.progress_wakeup.wait()
+            self.progress_wakeup.clear()
+            events, self.pending_progress_events = self.pending_progress_events, set()
             for event in events:
-                if event.progress_pending and event.progress:
+                if (
+                    event.progress_pending
+                    and event.progress
+                    and event._id in self.active_events
+                ):
                     event.progress_pending = False
                     self.send_message(event, event.progress)
 
             await asyncio.sleep(self.progress_update_sleep_when_free)
 
+    def _add_pending_progress(self, event: Event):
+        self.pending_progress_events.add(event)
+        self.progress_wakeup.set()
+
     def set_progress(
         self,
         event_id: str,
@@ -372,23 +1919,23 @@ class Queue:
     ):
         if iterables is None:
             return
-        for job in self.active_jobs:
-            if job is None:
-                continue
-            for evt in job:
-                if evt._id == event_id:
-                    progress_data: list[ProgressUnit] = []
-                    for iterable in iterables:
-                        progress_unit = ProgressUnit(
-                            index=iterable.index,
-                            length=iterable.length,
-                            unit=iterable.unit,
-                            progress=iterable.progress,
-                            desc=iterable.desc,
-                        )
-                        progress_data.append(progress_unit)
-                    evt.progress = ProgressMessage(progress_data=progress_data)
-                    evt.progress_pending = True
+        event = self.active_events.get(event_id)
+        if event is None:
+            return
+        progress_data: list[ProgressUnit] = []
+        for iterable in iterables:
+            progress_unit = ProgressUnit(
+                index=iterable.index,
+                length=iterable.length,
+                unit=iterable.unit,
+                progress=iterable.progress,
+                desc=iterable.desc,
+            )
+            progress_data.append(progress_unit)
+        event.progress = ProgressMessage(progress_data=progress_data)
+        if not event.progress_pending:
+            event.progress_pending = True
+            self.call_in_loop(partial(self._add_pending_progress, event))
 
     def log_message(
         self,
@@ -399,17 +1946,17 @@ class Queue:
         duration: float | None = 10,
         visible: bool = True,
     ):
-        events = [evt for job in self.active_jobs if job is not None for evt in job]
-        for event in events:
-            if event._id == event_id:
-                log_message = LogMessage(
-                    log=log,
-                    level=level,
-                    duration=duration,
-                    visible=visible,
-                    title=title,
-                )
-                self.send_message(event, log_message)
+        event = self.active_events.get(event_id)
+        if event is None:
+            return
+        log_message = LogMessage(
+            log=log,
+            level=level,
+            duration=duration,
+            visible=visible,
+            title=title,
+        )
+        self.send_message(event, log_message)
 
     async def clean_events(
         self, *, session_hash: str | None = None, event_id: str | None = None
@@ -419,18 +1966,39 @@ class Queue:
                 for job in job_set:
                     if job.session_hash == session_hash or job._id == event_id:
                         job.alive = False
+        followers = []
+        if session_hash is not None:
+            followers += self.followers_per_session.get(session_hash, {}).values()
+        event = self.event_ids_to_events.get(event_id) if event_id else None
+        if event is not None and event.leader is not None:
+            followers.append(event)
+        for follower in followers:
+            self.forget_follower(follower)
+            if follower.alive:
+                follower.alive = False
+                self.release_quota(follower)
+                self.event_analytics.set_status(follower._id, "cancelled")
 
         async with self.delete_lock:
-            events_to_remove: list[Event] = []
-            for event_queue in self.event_queue_per_concurrency_id.values():
-                for event in event_queue.queue:
-                    if event.session_hash == session_hash or event._id == event_id:
-                        events_to_remove.append(event)
-
-            for event in events_to_remove:
-                self.event_queue_per_concurrency_id[event.concurrency_id].queue.remove(
-                    event
-                )
+            removed_events = []
+            if session_hash is not None:
+                for event_queue in self.event_queue_per_concurrency_id.values():
+                    removed_events += event_queue.remove_session(session_hash)
+            if event_id is not None and event_id in self.event_ids_to_events:
+                event = self.event_ids_to_events[event_id]
+                event_queue = self.event_queue_per_concurrency_id[event.concurrency_id]
+                if event_queue.remove(event):
+                    removed_events.append(event)
+            self.queue_size -= len(removed_events)
+            for event in removed_events:
+                self.release_quota(event)
+                self.event_analytics.set_status(event._id, "cancelled")
+                if new_leader := self.promote_follower(event):
+                    self.event_queue_per_concurrency_id[
+                        new_leader.concurrency_id
+                    ].append(new_leader)
+                    self.queue_size += 1
+                    self.wake_processing()
 
     async def notify_clients(self) -> None:
         """
@@ -440,11 +2008,48 @@ class Queue:
             await asyncio.sleep(self.update_intervals)
             if len(self) > 0:
                 for concurrency_id in self.event_queue_per_concurrency_id:
-                    self.broadcast_estimations(concurrency_id)
+                    self.schedule_estimations(concurrency_id)
 
-    def broadcast_estimations(
-        self, concurrency_id: str, after: int | None = None
-    ) -> None:
+    def schedule_estimations(self, concurrency_id: str) -> None:
+        """
+        Marks the estimations of the events in `concurrency_id` as outdated. Estimations are recomputed at most once
+        every `estimation_interval` seconds per concurrency group, so that a burst of pushes or completions does not
+        recompute and resend them for every event in the queue each time.
+        """
+        self.pending_estimations.add(concurrency_id)
+        if self.estimation_handle is None:
+            self.estimation_handle = asyncio.get_running_loop().call_later(
+                self.estimation_interval, self.flush_estimations
+            )
+
+    def flush_estimations(self) -> None:
+        self.estimation_handle = None
+        concurrency_ids, self.pending_estimations = self.pending_estimations, set()
+        for concurrency_id in concurrency_ids:
+            if concurrency_id in self.event_queue_per_concurrency_id:
+                self.broadcast_estimations(concurrency_id)
+
+    def estimation_changed(self, event: Event, estimation: EstimationMessage) -> bool:
+        """
+        Returns whether `estimation` should be sent to the client of `event`, i.e. whether its rank changed or its
+        ETA moved by more than `min_eta_change` seconds or 10% from the one the client is counting down from.
+        """
+        last_estimation = event.last_estimation
+        if last_estimation is None or last_estimation.rank != estimation.rank:
+            return True
+        if last_estimation.rank_eta is None or estimation.rank_eta is None:
+            return last_estimation.rank_eta != estimation.rank_eta
+        expected_eta = last_estimation.rank_eta - (
+            time.monotonic() - event.last_estimation_time
+        )
+        return abs(estimation.rank_eta - expected_eta) > max(
+            self.min_eta_change, 0.1 * abs(expected_eta)
+        )
+
+    def broadcast_estimations(self, concurrency_id: str) -> None:
+        """
+        Sends an estimation to every event in `concurrency_id` whose rank or ETA changed since it was last notified.
+        """
         wait_so_far = 0
         event_queue = self.event_queue_per_concurrency_id[concurrency_id]
         time_till_available_worker: int | None = 0
@@ -458,7 +2063,7 @@ class Queue:
                 if fn.connection == "stream":
                     process_time = fn.time_limit or 0
                 else:
-                    process_time = self.process_time_per_fn[fn].avg_time
+                    process_time = self.process_time_per_fn[fn].estimate
                 expected_end_times += [
                     start_time + process_time for start_time in start_times
                 ]
@@ -468,9 +2073,9 @@ class Queue:
                     time_of_first_completion - time.time(), 0
                 )
 
-        for rank, event in enumerate(event_queue.queue):
+        for rank, event in enumerate(event_queue):
             process_time_for_fn = (
-                self.process_time_per_fn[event.fn].avg_time
+                self.process_time_per_fn[event.fn].estimate
                 if event.fn in self.process_time_per_fn
                 else None
             )
@@ -489,13 +2094,13 @@ class Queue:
                 else None
             )
 
-            if after is None or rank >= after:
-                self.send_message(
-                    event,
-                    EstimationMessage(
-                        rank=rank, rank_eta=rank_eta, queue_size=len(event_queue.queue)
-                    ),
-                )
+            estimation = EstimationMessage(
+                rank=rank, rank_eta=rank_eta, queue_size=len(event_queue)
+            )
+            if self.estimation_changed(event, estimation):
+                event.last_estimation = estimation
+                event.last_estimation_time = time.monotonic()
+                self.send_message(event, estimation)
             if event_queue.concurrency_limit is None:
                 wait_so_far = 0
             elif wait_so_far is not None and process_time_for_fn is not None:
@@ -564,15 +2169,16 @@ class Queue:
         self, events: list[Event], batch: bool, begin_time: float
     ) -> None:
         awake_events: list[Event] = []
+        dispatched_events = events
         fn = events[0].fn
         success = False
         try:
             for event in events:
-                if event.alive:
+                if event.has_listeners:
                     self.send_message(
                         event,
                         ProcessStartsMessage(
-                            eta=self.process_time_per_fn[fn].avg_time
+                            eta=self.process_time_per_fn[fn].estimate
                             if fn in self.process_time_per_fn
                             else None
                         ),
@@ -586,7 +2192,8 @@ class Queue:
             if body is None:
                 raise ValueError("No event data")
             username = events[0].username
-            body.event_id = events[0]._id if not batch else None
+            # Batched generators store their iterator under the id of the first event
+            body.event_id = events[0]._id if not batch or fn.types_generator else None
             try:
                 body.request = events[0].request
             except ValueError:
@@ -653,27 +2260,38 @@ class Queue:
             if response and response.get("is_generating", False):
                 old_response = response
                 old_err = err
+                finished_events: list[Event] = []
                 while response and response.get("is_generating", False):
                     start = time.monotonic()
                     old_response = response
                     old_err = err
-                    for event in awake_events:
-                        self.send_message(
-                            event,
-                            ProcessGeneratingMessage(
-                                msg=ServerMessage.process_generating
-                                if not event.streaming
-                                else ServerMessage.process_streaming,
-                                output=old_response,
-                                success=old_response is not None,
-                                time_limit=cast(int, fn.time_limit) - first_iteration
-                                if event.streaming
-                                else None,
-                            ),
+                    if batch:
+                        self.send_batch_generating_messages(
+                            events, awake_events, finished_events, old_response
                         )
-                    awake_events = [event for event in awake_events if event.alive]
+                    else:
+                        for event in awake_events:
+                            self.send_message(
+                                event,
+                                ProcessGeneratingMessage(
+                                    msg=ServerMessage.process_generating
+                                    if not event.streaming
+                                    else ServerMessage.process_streaming,
+                                    output=old_response,
+                                    success=old_response is not None,
+                                    time_limit=cast(int, fn.time_limit)
+                                    - first_iteration
+                                    if event.streaming
+                                    else None,
+                                ),
+                            )
+                    awake_events = [
+                        event for event in awake_events if event.has_listeners
+                    ]
                     if not awake_events:
                         return
+                    if all(event in finished_events for event in awake_events):
+                        break
                     try:
                         start = time.monotonic()
                         if awake_events[0].streaming:
@@ -691,8 +2309,9 @@ class Queue:
                                 )
                         if not awake_events:
                             break
-                        body = cast(PredictBodyInternal, awake_events[0].data)
-                        if batch:
+                        if not batch:
+                            body = cast(PredictBodyInternal, awake_events[0].data)
+                        else:
                             body.data = list(
                                 zip(
                                     *[
@@ -728,8 +2347,17 @@ class Queue:
                     error = err or old_err
                     output = error_payload(error, app.get_blocks().show_error)
                 for event in awake_events:
+                    if event in finished_events:
+                        continue
+                    if batch and success:
+                        event_output = self.get_batch_item_output(
+                            output, events.index(event)
+                        )
+                    else:
+                        event_output = output
                     self.send_message(
-                        event, ProcessCompletedMessage(output=output, success=success)
+                        event,
+                        ProcessCompletedMessage(output=event_output, success=success),
                     )
 
             elif response:
@@ -755,8 +2383,17 @@ class Queue:
                     else first_iteration
                 )
                 self.process_time_per_fn[events[0].fn].add(duration)
+                event_queue = self.event_queue_per_concurrency_id[
+                    events[0].concurrency_id
+                ]
+                if event_queue.adaptive_limit is not None:
+                    # The limit is raised or lowered before this event's slot is freed
+                    # below, which wakes up the processing loop to use the new limit
+                    event_queue.concurrency_limit = event_queue.adaptive_limit.update(
+                        duration, event_queue.current_concurrency
+                    )
                 for event in events:
-                    self.event_analytics[event._id]["process_time"] = duration
+                    self.event_analytics.set_process_time(event._id, duration)
         except Exception as e:
             traceback.print_exc()
         finally:
@@ -773,19 +2410,65 @@ class Queue:
                 # without putting the `events` into `self.active_jobs`.
                 # https://github.com/gradio-app/gradio/blob/f09aea34d6bd18c1e2fef80c86ab2476a6d1dd83/gradio/routes.py#L594-L596
                 pass
+            for event in events:
+                self.active_events.pop(event._id, None)
+            self.scheduling.on_finish(dispatched_events)
+            self.wake_processing()
             for event in events:
                 # Always reset the state of the iterator
                 # If the job finished successfully, this has no effect
                 # If the job is cancelled, this will enable future runs
                 # to start "from scratch"
                 await self.reset_iterators(event._id)
+                self.release_quota(event)
+                self.release_coalesce_key(event)
+                self.finish_followers(event, success and event in awake_events)
 
                 if event in awake_events:
-                    self.event_analytics[event._id]["status"] = (
-                        "success" if success else "failed"
+                    self.event_analytics.set_status(
+                        event._id, "success" if success else "failed"
                     )
                 else:
-                    self.event_analytics[event._id]["status"] = "cancelled"
+                    self.event_analytics.set_status(event._id, "cancelled")
+
+    @staticmethod
+    def get_batch_item_output(response: dict[str, Any], index: int) -> dict[str, Any]:
+        """Returns the response of a batched function as seen by the item at `index`."""
+        output = {k: v for k, v in response.items() if k != "finished_items"}
+        output["data"] = list(zip(*response["data"], strict=False))[index]
+        return output
+
+    def send_batch_generating_messages(
+        self,
+        events: list[Event],
+        awake_events: list[Event],
+        finished_events: list[Event],
+        response: dict[str, Any],
+    ) -> None:
+        """
+        Fans out one step of a batched generator to the events in the batch. Items that
+        the generator has marked as finished are sent their final output right away and
+        added to `finished_events`, while the rest of the batch keeps generating.
+        """
+        finished_items = response.get("finished_items", [False] * len(events))
+        for index, event in enumerate(events):
+            if event not in awake_events or event in finished_events:
+                continue
+            output = self.get_batch_item_output(response, index)
+            if finished_items[index]:
+                finished_events.append(event)
+                self.send_message(
+                    event, ProcessCompletedMessage(output=output, success=True)
+                )
+            else:
+                self.send_message(
+                    event,
+                    ProcessGeneratingMessage(
+                        msg=ServerMessage.process_generating,
+                        output=output,
+                        success=True,
+                    ),
+                )
 
     async def reset_iterators(self, event_id: str):
         # Do the same thing as the /reset route
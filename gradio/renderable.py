@@ -21,7 +21,7 @@ class Renderable:
         fn: Callable,
         inputs: Sequence[Component],
         triggers: list[tuple[Block | None, str]],
-        concurrency_limit: int | None | Literal["default"],
+        concurrency_limit: int | None | Literal["default", "auto"],
         concurrency_id: str | None,
         trigger_mode: Literal["once", "multiple", "always_last"] | None,
         queue: bool,
@@ -85,7 +85,7 @@ def render(
     *,
     queue: bool = True,
     trigger_mode: Literal["once", "multiple", "always_last"] | None = "always_last",
-    concurrency_limit: int | None | Literal["default"] = None,
+    concurrency_limit: int | None | Literal["default", "auto"] = None,
     concurrency_id: str | None = None,
 ):
     """
@@ -101,7 +101,7 @@ def render(
         triggers: List of triggers to listen to, e.g. [btn.click, number.change]. If None, will listen to changes to any inputs.
         queue: If True, will place the request on the queue, if the queue has been enabled. If False, will not put this event on the queue, even if the queue has been enabled. If None, will use the queue setting of the gradio app.
         trigger_mode: If "once" (default for all events except `.change()`) would not allow any submissions while an event is pending. If set to "multiple", unlimited submissions are allowed while pending, and "always_last" (default for `.change()` and `.key_up()` events) would allow a second submission after the pending event is complete.
-        concurrency_limit: If set, this is the maximum number of this event that can be running simultaneously. Can be set to None to mean no concurrency_limit (any number of this event can be running simultaneously). Set to "default" to use the default concurrency limit (defined by the `default_concurrency_limit` parameter in `Blocks.queue()`, which itself is 1 by default).
+        concurrency_limit: If set, this is the maximum number of this event that can be running simultaneously. Can be set to None to mean no concurrency_limit (any number of this event can be running simultaneously). Set to "default" to use the default concurrency limit (defined by the `default_concurrency_limit` parameter in `Blocks.queue()`, which itself is 1 by default). Set to "auto" to have the limit adjusted at runtime, between 1 and the `max_threads` of `launch()`, to get the most throughput without letting the latency of this event grow.
         concurrency_id: If set, this is the id of the concurrency group. Events with the same concurrency_id will be limited by the lowest set concurrency_limit.
     Example:
         import gradio as gr
@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import inspect
+import itertools
+import marshal
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import anyio
+import orjson
+from gradio_client import utils as client_utils
+
+from gradio import utils
+
+
+class ResultCache:
+    """
+    Memoizes the outputs of an event listener, keyed on its preprocessed inputs, so that repeated calls with the same
+    inputs skip both the function and the postprocessing of its outputs. Pass an instance (or `True` for the defaults)
+    as the `cache` parameter of an event listener or `gr.Interface`. A single instance can be shared by several
+    listeners, in which case they also share its memory budget.
+
+    Results are kept in an in-memory LRU cache that is bounded by the size of the serialized results and, optionally,
+    in an on-disk cache that survives restarts. Results are only reused by the same version of the function that
+    computed them, with the same version of Gradio.
+    Example:
+        import gradio as gr
+        def classify(text):
+            ...
+        demo = gr.Interface(classify, "textbox", "label", cache=gr.ResultCache(ttl=3600))
+    """
+
+    # Numbers the caches that use the default folder, so that each gets its own subfolder
+    disk_cache_counter = itertools.count()
+
+    def __init__(
+        self,
+        max_memory: int = 64 * 1024 * 1024,
+        ttl: float | None = None,
+        disk: bool | str | Path = False,
+        max_disk: int = 1024 * 1024 * 1024,
+    ):
+        """
+        Parameters:
+            max_memory: the maximum total size (in bytes) of the results kept in memory. The least recently used results are evicted first.
+            ttl: the number of seconds a result stays valid after it is computed. If None, results never expire (but may still be evicted).
+            disk: if True, results evicted from memory are also kept on disk, in a folder of the app (identified by the path of its main script) under the "results" folder of the Gradio cache folder (see the GRADIO_EXAMPLES_CACHE environment variable). Can also be set to the path of the folder to use, which should not be used by any other cache.
+            max_disk: the maximum total size (in bytes) of the results kept on disk (only relevant if disk is set).
+        """
+        self.max_memory = max_memory
+        self.ttl = ttl
+        self.max_disk = max_disk
+        if disk is True:
+            self.disk_dir: Path | None = (
+                utils.get_cache_folder()
+                / "results"
+                / self.get_app_namespace()
+                / str(next(self.disk_cache_counter))
+            )
+        elif disk:
+            self.disk_dir = Path(disk)
+        else:
+            self.disk_dir = None
+
+        self.lock = threading.Lock()
+        # key -> (expires_at, serialized result)
+        self.memory: OrderedDict[str, tuple[float | None, bytes]] = OrderedDict()
+        self.memory_bytes = 0
+        # key -> size of the file on disk, oldest first
+        self.disk: OrderedDict[str, int] = OrderedDict()
+        self.disk_bytes = 0
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.disk_dir is not None:
+            self.load_disk_index()
+
+    @staticmethod
+    def get_app_namespace() -> str:
+        """Returns the name of the folder of the app under the default results folder."""
+        main_file = getattr(sys.modules.get("__main__"), "__file__", None)
+        app_path = os.path.abspath(main_file) if main_file else os.getcwd()
+        return hashlib.sha256(app_path.encode()).hexdigest()[:16]
+
+    @staticmethod
+    def get_namespace(fn: Callable, fn_id: int) -> str:
+        """
+        Returns the prefix of the keys of the results of `fn`, the function of the listener with index `fn_id`. The
+        prefix changes whenever the code of `fn` or the version of Gradio changes, so that results that were cached
+        on disk by a previous version of the app are not reused.
+        """
+        while isinstance(fn, functools.partial):
+            fn = fn.func
+        fn = inspect.unwrap(fn)
+        identity = [
+            utils.get_package_version(),
+            getattr(fn, "__module__", None),
+            getattr(fn, "__qualname__", type(fn).__qualname__),
+        ]
+        digest = hashlib.sha256(repr(identity).encode())
+        # Callable objects are identified by the code of their __call__ method
+        code = getattr(fn, "__code__", None) or getattr(
+            type(fn).__call__, "__code__", None
+        )
+        if code is not None:
+            digest.update(marshal.dumps(code))
+        return f"{fn_id}-{digest.hexdigest()[:16]}"
+
+    @staticmethod
+    def get_key(namespace: str, inputs: list[Any]) -> str | None:
+        """
+        Returns the key under which the result of calling the function whose keys are prefixed by `namespace` (see
+        `get_namespace`) on the preprocessed `inputs` is cached, or None if the inputs cannot be serialized (in which
+        case the call is not cached).
+        """
+        try:
+            data = pickle.dumps(inputs, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return None
+        return f"{namespace}-{hashlib.sha256(data).hexdigest()}"
+
+    def get(self, key: str) -> list[Any] | None:
+        """
+        Returns the cached postprocessed outputs for `key`, or None if there are none. Results that have expired, or
+        that refer to files which have since been deleted, are treated as missing.
+        """
+        with self.lock:
+            data = self.get_from_memory(key)
+            if data is not None:
+                self.memory_hits += 1
+            else:
+                data = self.get_from_disk(key)
+                if data is not None:
+                    self.disk_hits += 1
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return data
+
+    async def async_get(self, key: str) -> list[Any] | None:
+        """
+        Like `get`, but results that are not in memory are looked up on disk in a worker thread, so that a slow disk
+        or a large result does not block the event loop.
+        """
+        with self.lock:
+            in_memory = key in self.memory
+        if self.disk_dir is None or in_memory:
+            return self.get(key)
+        return await anyio.to_thread.run_sync(self.get, key)
+
+    def set(self, key: str, data: list[Any]):
+        """
+        Caches the postprocessed outputs `data` under `key`. Outputs that cannot be serialized to JSON, or that are
+        larger than the memory budget, are not cached.
+        """
+        try:
+            serialized = orjson.dumps(data)
+        except TypeError:
+            return
+        if len(serialized) > self.max_memory:
+            return
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        with self.lock:
+            self.add_to_memory(key, expires_at, serialized)
+
+    async def async_set(self, key: str, data: list[Any]):
+        """
+        Like `set`, but if results are kept on disk, the result is cached in a worker thread, as it may evict other
+        results from memory to disk.
+        """
+        if self.disk_dir is None:
+            self.set(key, data)
+        else:
+            await anyio.to_thread.run_sync(self.set, key, data)
+
+    def clear(self):
+        """Removes every cached result, both from memory and from disk."""
+        with self.lock:
+            self.memory.clear()
+            self.memory_bytes = 0
+            for key in list(self.disk):
+                self.remove_from_disk(key)
+
+    def get_metrics(self) -> dict[str, Any]:
+        """
+        Returns the number of hits (in total, from memory and from disk), misses and evictions from memory, the hit
+        rate, and the number and total size (in bytes) of the results in memory and on disk.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "evictions": self.evictions,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory_bytes,
+            "disk_entries": len(self.disk),
+            "disk_bytes": self.disk_bytes,
+        }
+
+    def get_from_memory(self, key: str) -> list[Any] | None:
+        if key not in self.memory:
+            return None
+        expires_at, serialized = self.memory[key]
+        data = orjson.loads(serialized)
+        if self.expired(expires_at) or not self.files_exist(data):
+            self.remove_from_memory(key)
+            return None
+        self.memory.move_to_end(key)
+        return data
+
+    def get_from_disk(self, key: str) -> list[Any] | None:
+        if self.disk_dir is None or key not in self.disk:
+            return None
+        try:
+            entry = orjson.loads(self.get_disk_path(key).read_bytes())
+        except (OSError, orjson.JSONDecodeError):
+            self.remove_from_disk(key)
+            return None
+        # Expiry times on disk are wall-clock times, so that they survive restarts
+        expires_at = entry["expires_at"]
+        if (expires_at is not None and time.time() >= expires_at) or not (
+            self.files_exist(entry["data"])
+        ):
+            self.remove_from_disk(key)
+            return None
+        # Results read from disk are moved back to memory
+        serialized = orjson.dumps(entry["data"])
+        if len(serialized) <= self.max_memory:
+            self.remove_from_disk(key)
+            if expires_at is not None:
+                expires_at = time.monotonic() + (expires_at - time.time())
+            self.add_to_memory(key, expires_at, serialized)
+        return entry["data"]
+
+    def add_to_memory(self, key: str, expires_at: float | None, serialized: bytes):
+        self.remove_from_memory(key)
+        self.memory[key] = (expires_at, serialized)
+        self.memory_bytes += len(serialized)
+        while self.memory_bytes > self.max_memory:
+            evicted_key, (evicted_expires_at, evicted) = self.memory.popitem(last=False)
+            self.memory_bytes -= len(evicted)
+            self.evictions += 1
+            self.write_to_disk(evicted_key, evicted_expires_at, evicted)
+
+    def remove_from_memory(self, key: str):
+        if key in self.memory:
+            _, serialized = self.memory.pop(key)
+            self.memory_bytes -= len(serialized)
+
+    def write_to_disk(self, key: str, expires_at: float | None, serialized: bytes):
+        if self.disk_dir is None or self.expired(expires_at):
+            return
+        if expires_at is not None:
+            expires_at = time.time() + (expires_at - time.monotonic())
+        entry = (
+            b'{"expires_at":'
+            + orjson.dumps(expires_at)
+            + b',"data":'
+            + serialized
+            + b"}"
+        )
+        if len(entry) > self.max_disk:
+            return
+        self.remove_from_disk(key)
+        try:
+            # Only this user can write results that are read back by the app
+            self.disk_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+            self.get_disk_path(key).write_bytes(entry)
+        except OSError:
+            return
+        self.disk[key] = len(entry)
+        self.disk_bytes += len(entry)
+        while self.disk_bytes > self.max_disk:
+            self.remove_from_disk(next(iter(self.disk)))
+
+    def remove_from_disk(self, key: str):
+        if key in self.disk:
+            self.disk_bytes -= self.disk.pop(key)
+        if self.disk_dir is not None:
+            try:
+                os.remove(self.get_disk_path(key))
+            except OSError:
+                pass
+
+    def load_disk_index(self):
+        """Indexes the results that are already on disk, e.g. from a previous run of the app, oldest first."""
+        if self.disk_dir is None or not self.disk_dir.is_dir():
+            return
+        files = sorted(self.disk_dir.glob("*.json"), key=lambda f: f.stat().st_mtime)
+        for file in files:
+            size = file.stat().st_size
+            self.disk[file.stem] = size
+            self.disk_bytes += size
+        while self.disk_bytes > self.max_disk:
+            self.remove_from_disk(next(iter(self.disk)))
+
+    def get_disk_path(self, key: str) -> Path:
+        return self.disk_dir / f"{key}.json"  # type: ignore
+
+    @staticmethod
+    def expired(expires_at: float | None) -> bool:
+        return expires_at is not None and time.monotonic() >= expires_at
+
+    @staticmethod
+    def files_exist(data: Any) -> bool:
+        """Whether every local file referenced by the postprocessed outputs `data` still exists."""
+        missing = []
+
+        def check(file: dict) -> dict:
+            path = file["path"]
+            if not client_utils.is_http_url_like(path) and not os.path.exists(path):
+                missing.append(path)
+            return file
+
+        client_utils.traverse(data, check, client_utils.is_file_obj_with_meta)
+        return not missing
@@ -261,11 +261,11 @@ def compile_gr_request(
     return gr_request
 
 
-def restore_session_state(app: App, body: PredictBodyInternal):
+async def restore_session_state(app: App, body: PredictBodyInternal):
     event_id = body.event_id
     session_hash = getattr(body, "session_hash", None)
     if session_hash is not None:
-        session_state = app.state_holder[session_hash]
+        session_state = await app.state_holder.get(session_hash)
         # The should_reset set keeps track of the fn_indices
         # that have been cancelled. When a job is cancelled,
         # the /reset route will mark the jobs as having been reset.
@@ -306,7 +306,7 @@ async def call_process_api(
     fn: BlockFunction,
     root_path: str,
 ):
-    session_state, iterator = restore_session_state(app=app, body=body)
+    session_state, iterator = await restore_session_state(app=app, body=body)
 
     event_data = prepare_event_data(app.get_blocks(), body)
     event_id = body.event_id
@@ -400,6 +400,30 @@ def get_root_url(
     return str(root_url).rstrip("/")
 
 
+def websocket_to_request(
+    websocket: fastapi.WebSocket, route_path: str
+) -> fastapi.Request:
+    """
+    Returns an HTTP request with the headers, cookies and client of `websocket`, as if it had been made to the
+    `route_path` endpoint (e.g. "/queue/join") of the same app instead of to the websocket endpoint, so that the root
+    url of the app is resolved the same way as for HTTP requests. The request has no body.
+    """
+    scope = websocket.scope
+    path = scope["path"].rpartition(API_PREFIX)[0] + API_PREFIX + route_path
+    scheme = {"ws": "http", "wss": "https"}.get(scope.get("scheme", "ws"), "http")
+    return fastapi.Request(
+        {
+            **scope,
+            "type": "http",
+            "scheme": scheme,
+            "method": "POST",
+            "path": path,
+            "raw_path": path.encode("utf-8"),
+            "query_string": b"",
+        }
+    )
+
+
 def _user_safe_decode(src: bytes, codec: str) -> str:
     try:
         return src.decode(codec)
@@ -887,7 +911,8 @@ async def _lifespan_handler(
 async def _delete_state(app: App):
     """Delete all expired state every second."""
     while True:
-        app.state_holder.delete_all_expired_state()
+        # Run in a thread, since the state of spilled sessions is loaded from disk
+        await anyio.to_thread.run_sync(app.state_holder.delete_all_expired_state)
         await asyncio.sleep(1)
 
 
@@ -19,7 +19,6 @@ import traceback
 import warnings
 from collections.abc import AsyncIterator, Callable
 from pathlib import Path
-from queue import Empty as EmptyQueue
 from typing import (
     TYPE_CHECKING,
     Any,
@@ -57,12 +56,13 @@ from gradio_client.documentation import document
 from gradio_client.utils import ServerMessage
 from jinja2.exceptions import TemplateNotFound
 from multipart.multipart import parse_options_header
+from pydantic import ValidationError
 from starlette.background import BackgroundTask
 from starlette.datastructures import UploadFile as StarletteUploadFile
 from starlette.responses import RedirectResponse
 
 import gradio
-from gradio import ranged_response, route_utils, utils, wasm_utils
+from gradio import ranged_response, route_utils, utils, wasm_utils, wire_format
 from gradio.context import Context
 from gradio.data_classes import (
     CancelBody,
@@ -764,12 +764,39 @@ class App(FastAPI):
             event.signal.set()
             return {"msg": "success"}
 
+        async def receive_websocket_data(
+            websocket: WebSocket, save_files: bool = True
+        ) -> tuple[Any, bool]:
+            """
+            Receives the next frame sent to `websocket`, and returns its data and whether it was a binary (MessagePack)
+            frame. The files sent inline in a binary frame are saved as uploaded files, unless `save_files` is False.
+            """
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            # Binary frames are MessagePack, and may hold the content of
+            # input files inline instead of a path to an uploaded file
+            if message.get("bytes") is None:
+                return json.loads(message["text"]), False
+            data = wire_format.decode(message["bytes"])
+            if save_files:
+                data = save_inline_files(data)
+            return data, True
+
+        def save_inline_files(data: Any) -> Any:
+            blocks = app.get_blocks()
+            data, paths = wire_format.save_inline_files(
+                data, app.uploaded_file_dir, blocks.max_file_size
+            )
+            blocks.upload_file_set.update(paths)
+            return data
+
         @router.websocket("/stream/{event_id}")
         async def websocket_endpoint(websocket: WebSocket, event_id: str):
             await websocket.accept()
             try:
                 while True:
-                    data = await websocket.receive_json()
+                    data, binary = await receive_websocket_data(websocket)
                     body = PredictBody(**data)
                     event = app.get_blocks()._queue.event_ids_to_events[event_id]
                     body_internal = PredictBodyInternal(
@@ -777,7 +804,12 @@ class App(FastAPI):
                     )
                     event.data = body_internal
                     event.signal.set()
-                    await websocket.send_json({"msg": "success"})
+                    if binary:
+                        await websocket.send_bytes(
+                            wire_format.encode({"msg": "success"})
+                        )
+                    else:
+                        await websocket.send_json({"msg": "success"})
             except WebSocketDisconnect:
                 pass
 
@@ -911,48 +943,60 @@ class App(FastAPI):
                         if "stop" in done:
                             raise asyncio.CancelledError()
                     except asyncio.CancelledError:
-                        req = Request(request, username, session_hash=session_hash)
-                        root_path = route_utils.get_root_url(
-                            request=request,
-                            route_path=f"{API_PREFIX}/hearbeat/{session_hash}",
-                            root_path=app.root_path,
-                        )
-                        body = PredictBodyInternal(
-                            session_hash=session_hash, data=[], request=request
+                        # The task runnning this loop has been cancelled
+                        # so the unload events are run in the background
+                        close_session(
+                            request,
+                            username,
+                            session_hash,
+                            f"{API_PREFIX}/hearbeat/{session_hash}",
+                            background_tasks,
                         )
-                        unload_fn_indices = [
-                            i
-                            for i, dep in app.get_blocks().fns.items()
-                            if any(t for t in dep.targets if t[1] == "unload")
-                        ]
-                        for fn_index in unload_fn_indices:
-                            # The task runnning this loop has been cancelled
-                            # so we add tasks in the background
-                            background_tasks.add_task(
-                                route_utils.call_process_api,
-                                app=app,
-                                body=body,
-                                gr_request=req,
-                                fn=app.get_blocks().fns[fn_index],
-                                root_path=root_path,
-                            )
-                        # This will mark the state to be deleted in an hour
-                        if session_hash in app.state_holder.session_data:
-                            app.state_holder.session_data[session_hash].is_closed = True
-                        for (
-                            event_id
-                        ) in app.get_blocks()._queue.pending_event_ids_session.get(
-                            session_hash, []
-                        ):
-                            event = app.get_blocks()._queue.event_ids_to_events[
-                                event_id
-                            ]
-                            event.run_time = math.inf
-                            event.signal.set()
                         return
 
             return StreamingResponse(iterator(), media_type="text/event-stream")
 
+        def close_session(
+            request: fastapi.Request,
+            username: str | None,
+            session_hash: str,
+            route_path: str,
+            background_tasks: BackgroundTasks,
+        ):
+            """Adds the unload events of the app to `background_tasks`, and marks the state of the session to be deleted, once the client of a session has disconnected."""
+            req = Request(request, username, session_hash=session_hash)
+            root_path = route_utils.get_root_url(
+                request=request,
+                route_path=route_path,
+                root_path=app.root_path,
+            )
+            body = PredictBodyInternal(
+                session_hash=session_hash, data=[], request=request
+            )
+            unload_fn_indices = [
+                i
+                for i, dep in app.get_blocks().fns.items()
+                if any(t for t in dep.targets if t[1] == "unload")
+            ]
+            for fn_index in unload_fn_indices:
+                background_tasks.add_task(
+                    route_utils.call_process_api,
+                    app=app,
+                    body=body,
+                    gr_request=req,
+                    fn=app.get_blocks().fns[fn_index],
+                    root_path=root_path,
+                )
+            # This will mark the state to be deleted in an hour
+            if session_hash in app.state_holder.session_data:
+                app.state_holder.session_data[session_hash].is_closed = True
+            for event_id in app.get_blocks()._queue.pending_event_ids_session.get(
+                session_hash, []
+            ):
+                event = app.get_blocks()._queue.event_ids_to_events[event_id]
+                event.run_time = math.inf
+                event.signal.set()
+
         # had to use '/run' endpoint for Colab compatibility, '/api' supported for backwards compatibility
         @router.post("/run/{api_name}", dependencies=[Depends(login_check)])
         @router.post("/run/{api_name}/", dependencies=[Depends(login_check)])
@@ -1000,6 +1044,8 @@ class App(FastAPI):
                     content=content,
                     status_code=500,
                 )
+            # Only used by the queue to finish the events of a batch separately
+            output.pop("finished_items", None)
             return output
 
         @router.post("/call/{api_name}", dependencies=[Depends(login_check)])
@@ -1050,11 +1096,12 @@ class App(FastAPI):
                 body=body, request=request, username=username
             )
             if not success:
-                status_code = (
-                    status.HTTP_503_SERVICE_UNAVAILABLE
-                    if "Queue is full." in event_id
-                    else status.HTTP_400_BAD_REQUEST
-                )
+                if "Queue is full." in event_id:
+                    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+                elif "Too many requests." in event_id:
+                    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+                else:
+                    status_code = status.HTTP_400_BAD_REQUEST
                 raise HTTPException(status_code=status_code, detail=event_id)
             return {"event_id": event_id}
 
@@ -1113,6 +1160,23 @@ class App(FastAPI):
             request: fastapi.Request,
             session_hash: str,
         ):
+            if wire_format.accepts_msgpack(request):
+
+                def process_msg(message: EventMessage) -> bytes:
+                    msg = message.model_dump()
+                    if isinstance(msg.get("output"), dict) and "data" in msg["output"]:
+                        msg["output"]["data"] = wire_format.inline_files(
+                            msg["output"]["data"], app.uploaded_file_dir
+                        )
+                    return wire_format.encode(msg)
+
+                return await queue_data_helper(
+                    request,
+                    session_hash,
+                    process_msg,
+                    media_type=wire_format.MSGPACK_MEDIA_TYPE,
+                )
+
             def process_msg(message: EventMessage) -> str:
                 return f"data: {orjson.dumps(message.model_dump(), default=str).decode('utf-8')}\n\n"
 
@@ -1121,15 +1185,25 @@ class App(FastAPI):
         async def queue_data_helper(
             request: fastapi.Request,
             session_hash: str,
-            process_msg: Callable[[EventMessage], str | None],
+            process_msg: Callable[[EventMessage], str | bytes | None],
+            media_type: str = "text/event-stream",
         ):
             blocks = app.get_blocks()
 
+            # StreamingResponse cancels this generator as soon as the client disconnects,
+            # which also interrupts the wait for the next message
             async def sse_stream(request: fastapi.Request):
+                # Sessions with an open stream are never evicted from the queue
+                channel = blocks._queue.pending_messages_per_session.get(session_hash)
+                if channel is not None:
+                    channel.streams += 1
                 try:
                     last_heartbeat = time.perf_counter()
                     while True:
                         if await request.is_disconnected():
+                            blocks._queue.pending_messages_per_session.pop(
+                                session_hash, None
+                            )
                             await blocks._queue.clean_events(session_hash=session_hash)
                             return
 
@@ -1143,28 +1217,40 @@ class App(FastAPI):
                             )
 
                         heartbeat_rate = 15
-                        check_rate = 0.05
+                        messages = blocks._queue.pending_messages_per_session[
+                            session_hash
+                        ]
                         message = None
-                        try:
-                            messages = blocks._queue.pending_messages_per_session[
-                                session_hash
-                            ]
-                            message = messages.get_nowait()
-                        except EmptyQueue:
-                            await asyncio.sleep(check_rate)
-                            if time.perf_counter() - last_heartbeat > heartbeat_rate:
-                                # Fix this
-                                message = HeartbeatMessage()
-                                # Need to reset last_heartbeat with perf_counter
-                                # otherwise only a single hearbeat msg will be sent
-                                # and then the stream will retry leading to infinite queue 😬
-                                last_heartbeat = time.perf_counter()
+                        if not blocks._queue.stopped:
+                            message = await messages.get(
+                                timeout=max(
+                                    0,
+                                    last_heartbeat
+                                    + heartbeat_rate
+                                    - time.perf_counter(),
+                                )
+                            )
+                        if (
+                            message is None
+                            and time.perf_counter() - last_heartbeat >= heartbeat_rate
+                        ):
+                            message = HeartbeatMessage()
+                            # Need to reset last_heartbeat with perf_counter
+                            # otherwise only a single hearbeat msg will be sent
+                            # and then the stream will retry leading to infinite queue 😬
+                            last_heartbeat = time.perf_counter()
 
                         if blocks._queue.stopped:
+                            # Nothing will be sent to this stream anymore, so it is closed
+                            # instead of waiting for messages that will never come
                             message = UnexpectedErrorMessage(
                                 message="Server stopped unexpectedly.",
                                 success=False,
                             )
+                            response = process_msg(message)
+                            if response is not None:
+                                yield response
+                            return
                         if message:
                             response = process_msg(message)
                             if response is not None:
@@ -1203,11 +1289,201 @@ class App(FastAPI):
                     if response is not None:
                         yield response
                     raise e
+                finally:
+                    if channel is not None:
+                        channel.streams -= 1
 
             return StreamingResponse(
                 sse_stream(request),
-                media_type="text/event-stream",
+                media_type=media_type,
+            )
+
+        @router.websocket("/queue/ws")
+        async def queue_websocket(websocket: WebSocket, session_hash: str):
+            """
+            A single connection per session that does the work of the /heartbeat, /queue/join, /queue/data and
+            /stream/{event_id} endpoints. The client sends frames of these types (as JSON, or MessagePack):
+                {"type": "join", "id": ..., "body": PredictBody}: answered with {"msg": "joined", "id": ..., "event_id": ...}, or {"msg": "join_failed", "id": ..., "status_code": ..., "detail": ...}
+                {"type": "stream", "event_id": ..., "body": PredictBody}: the next input of a streaming event
+                {"type": "close_stream", "event_id": ...}: the end of the input of a streaming event
+                {"type": "cancel", "body": CancelBody}
+            and receives the messages of every event of the session, as on /queue/data, and heartbeats. Invalid frames
+            are answered with {"msg": "frame_failed", "id": ..., "status_code": ..., "detail": ...} (or "join_failed"
+            for joins) instead of closing the connection. The connection stays open once the events are done, and the
+            session is closed when it is, as when its heartbeat stops.
+            Messages are sent as MessagePack if the `wire_format=msgpack` query parameter is set.
+            """
+            request = route_utils.websocket_to_request(websocket, "/queue/join")
+            username = get_current_user(request)
+            if (
+                app.auth is not None or app.auth_dependency is not None
+            ) and username is None:
+                await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+                return
+            use_msgpack = (
+                websocket.query_params.get("wire_format") == "msgpack"
+                and wire_format.msgpack is not None
             )
+            blocks = app.get_blocks()
+            if blocks._queue.server_app is None:
+                blocks._queue.set_server_app(app)
+            await websocket.accept()
+
+            # The messages of the events joined through this connection are put in this
+            # channel, which is never evicted from the queue while the connection is open
+            channel = await blocks._queue.get_session_channel(session_hash)
+            channel.streams += 1
+            # Replies to joins are sent before the messages of the events they create
+            send_lock = asyncio.Lock()
+
+            async def send(message: dict):
+                if use_msgpack:
+                    if (
+                        isinstance(message.get("output"), dict)
+                        and "data" in message["output"]
+                    ):
+                        message["output"]["data"] = wire_format.inline_files(
+                            message["output"]["data"], app.uploaded_file_dir
+                        )
+                    await websocket.send_bytes(wire_format.encode(message))
+                else:
+                    await websocket.send_text(
+                        orjson.dumps(message, default=str).decode("utf-8")
+                    )
+
+            async def send_messages():
+                heartbeat_rate = 15
+                last_heartbeat = time.perf_counter()
+                while not blocks._queue.stopped:
+                    message = await channel.get(
+                        timeout=max(
+                            0, last_heartbeat + heartbeat_rate - time.perf_counter()
+                        )
+                    )
+                    if message is None:
+                        if time.perf_counter() - last_heartbeat < heartbeat_rate:
+                            continue
+                        message = HeartbeatMessage()
+                        last_heartbeat = time.perf_counter()
+                    if (
+                        isinstance(message, ProcessCompletedMessage)
+                        and message.event_id
+                    ):
+                        blocks._queue.pending_event_ids_session.get(
+                            session_hash, set()
+                        ).discard(message.event_id)
+                    async with send_lock:
+                        await send(message.model_dump())
+                async with send_lock:
+                    await send(
+                        UnexpectedErrorMessage(
+                            message=ServerMessage.server_stopped, success=False
+                        ).model_dump()
+                    )
+                await websocket.close()
+
+            async def join(data: dict) -> dict:
+                try:
+                    body = PredictBody(**data["body"])
+                    body.session_hash = session_hash
+                    response = await queue_join_helper(body, request, username)
+                except HTTPException as e:
+                    return {
+                        "msg": "join_failed",
+                        "id": data.get("id"),
+                        "status_code": e.status_code,
+                        "detail": e.detail,
+                    }
+                except (KeyError, TypeError, ValidationError) as e:
+                    return {
+                        "msg": "join_failed",
+                        "id": data.get("id"),
+                        "status_code": status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        "detail": str(e),
+                    }
+                return {
+                    "msg": "joined",
+                    "id": data.get("id"),
+                    "event_id": response["event_id"],
+                }
+
+            async def handle_frame(data: dict):
+                kind = data.get("type")
+                if kind == "join":
+                    async with send_lock:
+                        await send(await join(data))
+                    return
+                if kind == "cancel":
+                    await cancel_event(CancelBody(**data["body"]))
+                    return
+                event = blocks._queue.event_ids_to_events.get(data.get("event_id"))
+                if event is None:
+                    return
+                if kind == "stream":
+                    body = PredictBody(**data["body"])
+                    event.data = PredictBodyInternal(**body.model_dump(), request=None)
+                elif kind == "close_stream":
+                    event.run_time = math.inf
+                event.signal.set()
+
+            sender = asyncio.create_task(send_messages())
+            try:
+                while True:
+                    data = None
+                    try:
+                        data, binary = await receive_websocket_data(
+                            websocket, save_files=False
+                        )
+                        if not isinstance(data, dict):
+                            raise TypeError(
+                                "Frames must be JSON or MessagePack objects."
+                            )
+                        if binary:
+                            data = save_inline_files(data)
+                        await handle_frame(data)
+                    except WebSocketDisconnect:
+                        raise
+                    except Exception as e:
+                        # An invalid frame is answered with an error instead of closing the
+                        # connection, which would cancel every event of the session
+                        invalid = isinstance(e, (KeyError, TypeError, ValueError))
+                        if not invalid:
+                            traceback.print_exc()
+                        frame = data if isinstance(data, dict) else {}
+                        reply = {
+                            "msg": "join_failed"
+                            if frame.get("type") == "join"
+                            else "frame_failed",
+                            "id": frame.get("id"),
+                            "status_code": status.HTTP_422_UNPROCESSABLE_ENTITY
+                            if invalid
+                            else status.HTTP_500_INTERNAL_SERVER_ERROR,
+                            "detail": str(e),
+                        }
+                        async with send_lock:
+                            await send(reply)
+            except WebSocketDisconnect:
+                pass
+            finally:
+                sender.cancel()
+                # Retrieves the exception of the sender, if it failed
+                await asyncio.gather(sender, return_exceptions=True)
+                channel.streams -= 1
+                if (
+                    blocks._queue.pending_messages_per_session.get(session_hash)
+                    is channel
+                ):
+                    blocks._queue.pending_messages_per_session.pop(session_hash)
+                await blocks._queue.clean_events(session_hash=session_hash)
+                background_tasks = BackgroundTasks()
+                close_session(
+                    request,
+                    username,
+                    session_hash,
+                    f"{API_PREFIX}/queue/join",
+                    background_tasks,
+                )
+                await background_tasks()
 
         async def get_item_or_file(
             request: fastapi.Request,
@@ -1274,7 +1550,7 @@ class App(FastAPI):
             request: fastapi.Request,
         ):
             body = await get_item_or_file(request)
-            state = app.state_holder[body.session_hash]
+            state = await app.state_holder.get(body.session_hash)
             component_id = body.component_id
             block: Block
             if component_id in state:
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any
+
+
+class StateBackend(ABC):
+    """
+    An abstract class for stores that share the gr.State values of sessions between several server processes, so
+    that any of them can serve the requests of a session. Pass an instance as the `state_backend` parameter of
+    `launch()`. By default (if no backend is set), state is only kept in the memory of the server process.
+
+    The state of a session is stored as a whole, with a version number that increases every time it is saved, so that
+    a process only loads it again when another process has changed it, and does not overwrite the changes that another
+    process made since it last loaded the state.
+    """
+
+    @abstractmethod
+    def load(self, session_hash: str, version: int) -> tuple[int, Any] | None:
+        """
+        Returns the version and the data of the state of the session, if it was saved after `version`, and None
+        otherwise (including if the session has no saved state).
+        Parameters:
+            session_hash: the session whose state to load.
+            version: the version of the state that the caller already has (0 if it has none).
+        """
+        pass
+
+    @abstractmethod
+    def save(self, session_hash: str, data: Any, version: int) -> int | None:
+        """
+        Saves the state of the session if its saved version is still `version` (or if it has no saved state), and
+        returns its new version, which must be greater than any previous version of the state of the session (even if
+        it was deleted since). Returns None, without saving the state, if another process saved it since.
+        Parameters:
+            session_hash: the session whose state to save.
+            data: the state of the session, which must be picklable.
+            version: the version of the state that the caller last loaded or saved (0 if it has none).
+        """
+        pass
+
+
+class SQLiteStateBackend(StateBackend):
+    """
+    Shares the gr.State values of sessions between the server processes of a host through a SQLite database file.
+    Since the states are unpickled when they are loaded, anyone who can write to the file can run code in the server
+    processes: the file must only be writable by the user that runs them. If it does not exist, it is created with
+    permissions that only allow that user to read and write it (which SQLite also gives to its WAL files).
+    Example:
+        import gradio as gr
+        with gr.Blocks() as demo:
+            ...
+        demo.launch(state_backend=gr.SQLiteStateBackend("state.db"))
+    """
+
+    def __init__(self, path: str | Path, ttl: float | None = 24 * 60 * 60):
+        """
+        Parameters:
+            path: the path of the database file, which is created if it does not exist. Every process that serves the app should use the same file.
+            ttl: the number of seconds after which the state of a session that has not been saved again is deleted. If None, states are never deleted.
+        """
+        self.path = str(path)
+        self.ttl = ttl
+        # sqlite3 connections cannot be shared between threads
+        self.local = threading.local()
+        self.last_expired = 0.0
+        os.close(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600))
+        with self.connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS session_state ("
+                "session_hash TEXT PRIMARY KEY, version INTEGER NOT NULL, "
+                "updated_at REAL NOT NULL, data BLOB NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS session_state_updated_at "
+                "ON session_state (updated_at)"
+            )
+
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            # Readers do not block the writer (and vice versa) in WAL mode
+            connection.execute("PRAGMA journal_mode=WAL")
+            self.local.connection = connection
+        return connection
+
+    def load(self, session_hash: str, version: int) -> tuple[int, Any] | None:
+        row = (
+            self.connection()
+            .execute(
+                "SELECT version, data FROM session_state "
+                "WHERE session_hash = ? AND version > ?",
+                (session_hash, version),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        return row[0], pickle.loads(row[1])
+
+    def save(self, session_hash: str, data: Any, version: int) -> int | None:
+        blob = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        # Versions are based on the time, so that they keep increasing if the state
+        # of a session expires and is then saved again
+        new_version = max(time.time_ns(), version + 1)
+        with self.connection() as connection:
+            # Only replaces the state that the caller loaded, so that the changes made
+            # by other processes since are not overwritten
+            saved = connection.execute(
+                "UPDATE session_state SET version = ?, updated_at = ?, data = ? "
+                "WHERE session_hash = ? AND version = ?",
+                (new_version, now, blob, session_hash, version),
+            ).rowcount
+            if not saved:
+                saved = connection.execute(
+                    "INSERT INTO session_state (session_hash, version, updated_at, data) "
+                    "VALUES (?, ?, ?, ?) ON CONFLICT (session_hash) DO NOTHING",
+                    (session_hash, new_version, now, blob),
+                ).rowcount
+            # Expired states are deleted at most once a minute
+            if self.ttl is not None and now - self.last_expired > 60:
+                self.last_expired = now
+                connection.execute(
+                    "DELETE FROM session_state WHERE updated_at < ?",
+                    (now - self.ttl,),
+                )
+        return new_version if saved else None
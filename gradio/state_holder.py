@@ -2,41 +2,110 @@ from __future__ import annotations
 
 import datetime
 import os
+import pickle
+import shutil
+import sys
+import tempfile
 import threading
-from collections import OrderedDict
-from collections.abc import Iterator
+import warnings
+from collections import OrderedDict, deque
+from collections.abc import Callable, Iterator
 from copy import copy, deepcopy
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, cast
+
+import anyio
 
 if TYPE_CHECKING:
     from gradio.blocks import Blocks
     from gradio.components import State
+    from gradio.state_backends import StateBackend
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimates the memory (in bytes) used by `value` and by the objects it holds, counting the buffers of arrays
+    and tensors (anything with an integer `nbytes` attribute) and each shared object only once.
+    """
+    size = 0
+    seen: set[int] = set()
+    stack = [value]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        obj_size = sys.getsizeof(obj, 0)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            stack.extend(obj)
+        elif isinstance(getattr(obj, "nbytes", None), int):
+            obj_size = max(obj_size, obj.nbytes)
+        elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+            stack.append(vars(obj))
+        size += obj_size
+    return size
 
 
 class StateHolder:
     def __init__(self):
         self.capacity = 10000
+        self.max_memory: int | None = None
         self.session_data: OrderedDict[str, SessionState] = OrderedDict()
         self.time_last_used: dict[str, datetime.datetime] = {}
-        self.lock = threading.Lock()
+        # Reentrant, since sessions report changes to their size while they are spilled
+        self.lock = threading.RLock()
+        # The memory used by the state of the sessions that are in memory (in bytes)
+        self.nbytes = 0
+        self.spill_directory: str | None = None
+        self.spills = 0
+        self.evictions = 0
+        self.backend: StateBackend | None = None
 
     def set_blocks(self, blocks: Blocks):
         self.blocks = blocks
         blocks.state_holder = self
         self.capacity = blocks.state_session_capacity
+        self.max_memory = blocks.max_state_memory
+        self.backend = blocks.state_backend
 
     def reset(self, blocks: Blocks):
         """Reset the state holder with new blocks. Used during reload mode."""
+        for session_state in self.session_data.values():
+            session_state.on_resize = None
         self.session_data = OrderedDict()
+        self.nbytes = 0
+        if self.spill_directory is not None:
+            shutil.rmtree(self.spill_directory, ignore_errors=True)
+            self.spill_directory = None
         # Call set blocks again to set new ids
         self.set_blocks(blocks)
 
     def __getitem__(self, session_id: str) -> SessionState:
-        if session_id not in self.session_data:
-            self.session_data[session_id] = SessionState(self.blocks)
-        self.update(session_id)
-        self.time_last_used[session_id] = datetime.datetime.now()
-        return self.session_data[session_id]
+        with self.lock:
+            if session_id not in self.session_data:
+                session_state = SessionState(self.blocks)
+                session_state.on_resize = self.resize
+                session_state.measure_size = self.max_memory is not None
+                session_state.session_hash = session_id
+                session_state.backend = self.backend
+                self.session_data[session_id] = session_state
+            self.update(session_id)
+            self.time_last_used[session_id] = datetime.datetime.now()
+            return self.session_data[session_id]
+
+    async def get(self, session_id: str) -> SessionState:
+        """
+        Like `state_holder[session_id]`, but also loads the state of the session back into memory if it was spilled
+        to disk, and spills other sessions if needed to stay under `max_memory`, and loads the state from the backend
+        if another process saved a newer version of it. The I/O is done in a worker thread, so that it does not block
+        the event loop.
+        """
+        session_state = self[session_id]
+        if self.max_memory is not None or self.backend is not None:
+            await anyio.to_thread.run_sync(self.load, session_id, session_state)
+        return session_state
 
     def __contains__(self, session_id: str):
         return session_id in self.session_data
@@ -46,12 +115,100 @@ class StateHolder:
             if session_id in self.session_data:
                 self.session_data.move_to_end(session_id)
             if len(self.session_data) > self.capacity:
-                self.session_data.popitem(last=False)
+                _, session_state = self.session_data.popitem(last=False)
+                self._drop(session_state)
+
+    def load(self, session_id: str, session_state: SessionState):
+        """
+        Loads the state of the session back into memory, if it was spilled, and spills other sessions if needed. Also
+        loads the state from the backend, if another process saved a newer version of it.
+        """
+        session_state.load()
+        session_state.sync()
+        self.spill(keep=session_id)
+
+    def resize(self, nbytes: int):
+        with self.lock:
+            self.nbytes += nbytes
+
+    def spill(self, keep: str | None = None):
+        """
+        Moves the state of the least recently used sessions to disk, except `keep` and the sessions with pending
+        events, until the state in memory is no longer over `max_memory`. A spilled session is loaded back into
+        memory the next time its state is accessed. Sessions whose state cannot be pickled are evicted instead. The
+        sessions are picked under the lock, but pickled outside of it, so that other sessions can be used meanwhile.
+        """
+        if self.max_memory is None:
+            return
+        with self.lock:
+            nbytes = self.nbytes
+            to_spill = []
+            for session_id, session_state in self.session_data.items():
+                if nbytes <= self.max_memory:
+                    break
+                if (
+                    session_id == keep
+                    or session_state.spilled
+                    or not session_state.nbytes
+                    or self.blocks._queue.has_pending_events(session_id)
+                ):
+                    continue
+                to_spill.append((session_id, session_state))
+                nbytes -= session_state.nbytes
+            if to_spill and self.spill_directory is None:
+                self.spill_directory = tempfile.mkdtemp(prefix="gradio_state_")
+            spill_directory = cast(str, self.spill_directory)
+        for session_id, session_state in to_spill:
+            spilled = session_state.spill(spill_directory)
+            with self.lock:
+                if spilled:
+                    self.spills += 1
+                elif self.session_data.get(session_id) is session_state:
+                    del self.session_data[session_id]
+                    self._drop(session_state)
+                    self.evictions += 1
+
+    def _drop(self, session_state: SessionState):
+        session_state.on_resize = None
+        self.nbytes -= session_state.nbytes
+        session_state.discard_spill()
+
+    def get_session_memory(self) -> dict[str, dict[str, Any]]:
+        """
+        Returns, for each session, the estimated memory used by its state (in bytes), whether its state is spilled to
+        disk, and the size of the file it is spilled to (in bytes).
+        """
+        return {
+            session_id: {
+                "memory_bytes": session_state.nbytes,
+                "spilled": session_state.spilled,
+                "disk_bytes": session_state.disk_bytes,
+            }
+            for session_id, session_state in list(self.session_data.items())
+        }
+
+    def get_metrics(self) -> dict[str, Any]:
+        """
+        Returns the number of sessions, the memory used by their state (in bytes), the number of sessions whose state
+        is spilled to disk, and the number of times a session was spilled, or evicted because its state could not be
+        pickled, to stay under `max_memory`.
+        """
+        return {
+            "sessions": len(self.session_data),
+            "memory_bytes": self.nbytes,
+            "max_memory": self.max_memory,
+            "spilled_sessions": sum(
+                session_state.spilled
+                for session_state in list(self.session_data.values())
+            ),
+            "spills": self.spills,
+            "evictions": self.evictions,
+        }
 
     def delete_all_expired_state(
         self,
     ):
-        for session_id in self.session_data:
+        for session_id in list(self.session_data):
             self.delete_state(session_id, expired_only=True)
 
     def delete_state(self, session_id: str, expired_only: bool = False):
@@ -59,18 +216,24 @@ class StateHolder:
             return
         to_delete = []
         session_state = self.session_data[session_id]
+        # Checked first so that spilled sessions are only loaded if they have expired state
+        if expired_only and not session_state.has_expired_state():
+            return
         for component, value, expired in session_state.state_components:
             if not expired_only or expired:
                 component.delete_callback(value)
                 to_delete.append(component._id)
         for component in to_delete:
-            del session_state.state_data[component]
+            del session_state[component]
+        session_state.save()
 
 
 class SessionState:
     def __init__(self, blocks: Blocks):
         self.blocks_config = copy(blocks.default_config)
-        self.state_data: dict[int, Any] = {}
+        self._state_data: dict[int, Any] = {}
+        # The estimated memory used by each value in the state (in bytes)
+        self._sizes: dict[int, int] = {}
         self._state_ttl = {}
         self.is_closed = False
         # When a session is closed, the state is stored for an hour to give the user time to reopen the session.
@@ -78,12 +241,154 @@ class SessionState:
         self.STATE_TTL_WHEN_CLOSED = (
             1 if os.getenv("GRADIO_IS_E2E_TEST", None) else 3600
         )
+        # The file that the state is pickled to while the session is spilled to disk
+        self.spill_path: str | None = None
+        self.on_resize: Callable[[int], None] | None = None
+        # Whether the memory used by each value is estimated, which is only needed if
+        # the memory used by the state of all sessions is bounded
+        self.measure_size = False
+        self.lock = threading.Lock()
+        # Set by the StateHolder when the state is shared with other processes
+        self.session_hash: str | None = None
+        self.backend: StateBackend | None = None
+        # The version of the state last loaded from, or saved to, the backend, and
+        # whether the state was modified since
+        self.version = 0
+        self.modified = False
+        self.backend_lock = threading.Lock()
+
+    @property
+    def state_data(self) -> dict[int, Any]:
+        if self.spill_path is not None:
+            self.load()
+        return self._state_data
+
+    @property
+    def nbytes(self) -> int:
+        """The estimated memory used by the state, or 0 while it is spilled to disk."""
+        return 0 if self.spilled else sum(self._sizes.values())
+
+    @property
+    def spilled(self) -> bool:
+        return self.spill_path is not None
+
+    @property
+    def disk_bytes(self) -> int:
+        """The size of the file that the state is spilled to, or 0 if it is in memory."""
+        spill_path = self.spill_path
+        return 0 if spill_path is None else os.path.getsize(spill_path)
+
+    def spill(self, directory: str) -> bool:
+        """Pickles the state to a file in `directory` and frees it from memory. Returns False if it cannot be pickled."""
+        with self.lock:
+            if self.spill_path is not None:
+                return True
+            fd, path = tempfile.mkstemp(dir=directory, suffix=".pkl")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(self._state_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            except (pickle.PicklingError, TypeError, AttributeError):
+                os.remove(path)
+                return False
+            nbytes = self.nbytes
+            self._state_data = {}
+            self.spill_path = path
+        self._resize(-nbytes)
+        return True
+
+    def load(self):
+        """Loads the state back into memory after it was spilled to disk."""
+        with self.lock:
+            if self.spill_path is None:
+                return
+            with open(self.spill_path, "rb") as f:
+                self._state_data = pickle.load(f)
+            os.remove(self.spill_path)
+            self.spill_path = None
+        self._resize(self.nbytes)
+
+    def discard_spill(self):
+        with self.lock:
+            if self.spill_path is not None:
+                os.remove(self.spill_path)
+                self.spill_path = None
+                self._state_data = {}
+                self._sizes = {}
+
+    def sync(self):
+        """Loads the state from the backend, if another process saved a newer version of it."""
+        if self.backend is None or self.session_hash is None:
+            return
+        with self.backend_lock:
+            self._sync()
+
+    def _sync(self):
+        saved = self.backend.load(self.session_hash, self.version)  # type: ignore
+        if saved is None:
+            return
+        nbytes = self.nbytes
+        self.discard_spill()
+        self.version, (self._state_data, self._state_ttl) = saved
+        self._sizes = {
+            key: estimate_size(value) if self.measure_size else 0
+            for key, value in self._state_data.items()
+        }
+        self.modified = False
+        self._resize(self.nbytes - nbytes)
+
+    def save(self):
+        """
+        Saves the state to the backend, if it was modified since it was last loaded or saved. If another process saved
+        the state since, its version is loaded instead, so that its changes are not overwritten.
+        """
+        if self.backend is None or self.session_hash is None or not self.modified:
+            return
+        state_data = self.state_data
+        with self.backend_lock:
+            self.modified = False
+            for _ in range(3):
+                # Copied, so that values set by other events while the state is pickled are not lost
+                data = (dict(state_data), dict(self._state_ttl))
+                try:
+                    version = self.backend.save(self.session_hash, data, self.version)
+                    break
+                except RuntimeError:
+                    # A value was changed by another event while it was pickled
+                    continue
+                except (pickle.PicklingError, TypeError, AttributeError) as e:
+                    warnings.warn(
+                        f"The gr.State values of a session could not be saved to the state backend, so they are only available to this server process: {e}"
+                    )
+                    return
+            else:
+                # Saved after the next event instead
+                self.modified = True
+                return
+            if version is None:
+                warnings.warn(
+                    "The gr.State values of a session were saved by another server process while an event was running, so the values set by the event were replaced by those."
+                )
+                self._sync()
+            else:
+                self.version = version
+
+    def _resize(self, nbytes: int):
+        if nbytes and self.on_resize is not None:
+            self.on_resize(nbytes)
+
+    def _set_state_value(self, key: int, value: Any):
+        state_data = self.state_data
+        state_data[key] = value
+        self.modified = True
+        size = estimate_size(value) if self.measure_size else 0
+        self._resize(size - self._sizes.get(key, 0))
+        self._sizes[key] = size
 
     def __getitem__(self, key: int) -> Any:
         block = self.blocks_config.blocks[key]
         if block.stateful:
             if key not in self.state_data:
-                self.state_data[key] = deepcopy(getattr(block, "value", None))
+                self._set_state_value(key, deepcopy(getattr(block, "value", None)))
             return self.state_data[key]
         else:
             return block
@@ -97,10 +402,15 @@ class SessionState:
                 block.time_to_live,
                 datetime.datetime.now(),
             )
-            self.state_data[key] = value
+            self._set_state_value(key, value)
         else:
             self.blocks_config.blocks[key] = value
 
+    def __delitem__(self, key: int):
+        del self.state_data[key]
+        self.modified = True
+        self._resize(-self._sizes.pop(key, 0))
+
     def __contains__(self, key: int):
         block = self.blocks_config.blocks[key]
         if block.stateful:
@@ -108,19 +418,26 @@ class SessionState:
         else:
             return key in self.blocks_config.blocks
 
-    @property
-    def state_components(self) -> Iterator[tuple[State, Any, bool]]:
+    def _state_expiry(self) -> Iterator[tuple[State, int, bool]]:
         from gradio.components import State
 
-        for id in self.state_data:
+        # The ids in `_sizes` are those in the state, without loading it if it is spilled
+        for id in list(self._sizes):
             block = self.blocks_config.blocks[id]
             if isinstance(block, State) and id in self._state_ttl:
                 time_to_live, created_at = self._state_ttl[id]
                 if self.is_closed:
                     time_to_live = self.STATE_TTL_WHEN_CLOSED
-                value = self.state_data[id]
                 yield (
                     block,
-                    value,
+                    id,
                     (datetime.datetime.now() - created_at).seconds > time_to_live,
                 )
+
+    def has_expired_state(self) -> bool:
+        return any(expired for _, _, expired in self._state_expiry())
+
+    @property
+    def state_components(self) -> Iterator[tuple[State, Any, bool]]:
+        for block, id, expired in self._state_expiry():
+            yield block, self.state_data[id], expired
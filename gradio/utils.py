@@ -17,6 +17,7 @@ import pkgutil
 import posixpath
 import re
 import shutil
+import struct
 import subprocess
 import sys
 import tempfile
@@ -34,6 +35,7 @@ from collections.abc import (
     Hashable,
     Iterable,
     Iterator,
+    Mapping,
     MutableMapping,
     Sequence,
 )
@@ -671,10 +673,49 @@ def run_sync_iterator_async(iterator):
         raise StopAsyncIteration() from None
 
 
+class ThreadPool:
+    """
+    Runs sync functions in worker threads, at most `limiter.total_tokens` at a time (or as many as anyio's default
+    thread limiter allows if `limiter` is None), and counts how often a call found every thread busy.
+    """
+
+    def __init__(self, limiter: anyio.CapacityLimiter | None = None) -> None:
+        self._limiter = limiter
+        self.calls = 0
+        self.saturated_calls = 0
+
+    @property
+    def limiter(self) -> anyio.CapacityLimiter:
+        return self._limiter or anyio.to_thread.current_default_thread_limiter()
+
+    async def run_sync(self, fn: Callable, *args: Any) -> Any:
+        limiter = self.limiter
+        self.calls += 1
+        if limiter.borrowed_tokens >= limiter.total_tokens:
+            self.saturated_calls += 1
+        return await anyio.to_thread.run_sync(fn, *args, limiter=limiter)
+
+    def get_metrics(self) -> dict[str, Any]:
+        """
+        Returns the number of threads, how many of them are busy, how many calls are waiting for a thread, and how
+        many calls in total, and how many of them, found every thread busy.
+        """
+        statistics = self.limiter.statistics()
+        return {
+            "total_threads": statistics.total_tokens,
+            "busy_threads": statistics.borrowed_tokens,
+            "waiting_calls": statistics.tasks_waiting,
+            "calls": self.calls,
+            "saturated_calls": self.saturated_calls,
+        }
+
+
 class SyncToAsyncIterator:
     """Treat a synchronous iterator as async one."""
 
-    def __init__(self, iterator, limiter) -> None:
+    def __init__(
+        self, iterator, limiter: anyio.CapacityLimiter | ThreadPool | None
+    ) -> None:
         self.iterator = iterator
         self.limiter = limiter
 
@@ -682,6 +723,8 @@ class SyncToAsyncIterator:
         return self
 
     async def __anext__(self):
+        if isinstance(self.limiter, ThreadPool):
+            return await self.limiter.run_sync(run_sync_iterator_async, self.iterator)
         return await anyio.to_thread.run_sync(
             run_sync_iterator_async, self.iterator, limiter=self.limiter
         )
@@ -1256,6 +1299,105 @@ def diff(old, new):
     return compare_objects(old, new)
 
 
+class StreamingDiff:
+    """
+    Computes the diffs between the successive values of a streaming output, with the same result as `diff`. Values
+    that change at the end (e.g. the history of a chatbot whose last message is being streamed) are diffed in time
+    proportional to the size of the change rather than to the size of the whole value: the path of the first edit
+    of the last diff is remembered, and in each list along that path, the elements that come before it are compared
+    all at once, in C, instead of one by one.
+    """
+
+    def __init__(self, value: Any = None):
+        self.value = value
+        self.hint: list[int | str] = []
+
+    def update(self, value: Any) -> list:
+        """Returns the diff from the previous value to `value`, which becomes the previous value."""
+        edits = []
+        self._compare(self.value, value, [], self.hint, edits)
+        self.value = value
+        if edits:
+            self.hint = edits[0][1]
+        return edits
+
+    def _compare(
+        self,
+        obj1: Any,
+        obj2: Any,
+        path: list[int | str],
+        hint: list[int | str] | None,
+        edits: list,
+    ):
+        # Containers along the hinted path are not compared as a whole first, since
+        # they most likely differ, and are then compared element by element anyway
+        if (
+            not (hint and type(obj1) is type(obj2) and type(obj1) in (list, dict))
+            and obj1 == obj2
+        ):
+            return
+
+        if type(obj1) != type(obj2):
+            edits.append(("replace", path, obj2))
+            return
+
+        if isinstance(obj1, str) and obj2.startswith(obj1):
+            edits.append(("append", path, obj2[len(obj1) :]))
+            return
+
+        if isinstance(obj1, list):
+            common_length = min(len(obj1), len(obj2))
+            start = 0
+            if (
+                hint
+                and isinstance(hint[0], int)
+                and 0 < hint[0] <= common_length
+                and obj1[: hint[0]] == obj2[: hint[0]]
+            ):
+                start = hint[0]
+            for i in range(start, common_length):
+                sub_hint = hint[1:] if hint and hint[0] == i else None
+                self._compare(obj1[i], obj2[i], path + [i], sub_hint, edits)
+            for i in range(common_length, len(obj1)):
+                edits.append(("delete", path + [i], None))
+            for i in range(common_length, len(obj2)):
+                edits.append(("add", path + [i], obj2[i]))
+            return
+
+        if isinstance(obj1, dict):
+            for key in obj1:
+                if key in obj2:
+                    sub_hint = hint[1:] if hint and hint[0] == key else None
+                    self._compare(obj1[key], obj2[key], path + [key], sub_hint, edits)
+                else:
+                    edits.append(("delete", path + [key], None))
+            for key in obj2:
+                if key not in obj1:
+                    edits.append(("add", path + [key], obj2[key]))
+            return
+
+        edits.append(("replace", path, obj2))
+
+
+def merge_diffs(diff: list, new_diff: list) -> list:
+    """
+    Returns a diff (as computed by `diff`) that has the effect of applying `diff` and then `new_diff`. Consecutive
+    appends to the same value are merged into one.
+    """
+    merged = list(diff)
+    for action, path, value in new_diff:
+        if (
+            action == "append"
+            and merged
+            and merged[-1][0] == "append"
+            and list(merged[-1][1]) == list(path)
+        ):
+            merged[-1] = ("append", path, merged[-1][2] + value)
+        else:
+            merged.append((action, path, value))
+    return merged
+
+
 def get_upload_folder() -> str:
     return os.environ.get("GRADIO_TEMP_DIR") or str(
         (Path(tempfile.gettempdir()) / "gradio").resolve()
@@ -1403,6 +1545,134 @@ def deep_hash(obj):
     return hasher.hexdigest()
 
 
+# The number of bytes of a NumPy array that are hashed by `state_fingerprint`. Larger
+# arrays are fingerprinted from an evenly spaced sample of their elements.
+MAX_FINGERPRINT_ARRAY_BYTES = 8_192
+
+# Lists, tuples and dicts with at least this many items, whose first and last items serialize
+# to at most MAX_SERIALIZED_ITEM_BYTES bytes of JSON, are fingerprinted by `state_fingerprint`
+# from their serialization with orjson, which is faster than walking many small items in Python.
+MIN_SERIALIZED_ITEMS = 32
+MAX_SERIALIZED_ITEM_BYTES = 256
+
+
+def state_fingerprint(obj) -> bytes:
+    """
+    Computes a cheap fingerprint of a (possibly nested) value, which changes when the value is
+    modified. Used to detect which gr.State values were changed by an event, instead of `deep_hash`.
+    The value is digested with BLAKE2 from an encoding of the types and contents of its scalars and
+    containers, where strings are digested from their builtin hash (which Python caches on the
+    string), and long containers of small items from their JSON serialization. NumPy arrays are
+    fingerprinted from a sample of their buffer, other hashable objects from their builtin hash, and
+    other unhashable objects from their identity. Since builtin hashes of strings are randomized per
+    process, fingerprints can only be compared within the process that computed them.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    _update_fingerprint(digest, obj)
+    return digest.digest()
+
+
+def _update_fingerprint(digest, obj) -> None:
+    obj_type = type(obj)
+    if obj is None:
+        digest.update(b"N")
+    elif obj_type is bool:
+        digest.update(b"T" if obj else b"F")
+    elif obj_type is int:
+        digest.update(b"i%d;" % obj)
+    elif obj_type is float:
+        digest.update(b"f" + struct.pack("<d", obj))
+    elif obj_type is str:
+        digest.update(b"s%d;%d;" % (len(obj), hash(obj)))
+    elif obj_type is bytes:
+        digest.update(b"b%d;" % len(obj))
+        digest.update(obj)
+    elif isinstance(obj, (list, tuple)):
+        digest.update(b"l%s;%d;" % (_type_name(obj_type), len(obj)))
+        if not _update_serialized_fingerprint(digest, obj, obj):
+            for item in obj:
+                _update_fingerprint(digest, item)
+    elif isinstance(obj, dict):
+        digest.update(b"d%s;%d;" % (_type_name(obj_type), len(obj)))
+        if not _update_serialized_fingerprint(digest, obj, list(obj.values())):
+            for key, value in obj.items():
+                _update_fingerprint(digest, key)
+                _update_fingerprint(digest, value)
+    elif isinstance(obj, (set, frozenset)):
+        # Sets are digested in an order that does not depend on how they were built
+        digest.update(b"e%s;%d;" % (_type_name(obj_type), len(obj)))
+        for item_digest in sorted(state_fingerprint(item) for item in obj):
+            digest.update(item_digest)
+    else:
+        _update_object_fingerprint(digest, obj)
+
+
+def _update_serialized_fingerprint(digest, obj, items) -> bool:
+    """
+    Digests the JSON serialization of `obj` if it has many small items, and returns whether it did.
+    """
+    if len(items) < MIN_SERIALIZED_ITEMS:
+        return False
+    try:
+        if (
+            len(orjson.dumps(items[0], default=_fingerprint_default))
+            > MAX_SERIALIZED_ITEM_BYTES
+            or len(orjson.dumps(items[-1], default=_fingerprint_default))
+            > MAX_SERIALIZED_ITEM_BYTES
+        ):
+            return False
+        data = orjson.dumps(obj, default=_fingerprint_default)
+    except TypeError:  # e.g. non-string dict keys, or integers larger than 64 bits
+        return False
+    digest.update(b"j%d;" % len(data))
+    digest.update(data)
+    return True
+
+
+def _fingerprint_default(obj) -> str:
+    # Called by orjson for the values it cannot serialize, e.g. NumPy arrays, which are
+    # written as their fingerprint instead of all their elements
+    return "\x00" + state_fingerprint(obj).hex()
+
+
+def _update_object_fingerprint(digest, obj) -> None:
+    import numpy as np
+
+    name = _type_name(type(obj))
+    if isinstance(obj, np.generic):
+        # hash() of NumPy scalars collides like that of Python numbers, e.g. for -1 and -2
+        digest.update(b"g%s;%s;" % (name, obj.tobytes()))
+        return
+    if isinstance(obj, Hashable):
+        try:
+            digest.update(b"h%s;%d;" % (name, hash(obj)))
+            return
+        except TypeError:  # e.g. a hashable type holding unhashable items
+            pass
+    if isinstance(obj, np.ndarray) and not obj.dtype.hasobject:
+        _update_array_fingerprint(digest, obj)
+    else:
+        digest.update(b"o%s;%d;" % (name, id(obj)))
+
+
+@functools.cache
+def _type_name(obj_type: type) -> bytes:
+    return f"{obj_type.__module__}.{obj_type.__qualname__}".encode()
+
+
+def _update_array_fingerprint(digest, array) -> None:
+    import numpy as np
+
+    flat = array.reshape(-1)
+    if array.nbytes > MAX_FINGERPRINT_ARRAY_BYTES:
+        step = -(-array.nbytes // MAX_FINGERPRINT_ARRAY_BYTES)
+        flat = flat[::step]
+    digest.update(
+        b"a%d;%s;%s;" % (id(array), str(array.shape).encode(), array.dtype.str.encode())
+    )
+    digest.update(np.ascontiguousarray(flat).view(np.uint8))
+
+
 def error_payload(
     error: BaseException | None, show_error: bool
 ) -> dict[str, bool | str | float | None]:
@@ -1458,6 +1728,60 @@ class UnhashableKeyDict(MutableMapping):
         return [v for _, v in self.data]
 
 
+class CopyOnWriteDict(MutableMapping):
+    """
+    A dictionary that reads through to a `base` mapping, which is shared with other copies, and only stores the items
+    that are set or deleted in it, so that a copy costs almost nothing until it is modified. The base mapping is never
+    modified through the copy, but later changes to it are seen by the copy (except for the keys the copy has set or
+    deleted).
+    """
+
+    def __init__(self, base: Mapping):
+        self.base = base
+        self.changes: dict = {}
+        self.deleted: set = set()
+
+    def __getitem__(self, key):
+        try:
+            return self.changes[key]
+        except KeyError:
+            if key in self.deleted:
+                raise
+        return self.base[key]
+
+    def __setitem__(self, key, value):
+        self.changes[key] = value
+        self.deleted.discard(key)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.changes.pop(key, None)
+        if key in self.base:
+            self.deleted.add(key)
+
+    def __contains__(self, key):
+        return key in self.changes or (key not in self.deleted and key in self.base)
+
+    def __iter__(self):
+        # Keys keep the position they have in the base mapping, even if they were set in the copy
+        for key in self.base:
+            if key not in self.deleted:
+                yield key
+        for key in self.changes:
+            if key not in self.base:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __copy__(self):
+        new = CopyOnWriteDict(self.base)
+        new.changes = dict(self.changes)
+        new.deleted = set(self.deleted)
+        return new
+
+
 def safe_join(directory: DeveloperPath, path: UserProvidedPath) -> str:
     """Safely path to a base directory to avoid escaping the base directory.
     Borrowed from: werkzeug.security.safe_join"""
@@ -0,0 +1,105 @@
+"""
+The binary wire format of the queue: clients that send `Accept: application/vnd.msgpack` on `/queue/data` (and
+binary frames on the `/stream/{event_id}` websocket) get the messages of the queue as a stream of MessagePack maps
+instead of Server-Sent Events. Small output files are sent inline, as raw bytes in the `bytes` field of their
+FileData, so that the client does not have to fetch them separately. Requires the `msgpack` package.
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Any
+
+import fastapi
+from gradio_client import utils as client_utils
+
+from gradio import processing_utils, utils
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = client_utils.MSGPACK_MEDIA_TYPE
+# Output files up to this size (in bytes) are sent inline
+MAX_INLINE_FILE_SIZE = 1024 * 1024
+
+
+def accepts_msgpack(request: fastapi.Request) -> bool:
+    """Whether the client asked for MessagePack, and the `msgpack` package is installed so that it can be used."""
+    return msgpack is not None and MSGPACK_MEDIA_TYPE in request.headers.get(
+        "accept", ""
+    )
+
+
+def encode(message: dict[str, Any]) -> bytes:
+    if msgpack is None:
+        raise ModuleNotFoundError(
+            "'msgpack' must be installed to use the binary wire format. Please run `pip install msgpack`."
+        )
+    return msgpack.packb(message, default=str)
+
+
+def decode(data: bytes) -> Any:
+    if msgpack is None:
+        raise ModuleNotFoundError(
+            "'msgpack' must be installed to use the binary wire format. Please run `pip install msgpack`."
+        )
+    return msgpack.unpackb(data)
+
+
+def inline_files(
+    data: Any, cache_dir: str, max_size: int = MAX_INLINE_FILE_SIZE
+) -> Any:
+    """
+    Adds the content of the files in `data` that are in `cache_dir` (where Gradio keeps the files it serves) and are
+    at most `max_size` bytes to their FileData, as a `bytes` field.
+    """
+
+    def inline(file: dict) -> dict:
+        path = file.get("path")
+        if (
+            not path
+            or file.get("is_stream")
+            or client_utils.is_http_url_like(path)
+            or not utils.is_in_or_equal(path, cache_dir)
+        ):
+            return file
+        try:
+            if os.path.getsize(path) > max_size:
+                return file
+            return {**file, "bytes": Path(path).read_bytes()}
+        except OSError:
+            return file
+
+    return client_utils.traverse(data, inline, client_utils.is_file_obj_with_meta)
+
+
+def save_inline_files(
+    data: Any, upload_dir: str, max_file_size: int | None = None
+) -> tuple[Any, list[str]]:
+    """
+    Saves the `bytes` field of the FileData in `data` (e.g. the inputs sent by a client) to files in `upload_dir`, as
+    if they had been uploaded, and replaces the FileData with ones that point to them. Returns the new data, and the
+    paths of the saved files.
+    """
+    paths = []
+
+    def save(file: dict) -> dict:
+        if not isinstance(file.get("bytes"), bytes):
+            return file
+        content = file.pop("bytes")
+        if max_file_size is not None and len(content) > max_file_size:
+            raise ValueError(
+                f"File is larger than the maximum allowed size of {max_file_size} bytes."
+            )
+        name = client_utils.strip_invalid_filename_characters(
+            file.get("orig_name") or Path(file.get("path") or "").name
+        )
+        path = processing_utils.save_bytes_to_cache(content, name or "file", upload_dir)
+        paths.append(path)
+        return {**file, "path": path, "size": len(content)}
+
+    data = client_utils.traverse(data, save, client_utils.is_file_obj_with_meta)
+    return data, paths
@@ -0,0 +1,86 @@
+"""
+A script that benchmarks how long events wait in the queue before a worker starts
+processing them, under light load. Can be used to compare the dispatch latency of the
+queue on a given branch vs the main branch. By default, submits 200 jobs one at a time,
+with a small random pause between jobs, to a function that returns immediately. For each
+job, the queue wait is the time between the client submitting the job and the function
+starting on the server. The p50 / p99 / max queue wait are printed in milliseconds.
+
+Navigate to the root directory of the gradio repo and run:
+>> python scripts/benchmark_queue_wait.py
+
+You can specify the number of jobs to run with the -n parameter:
+>> python scripts/benchmark_queue_wait.py -n 1000
+
+The results are printed to the console, but you can specify a path to save the results
+to with the -o parameter:
+>> python scripts/benchmark_queue_wait.py -n 1000 -o results.json
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+from gradio_client import Client
+
+import gradio as gr
+
+
+def started_at(_text):
+    return time.time()
+
+
+with gr.Blocks() as demo:
+    input_txt = gr.Text()
+    output_num = gr.Number(precision=None)
+    input_txt.submit(started_at, input_txt, output_num, api_name="started_at")
+demo.queue().launch(prevent_thread_lock=True, quiet=True)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))
+    return values[index]
+
+
+def main(n_jobs=200):
+    client = Client(demo.local_url, verbose=False)
+    # Warm up the connection and the worker before measuring
+    client.predict("warmup", api_name="/started_at")
+
+    waits = []
+    for _ in range(n_jobs):
+        time.sleep(random.uniform(0, 0.05))
+        submitted = time.time()
+        started = client.predict("x", api_name="/started_at")
+        waits.append((started - submitted) * 1000)
+
+    return {
+        "n_jobs": n_jobs,
+        "p50_ms": round(percentile(waits, 50), 2),
+        "p99_ms": round(percentile(waits, 99), 2),
+        "max_ms": round(max(waits), 2),
+        "mean_ms": round(statistics.mean(waits), 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark queue wait times")
+    parser.add_argument(
+        "-n", "--n_jobs", type=int, help="number of jobs", default=200, required=False
+    )
+    parser.add_argument(
+        "-o", "--output", type=str, help="path to write output to", required=False
+    )
+    args = parser.parse_args()
+
+    data = main(n_jobs=args.n_jobs)
+    print(data)
+
+    if args.output:
+        print("Writing results to:", args.output)
+        with open(args.output, "w") as f:
+            json.dump(data, f)
+    demo.close(verbose=False)
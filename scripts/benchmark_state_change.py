@@ -0,0 +1,62 @@
+"""
+A script that benchmarks how long it takes to detect whether an event changed the value of a gr.State,
+which Blocks does before and after every event whose outputs include a State with a .change() listener.
+By default, builds a state of about 50 MB (a chat history of long messages and a list of NumPy embeddings),
+and times fingerprinting it with `utils.deep_hash` and with `utils.state_fingerprint`, which Blocks uses.
+Each function is also checked to detect an in-place change to the state.
+
+Navigate to the root directory of the gradio repo and run:
+>> python scripts/benchmark_state_change.py
+
+You can specify the size of the state in MB, and the number of repetitions, with the -s and -n parameters:
+>> python scripts/benchmark_state_change.py -s 100 -n 10
+"""
+
+import argparse
+import copy
+import time
+
+import numpy as np
+
+from gradio import utils
+
+
+def make_state(size_mb: int):
+    """Returns a state of about `size_mb` MB, half of it text and half of it arrays."""
+    half = size_mb * 1_000_000 // 2
+    message = "lorem ipsum dolor sit amet " * 400
+    history = [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"{i} {message}"}
+        for i in range(half // len(message))
+    ]
+    embeddings = [
+        np.random.rand(16_384).astype(np.float32) for _ in range(half // 65_536)
+    ]
+    return {"history": history, "embeddings": embeddings, "step": 0}
+
+
+def benchmark(name: str, state, repetitions: int, fingerprint):
+    durations = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        before = fingerprint(state)
+        durations.append(time.perf_counter() - start)
+    changed = copy.copy(state)
+    changed["history"] = state["history"] + [{"role": "user", "content": "hi"}]
+    detects_change = fingerprint(changed) != before
+    print(
+        f"{name}: {1e3 * sum(durations) / len(durations):.1f}ms per state, "
+        f"detects change: {detects_change}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark state change detection")
+    parser.add_argument("-s", "--size", type=int, default=50)
+    parser.add_argument("-n", "--repetitions", type=int, default=5)
+    args = parser.parse_args()
+    state = make_state(args.size)
+    benchmark("utils.deep_hash", state, args.repetitions, utils.deep_hash)
+    benchmark(
+        "utils.state_fingerprint", state, args.repetitions, utils.state_fingerprint
+    )
@@ -0,0 +1,79 @@
+"""
+A script that benchmarks how long it takes to compute the diffs that are sent to the browser while a generator
+streams its output. By default, streams 10,000 tokens into the last message of a Chatbot that already holds 200
+messages, and times the diff of every yield, both with `utils.diff` (which compares the whole value every time) and
+with `utils.StreamingDiff` (which Blocks uses to diff streaming outputs). The total time, and the time per token over
+the first and last 1,000 tokens, are printed: if the cost per token does not grow with the length of the response,
+the total cost is linear in it.
+
+Navigate to the root directory of the gradio repo and run:
+>> python scripts/benchmark_streaming_diff.py
+
+You can specify the number of tokens and of messages with the -n and -m parameters:
+>> python scripts/benchmark_streaming_diff.py -n 20000 -m 500
+"""
+
+import argparse
+import time
+
+import gradio as gr
+from gradio import utils
+
+WINDOW = 1000
+
+
+def chatbot_values(num_tokens: int, num_messages: int):
+    """Yields the successive values of a Chatbot, as sent to the browser, as a response is streamed into it."""
+    chatbot = gr.Chatbot(type="messages")
+    history = [
+        {
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"Message {i}: " + "lorem ipsum dolor sit amet " * 20,
+        }
+        for i in range(num_messages)
+    ]
+    history.append({"role": "assistant", "content": ""})
+    for i in range(num_tokens):
+        history[-1]["content"] += f"token{i} "
+        yield chatbot.postprocess(history).model_dump()
+
+
+def benchmark(name: str, num_tokens: int, num_messages: int, make_differ):
+    values = chatbot_values(num_tokens, num_messages)
+    differ = make_differ(next(values))
+    durations = []
+    for value in values:
+        start = time.perf_counter()
+        differ(value)
+        durations.append(time.perf_counter() - start)
+    first = sum(durations[:WINDOW]) / len(durations[:WINDOW])
+    last = sum(durations[-WINDOW:]) / len(durations[-WINDOW:])
+    print(
+        f"{name}: total {sum(durations):.2f}s, "
+        f"first {WINDOW} tokens {1e6 * first:.1f}µs/token, "
+        f"last {WINDOW} tokens {1e6 * last:.1f}µs/token"
+    )
+
+
+def full_diff(value):
+    previous = [value]
+
+    def differ(value):
+        edits = utils.diff(previous[0], value)
+        previous[0] = value
+        return edits
+
+    return differ
+
+
+def streaming_diff(value):
+    return utils.StreamingDiff(value).update
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark streaming diffs")
+    parser.add_argument("-n", "--num_tokens", type=int, default=10_000)
+    parser.add_argument("-m", "--num_messages", type=int, default=200)
+    args = parser.parse_args()
+    benchmark("utils.diff", args.num_tokens, args.num_messages, full_diff)
+    benchmark("utils.StreamingDiff", args.num_tokens, args.num_messages, streaming_diff)
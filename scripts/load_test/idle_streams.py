@@ -0,0 +1,97 @@
+"""
+Opens thousands of /queue/data streams that stay idle while their events are running, and reports how much CPU
+the server uses while nothing is being sent, and how long it takes to deliver a message once there is one.
+
+Navigate to the root directory of the gradio repo and run:
+>> python scripts/load_test/idle_streams.py
+
+You can specify the number of streams and how long they stay idle with the -n and -t parameters:
+>> python scripts/load_test/idle_streams.py -n 5000 -t 10
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+
+import httpx
+
+import gradio as gr
+
+release: asyncio.Event | None = None
+
+
+async def wait_for_release():
+    global release
+    release = release or asyncio.Event()
+    await release.wait()
+    return time.perf_counter()
+
+
+with gr.Blocks() as demo:
+    out = gr.Number()
+    btn = gr.Button()
+    btn.click(wait_for_release, None, out, api_name="wait", concurrency_limit=None)
+
+
+async def open_stream(
+    client: httpx.AsyncClient, started: asyncio.Queue, latencies: list[float]
+):
+    session_hash = uuid.uuid4().hex
+    await client.post(
+        "/gradio_api/queue/join",
+        json={"data": [], "fn_index": 0, "session_hash": session_hash},
+    )
+    async with client.stream(
+        "GET", "/gradio_api/queue/data", params={"session_hash": session_hash}
+    ) as response:
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            message = json.loads(line[5:])
+            if message["msg"] == "process_starts":
+                started.put_nowait(session_hash)
+            elif message["msg"] == "process_completed":
+                latencies.append(time.perf_counter() - message["output"]["data"][0])
+                return
+
+
+async def main(num_streams: int, idle_time: float):
+    _, url, _ = demo.launch(
+        max_threads=num_streams, prevent_thread_lock=True, quiet=True
+    )
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=0)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=None) as client:
+        started: asyncio.Queue = asyncio.Queue()
+        latencies: list[float] = []
+        streams = [
+            asyncio.create_task(open_stream(client, started, latencies))
+            for _ in range(num_streams)
+        ]
+        for _ in range(num_streams):
+            await started.get()
+        print(f"{num_streams} streams are open and idle")
+
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        await asyncio.sleep(idle_time)
+        cpu = (time.process_time() - cpu_start) / (time.perf_counter() - wall_start)
+        print(f"CPU used while idle: {100 * cpu:.1f}% of one core")
+
+        demo._queue.call_in_loop(release.set)  # type: ignore
+        await asyncio.gather(*streams)
+        latencies.sort()
+        print(
+            f"Delivery latency: p50={1000 * statistics.median(latencies):.1f}ms "
+            f"p99={1000 * latencies[int(0.99 * (len(latencies) - 1))]:.1f}ms"
+        )
+    demo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test idle queue streams")
+    parser.add_argument("-n", "--num_streams", type=int, default=2000)
+    parser.add_argument("-t", "--idle_time", type=float, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.num_streams, args.idle_time))
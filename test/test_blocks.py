@@ -6,6 +6,7 @@ import os
 import pathlib
 import random
 import sys
+import threading
 import time
 import uuid
 import warnings
@@ -13,18 +14,19 @@ from concurrent.futures import wait
 from contextlib import contextmanager
 from functools import partial
 from string import capwords
-from unittest.mock import mock_open, patch
+from unittest.mock import ANY, MagicMock, mock_open, patch
 
 import gradio_client as grc
 import numpy as np
 import pytest
+from anyio import CapacityLimiter
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from gradio_client import Client, media_data
 from PIL import Image
 
 import gradio as gr
-from gradio import blocks, helpers
+from gradio import blocks, helpers, utils
 from gradio.data_classes import GradioModel, GradioRootModel
 from gradio.events import SelectData
 from gradio.exceptions import DuplicateBlockError
@@ -143,6 +145,31 @@ class TestBlocksMethods:
             assert difference >= 0.01
             assert result
 
+    @pytest.mark.asyncio
+    async def test_changed_state_ids(self):
+        from gradio.state_holder import SessionState
+
+        with gr.Blocks() as demo:
+            tracked = gr.State([np.zeros(3)])
+            untracked = gr.State([])
+            number = gr.Number()
+            tracked.change(lambda x: x, tracked, number)
+            untracked.change(lambda x: x, untracked, number)
+            gr.Button().click(lambda x: x, tracked, tracked)
+
+            def increment(x):
+                x[0] += 1
+                return x
+
+            gr.Button().click(increment, tracked, tracked)
+
+        assert demo.state_ids_with_change_listeners == {tracked._id, untracked._id}
+        state = SessionState(demo)
+        result = await demo.process_api(block_fn=2, inputs=[[np.zeros(3)]], state=state)
+        assert result["changed_state_ids"] == []
+        result = await demo.process_api(block_fn=3, inputs=[[np.zeros(3)]], state=state)
+        assert result["changed_state_ids"] == [tracked._id]
+
     @patch("gradio.analytics._do_analytics_request")
     def test_initiated_analytics(self, mock_anlaytics, monkeypatch):
         monkeypatch.setenv("GRADIO_ANALYTICS_ENABLED", "True")
@@ -650,6 +677,86 @@ class TestBlocksPostprocessing:
             "value": media_data.BASE64_IMAGE,
         }
 
+    @pytest.mark.asyncio
+    async def test_cached_results_skip_fn_and_postprocessing(self):
+        calls = []
+
+        def infer(x):
+            calls.append(x)
+            return x[::-1]
+
+        with gr.Blocks() as demo:
+            prompt = gr.Textbox()
+            output = gr.Textbox()
+            prompt.submit(infer, prompt, output, cache=True)
+
+        with patch.object(
+            demo, "postprocess_data", wraps=demo.postprocess_data
+        ) as postprocess:
+            first = await demo.process_api(0, ["abc"], state=None)
+            second = await demo.process_api(0, ["abc"], state=None)
+            other = await demo.process_api(0, ["xyz"], state=None)
+        assert first["data"] == second["data"] == ["cba"]
+        assert other["data"] == ["zyx"]
+        assert calls == ["abc", "xyz"]
+        assert postprocess.call_count == 2
+        assert demo.fns[0].cache.get_metrics()["hits"] == 1
+
+    def test_cache_not_supported_for_generators_or_state(self):
+        def gen(x):
+            yield x
+
+        def greet(x, request: gr.Request):
+            return x
+
+        def select(x, evt: gr.SelectData):
+            return x
+
+        with gr.Blocks():
+            text = gr.Textbox()
+            state = gr.State()
+            with pytest.raises(ValueError):
+                text.submit(gen, text, text, cache=True)
+            with pytest.raises(ValueError):
+                text.submit(lambda x, s: x, [text, state], text, cache=True)
+            with pytest.raises(ValueError):
+                text.submit(greet, text, text, cache=True)
+            with pytest.raises(ValueError):
+                text.select(select, text, text, cache=True)
+
+    @pytest.mark.asyncio
+    async def test_dedicated_thread_pool_does_not_starve_other_listeners(self):
+        release = threading.Event()
+
+        def slow(x):
+            release.wait(5)
+            return x
+
+        with gr.Blocks() as demo:
+            text = gr.Textbox()
+            text.submit(slow, text, text, max_threads=1)
+            text.change(lambda x: x, text, text)
+        demo.thread_pool = utils.ThreadPool(CapacityLimiter(1))
+
+        slow_calls = []
+        for _ in range(2):
+            slow_calls.append(
+                asyncio.create_task(demo.process_api(0, ["a"], state=None))
+            )
+            await asyncio.sleep(0.1)
+        output = await asyncio.wait_for(demo.process_api(1, ["b"], state=None), 2)
+        assert output["data"] == ["b"]
+
+        metrics = demo.get_thread_pool_metrics()
+        assert metrics["default"]["calls"] == 1
+        slow_metrics = metrics[demo.fns[0].concurrency_id]
+        assert slow_metrics["total_threads"] == 1
+        assert slow_metrics["busy_threads"] == 1
+        assert slow_metrics["waiting_calls"] == 1
+        assert slow_metrics["saturated_calls"] == 1
+        release.set()
+        await asyncio.gather(*slow_calls)
+
     @pytest.mark.asyncio
     async def test_blocks_update_interactive(
         self,
@@ -916,6 +1023,23 @@ class TestStateHolder:
             client.predict(api_name="/set_multiselect")
             assert client.predict("Choice 1", api_name="/predict") == ["Choice 1"]
 
+    @pytest.mark.asyncio
+    async def test_session_config_only_stores_updated_components(self):
+        from gradio.state_holder import SessionState
+
+        with gr.Blocks() as demo:
+            dropdown = gr.Dropdown(choices=["Choice 1"])
+            textbox = gr.Textbox()
+            gr.Button().click(lambda: gr.Dropdown(multiselect=True), None, dropdown)
+
+        state = SessionState(demo)
+        assert state.blocks_config.blocks[textbox._id] is textbox
+        await demo.process_api(block_fn=0, inputs=[], state=state)
+        assert state.blocks_config.blocks[dropdown._id].multiselect
+        assert not demo.blocks[dropdown._id].multiselect
+        assert list(state.blocks_config.blocks.changes) == [dropdown._id]  # type: ignore
+        assert list(state.blocks_config.blocks) == list(demo.blocks)
+
 
 class TestCallFunction:
     @pytest.mark.asyncio
@@ -1138,21 +1262,34 @@ class TestBatchProcessing:
         assert output == ["Abu", True]
 
     @pytest.mark.asyncio
-    async def test_invalid_batch_generator(self):
-        with pytest.raises(ValueError):
+    async def test_batch_generator(self):
+        def batch_fn(x):
+            yield ([f"Hello {word}" for word in x],)
+            yield (["Hello Adam!", gr.FINISHED],)
 
-            def batch_fn(x):
-                results = []
-                for word in x:
-                    results.append(f"Hello {word}")
-                    yield (results,)
+        with gr.Blocks() as demo:
+            text = gr.Textbox()
+            btn = gr.Button()
+            btn.click(batch_fn, inputs=text, outputs=text, batch=True)
 
-            with gr.Blocks() as demo:
-                text = gr.Textbox()
-                btn = gr.Button()
-                btn.click(batch_fn, inputs=text, outputs=text, batch=True)
+        inputs = [["Adam", "Yahya"]]
+        output = await demo.process_api(0, inputs, state=None, session_hash="s")
+        assert output["is_generating"]
+        assert output["data"] == [("Hello Adam", "Hello Yahya")]
+        assert output["finished_items"] == [False, False]
 
-            await demo.process_api(0, [["Adam", "Yahya"]], state=None)
+        output = await demo.process_api(
+            0, inputs, state=None, session_hash="s", iterator=output["iterator"]
+        )
+        assert output["data"] == [([("append", [], "!")], "Hello Yahya")]
+        assert output["finished_items"] == [False, True]
+
+        output = await demo.process_api(
+            0, inputs, state=None, session_hash="s", iterator=output["iterator"]
+        )
+        assert not output["is_generating"]
+        assert output["data"] == [("Hello Adam!", None)]
+        assert output["finished_items"] == [True, True]
 
     @pytest.mark.asyncio
     async def test_exceeds_max_batch_size(self):
@@ -1846,6 +1983,117 @@ def test_time_to_live_and_delete_callback_for_state(capsys, monkeypatch):
         demo.close()
 
 
+@pytest.mark.asyncio
+async def test_state_holder_spills_cold_sessions_to_disk():
+    from gradio.state_holder import StateHolder
+
+    with gr.Blocks() as demo:
+        state = gr.State()
+
+    demo.max_state_memory = 1_000_000
+    holder = StateHolder()
+    holder.set_blocks(demo)
+    (await holder.get("a"))[state._id] = np.zeros(100_000)
+    (await holder.get("b"))[state._id] = [np.ones(100_000), lambda: None]
+    (await holder.get("c"))[state._id] = np.full(100_000, 2.0)
+    assert holder.get_session_memory()["a"] == {
+        "memory_bytes": 0,
+        "spilled": True,
+        "disk_bytes": pytest.approx(800_000, rel=0.01),
+    }
+    assert holder.get_session_memory()["c"]["memory_bytes"] == pytest.approx(
+        800_000, rel=0.01
+    )
+
+    # The spilled session is loaded back, and the others are spilled, or evicted
+    # if they cannot be pickled, to make room for it
+    assert ((await holder.get("a"))[state._id] == 0).all()
+    assert "b" not in holder
+    assert holder.get_session_memory()["c"]["spilled"]
+    assert holder.nbytes <= 1_000_000
+    assert holder.get_metrics()["spills"] == 2
+    assert holder.get_metrics()["evictions"] == 1
+    assert ((await holder.get("c"))[state._id] == 2).all()
+
+
+def test_state_size_is_only_estimated_if_memory_is_bounded(monkeypatch):
+    from gradio import state_holder
+    from gradio.state_holder import StateHolder
+
+    with gr.Blocks() as demo:
+        state = gr.State()
+    estimate_size = MagicMock(wraps=state_holder.estimate_size)
+    monkeypatch.setattr(state_holder, "estimate_size", estimate_size)
+
+    holder = StateHolder()
+    holder.set_blocks(demo)
+    holder["a"][state._id] = np.zeros(100_000)
+    estimate_size.assert_not_called()
+    assert holder.nbytes == 0
+
+
+@pytest.mark.asyncio
+async def test_state_backend_shares_state_between_processes(tmp_path):
+    from gradio.state_holder import StateHolder
+
+    with gr.Blocks() as demo:
+        count = gr.State(0)
+        gr.Button().click(lambda x: x + 1, count, count)
+
+    demo.state_backend = gr.SQLiteStateBackend(tmp_path / "state.db")
+    # Each StateHolder stands for the state held by a different server process
+    holders = [StateHolder(), StateHolder()]
+    for holder in holders:
+        holder.set_blocks(demo)
+
+    for i in range(4):
+        state = await holders[i % 2].get("session")
+        await demo.process_api(block_fn=0, inputs=[None], state=state)
+        assert state[count._id] == i + 1
+    assert (await holders[0].get("other session"))[count._id] == 0
+
+    # A process does not overwrite the state saved by another process since it loaded it
+    states = [await holder.get("session") for holder in holders]
+    await demo.process_api(block_fn=0, inputs=[None], state=states[0])
+    with pytest.warns(UserWarning, match="saved by another server process"):
+        await demo.process_api(block_fn=0, inputs=[None], state=states[1])
+    assert states[1][count._id] == 5
+    assert (await holders[0].get("session"))[count._id] == 5
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX file permissions")
+def test_sqlite_state_backend_creates_private_file(tmp_path):
+    backend = gr.SQLiteStateBackend(tmp_path / "state.db")
+    backend.save("session", {"count": 1}, 0)
+    for name in ["state.db", "state.db-wal", "state.db-shm"]:
+        assert (tmp_path / name).stat().st_mode & 0o777 == 0o600
+
+
+def test_state_is_saved_while_it_is_changed(tmp_path):
+    from gradio.state_holder import SessionState
+
+    with gr.Blocks() as demo:
+        count = gr.State(0)
+    backend = gr.SQLiteStateBackend(tmp_path / "state.db")
+    save = backend.save
+    calls = []
+
+    def save_while_changed(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise RuntimeError("dictionary changed size during iteration")
+        return save(*args)
+
+    backend.save = save_while_changed  # type: ignore
+    state = SessionState(demo)
+    state.session_hash, state.backend = "session", backend
+    state[count._id] = 1
+    state.save()
+    assert len(calls) == 2
+    assert not state.modified
+    assert backend.load("session", 0) == (state.version, ({count._id: 1}, ANY))
+
+
 def test_post_process_file_blocked(connect):
     dotfile = pathlib.Path(".foo.txt")
     file = pathlib.Path(os.getcwd()) / ".." / "file.txt"
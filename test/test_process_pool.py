@@ -0,0 +1,100 @@
+import os
+
+import numpy as np
+import pytest
+
+import gradio as gr
+from gradio.process_pool import ProcessPool
+
+
+def get_pid(_=None):
+    return os.getpid()
+
+
+def double(array):
+    return array * 2
+
+
+def count(n):
+    for i in range(n):
+        yield i, os.getpid()
+
+
+def fail():
+    raise ValueError("Something went wrong")
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = ProcessPool(max_workers=1, max_calls_per_worker=None)
+    yield pool
+    pool.close()
+
+
+class TestProcessPool:
+    def test_runs_functions_in_worker_processes(self, pool):
+        assert pool.call(get_pid) != os.getpid()
+
+    def test_numpy_arrays_pass_through_shared_memory(self, pool):
+        array = np.arange(100_000, dtype=np.float64)
+        assert array.nbytes >= pool.shared_memory_threshold
+        np.testing.assert_array_equal(pool.call(double, array), array * 2)
+        small = np.arange(3)
+        np.testing.assert_array_equal(pool.call(double, small), small * 2)
+
+    def test_generators_run_in_one_worker(self, pool):
+        values = list(pool.call(count, 3))
+        assert [i for i, _ in values] == [0, 1, 2]
+        assert len({pid for _, pid in values}) == 1
+
+    def test_workers_are_recycled(self):
+        pool = ProcessPool(max_workers=1, max_calls_per_worker=2)
+        try:
+            pids = [pool.call(get_pid) for _ in range(3)]
+        finally:
+            pool.close()
+        assert pids[0] == pids[1]
+        assert pids[1] != pids[2]
+
+    def test_errors_are_raised(self, pool):
+        with pytest.raises(ValueError, match="Something went wrong"):
+            pool.call(fail)
+        assert pool.call(get_pid) != os.getpid()
+
+
+class TestProcessExecutor:
+    @pytest.mark.asyncio
+    async def test_process_api(self):
+        with gr.Blocks() as demo:
+            num = gr.Number()
+            out = gr.Number()
+            num.submit(get_pid, num, out, executor="process")
+            num.change(count, num, [out, gr.Number()], executor="process")
+
+        try:
+            output = await demo.process_api(0, [1], state=None)
+            assert output["data"][0] not in (None, os.getpid())
+
+            output = await demo.process_api(1, [2], state=None)
+            assert output["data"][0] == 0
+            output = await demo.process_api(
+                1, [2], state=None, iterator=output["iterator"]
+            )
+            assert output["data"][0] == 1
+        finally:
+            demo.close()
+
+    def test_async_functions_are_not_supported(self):
+        async def fn(x):
+            return x
+
+        with gr.Blocks():
+            num = gr.Number()
+            with pytest.raises(ValueError):
+                num.submit(fn, num, num, executor="process")
+
+    def test_invalid_executor_is_rejected(self):
+        with gr.Blocks():
+            num = gr.Number()
+            with pytest.raises(ValueError, match="Invalid executor"):
+                num.submit(lambda x: x, num, num, executor="proccess")  # type: ignore
@@ -1,12 +1,39 @@
+import asyncio
 import time
 from concurrent.futures import wait
+from queue import Empty as EmptyQueue
+from types import SimpleNamespace
 
 import gradio_client as grc
 import pytest
 from fastapi.testclient import TestClient
+from gradio_client import utils as client_utils
 
 import gradio as gr
+from gradio import utils
+from gradio.data_classes import PredictBodyInternal
+from gradio.helpers import TrackedIterable
+from gradio.queueing import (
+    MESSAGE_OVERHEAD,
+    SESSION_OVERHEAD,
+    AdaptiveConcurrencyLimit,
+    BatchStats,
+    Event,
+    EventAnalytics,
+    EventQueue,
+    FairScheduling,
+    MessageChannel,
+    ProcessTime,
+    Queue,
+    SessionRegistry,
+    UniqueCounter,
+)
 from gradio.route_utils import API_PREFIX
+from gradio.server_messages import (
+    HeartbeatMessage,
+    ProcessCompletedMessage,
+    ProcessGeneratingMessage,
+)
 
 
 class TestQueueing:
@@ -213,3 +240,784 @@ class TestQueueing:
                     mul_job_2,
                 ]
             )
+
+    def test_batched_generator_streams_to_each_event(self, connect):
+        def stream(words):
+            for i in range(1, max(len(w) for w in words) + 1):
+                yield ([w[:i] if i <= len(w) else gr.FINISHED for w in words],)
+
+        with gr.Blocks() as demo:
+            text = gr.Textbox()
+            text.submit(
+                stream, text, text, batch=True, max_batch_size=3, max_batch_wait=10
+            )
+
+        with connect(demo) as client:
+            jobs = [client.submit(w, fn_index=0) for w in ["ab", "abcd", "abc"]]
+            wait(jobs)
+            assert [job.result() for job in jobs] == ["ab", "abcd", "abc"]
+            assert jobs[0].outputs() == ["a", "ab"]
+            assert jobs[1].outputs() == ["a", "ab", "abc", "abcd"]
+
+    def test_identical_calls_are_coalesced(self, connect):
+        calls = []
+
+        def slow_upper(x):
+            calls.append(x)
+            time.sleep(1)
+            return x.upper()
+
+        with gr.Blocks() as demo:
+            text = gr.Textbox()
+            text.submit(slow_upper, text, text, coalesce=True, concurrency_limit=1)
+
+        with connect(demo) as client:
+            jobs = [client.submit(x, fn_index=0) for x in ["a", "a", "b", "a"]]
+            wait(jobs)
+            assert [job.result() for job in jobs] == ["A", "A", "B", "A"]
+        assert sorted(calls) == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_processing_loop_sleeps_until_woken(self):
+        with gr.Blocks() as demo:
+            gr.Textbox()
+        demo.queue()
+        queue = demo._queue
+        queue.active_jobs = [None]
+        queue._loop = asyncio.get_running_loop()
+
+        processing = asyncio.create_task(queue.start_processing())
+        await asyncio.sleep(0.1)
+        assert not processing.done()
+        assert not queue.processing_wakeup.is_set()
+
+        queue.close()
+        await asyncio.wait_for(processing, timeout=1)
+        assert queue.stopped
+
+
+class TestEventQueue:
+    def test_pop_batch_and_removal(self):
+        with gr.Blocks() as demo:
+            text = gr.Textbox()
+            text.submit(lambda x: x, text, text, batch=True, max_batch_size=3)
+            text.change(lambda x: x, text, text)
+        batched_fn, other_fn = demo.fns[0], demo.fns[1]
+
+        event_queue = EventQueue("id", None)
+        events = [
+            Event("a", batched_fn, None, None),  # type: ignore
+            Event("b", other_fn, None, None),  # type: ignore
+            Event("b", batched_fn, None, None),  # type: ignore
+            Event("c", batched_fn, None, None),  # type: ignore
+            Event("c", batched_fn, None, None),  # type: ignore
+            Event("b", other_fn, None, None),  # type: ignore
+        ]
+        for event in events:
+            event_queue.append(event)
+        assert len(event_queue) == 6
+
+        assert event_queue.pop_batch() == [events[0], events[2], events[3]]
+        assert list(event_queue) == [events[1], events[4], events[5]]
+
+        assert event_queue.remove_session("b") == [events[1], events[5]]
+        assert not event_queue.remove(events[1])
+        assert list(event_queue) == [events[4]]
+        assert event_queue.pop_batch() == [events[4]]
+        assert len(event_queue) == 0
+        assert not event_queue.events_per_fn
+        assert not event_queue.events_per_session
+
+
+class TestMessageChannel:
+    @pytest.mark.asyncio
+    async def test_messages_put_from_threads_wake_up_waiting_streams(self):
+        channel = MessageChannel()
+        getter = asyncio.create_task(channel.get(timeout=5))
+        await asyncio.sleep(0.01)
+        start = time.perf_counter()
+        await asyncio.to_thread(channel.put_nowait, HeartbeatMessage())
+        assert isinstance(await getter, HeartbeatMessage)
+        assert time.perf_counter() - start < 0.5
+        assert not channel.waiters
+
+    @pytest.mark.asyncio
+    async def test_get_returns_none_on_timeout_or_wake(self):
+        channel = MessageChannel()
+        assert await channel.get(timeout=0.01) is None
+        getter = asyncio.create_task(channel.get())
+        await asyncio.sleep(0.01)
+        channel.wake()
+        assert await getter is None
+        channel.put_nowait(HeartbeatMessage())
+        assert channel.qsize() == 1
+        assert isinstance(channel.get_nowait(), HeartbeatMessage)
+        with pytest.raises(EmptyQueue):
+            channel.get_nowait()
+
+    @pytest.mark.asyncio
+    async def test_thousands_of_idle_streams(self):
+        channels = [MessageChannel() for _ in range(5000)]
+        getters = [asyncio.create_task(channel.get(timeout=30)) for channel in channels]
+        await asyncio.sleep(0.1)
+        # Idle streams wait without polling, so the event loop has nothing to run
+        loop = asyncio.get_running_loop()
+        assert len(loop._ready) == 0  # type: ignore
+        for channel in channels:
+            channel.put_nowait(HeartbeatMessage())
+        results = await asyncio.wait_for(asyncio.gather(*getters), 5)
+        assert all(isinstance(result, HeartbeatMessage) for result in results)
+
+
+class TestSessionRegistry:
+    def test_memory_accounts_for_pending_messages(self):
+        registry = SessionRegistry(max_memory=1024 * 1024)
+        registry["a"] = MessageChannel()
+        empty = registry.nbytes
+        message = ProcessCompletedMessage(output={"data": ["x" * 1000]}, success=True)
+        registry["a"].put_nowait(message)
+        assert registry.nbytes > empty + 1000
+        registry["a"].get_nowait()
+        assert registry.nbytes == empty
+        del registry["a"]
+        assert registry.nbytes == 0
+
+        # Outputs are not serialized to measure them if the memory is not bounded
+        unbounded = SessionRegistry()
+        unbounded["a"] = MessageChannel()
+        unbounded["a"].put_nowait(message)
+        assert unbounded.nbytes == SESSION_OVERHEAD + MESSAGE_OVERHEAD
+
+    def test_only_idle_sessions_are_evicted(self):
+        active = {"b"}
+        registry = SessionRegistry(
+            max_memory=3 * SESSION_OVERHEAD, is_active=active.__contains__
+        )
+        for session_hash in "abc":
+            registry[session_hash] = MessageChannel()
+        registry["c"].streams = 1
+        registry["d"] = MessageChannel()
+        assert list(registry) == ["b", "c", "d"]
+        registry["e"] = MessageChannel()
+        assert list(registry) == ["b", "c", "e"]
+
+        # Sessions in use are kept even if the registry stays over its budget
+        active.add("e")
+        registry["f"] = MessageChannel()
+        assert list(registry) == ["b", "c", "e", "f"]
+        assert registry.get_metrics() == {
+            "sessions": 4,
+            "memory_bytes": 4 * SESSION_OVERHEAD,
+            "max_memory": 3 * SESSION_OVERHEAD,
+            "evictions": 2,
+        }
+
+
+class TestBackpressure:
+    @staticmethod
+    def send_output(queue, event, value, previous=None):
+        data = [value] if previous is None else [utils.diff(previous, value)]
+        queue.send_message(
+            event,
+            ProcessGeneratingMessage(output={"data": data}, success=True),
+        )
+
+    @pytest.mark.parametrize("backpressure", ["buffer", "latest"])
+    def test_unread_outputs_are_merged(self, backpressure):
+        with gr.Blocks() as demo:
+            text = gr.Textbox()
+            text.submit(lambda x: x, text, text, backpressure=backpressure)
+        queue = TestScheduling.make_queue("fifo", demo)
+        event = Event("session", demo.fns[0], None, None)  # type: ignore
+        messages = queue.pending_messages_per_session["session"] = MessageChannel()
+
+        values = [
+            "He",
+            "Hello",
+            "Hello world",
+            "Hello world again",
+            "Hello world again!",
+        ]
+        self.send_output(queue, event, values[0])
+        self.send_output(queue, event, values[1], values[0])
+        self.send_output(queue, event, values[2], values[1])
+        received = [messages.get_nowait() for _ in range(messages.qsize())]
+        self.send_output(queue, event, values[3], values[2])
+        self.send_output(queue, event, values[4], values[3])
+        received += [messages.get_nowait() for _ in range(messages.qsize())]
+
+        # The client receives the same values either way, but fewer messages
+        value = received[0].output["data"][0]
+        for message in received[1:]:
+            value = client_utils.apply_diff(value, message.output["data"][0])
+        assert value == values[-1]
+        if backpressure == "latest":
+            assert len(received) == 2
+            assert received[0].output["data"] == ["Hello world"]
+            assert received[1].output["data"] == [[("append", [], " again!")]]
+            assert queue.get_session_metrics()["coalesced_messages"] == 3
+        else:
+            assert len(received) == 5
+            assert queue.get_session_metrics()["coalesced_messages"] == 0
+
+    def test_latest_full_value_wins(self):
+        output = MessageChannel.merge_outputs(
+            {"data": ["a", 1], "render_config": {"id": 1}},
+            False,
+            {"data": ["b", 2], "render_config": None},
+            False,
+        )
+        assert output == {"data": ["b", 2], "render_config": None}
+        output = MessageChannel.merge_outputs(
+            {"data": [[("append", [0], "b")]], "render_config": {"id": 1}},
+            True,
+            {"data": [[("replace", [1], "c")]], "render_config": None},
+            True,
+        )
+        assert output == {
+            "data": [[("append", [0], "b"), ("replace", [1], "c")]],
+            "render_config": {"id": 1},
+        }
+
+
+class TestScheduling:
+    @staticmethod
+    def make_queue(scheduling, demo):
+        return Queue(
+            live_updates=True,
+            concurrency_count=1,
+            update_intervals=1,
+            max_size=None,
+            blocks=demo,
+            default_concurrency_limit=None,
+            scheduling=scheduling,
+        )
+
+    @staticmethod
+    def push(queue, fn, session_hash, username=None):
+        queue.create_event_queue_for_fn(fn)
+        event = Event(session_hash, fn, None, username)  # type: ignore
+        queue.event_queue_per_concurrency_id[fn.concurrency_id].append(event)
+        queue.queue_size += 1
+        return event
+
+    @staticmethod
+    def dispatch_all(queue):
+        order = []
+        while (batch := queue.get_events()) is not None:
+            order.extend(batch[0])
+            queue.scheduling.on_finish(batch[0])
+        return order
+
+    @pytest.fixture
+    def fns(self):
+        with gr.Blocks() as demo:
+            text = gr.Textbox()
+            text.submit(lambda x: x, text, text, concurrency_id="a")
+            text.change(lambda x: x, text, text, concurrency_id="b")
+            text.blur(lambda x: x, text, text, concurrency_id="b", priority=1)
+        return demo, demo.fns[0], demo.fns[1], demo.fns[2]
+
+    def test_invalid_scheduling(self, fns):
+        with pytest.raises(ValueError):
+            self.make_queue("lifo", fns[0])
+
+    def test_fifo_with_priority(self, fns):
+        demo, fn_a, fn_b, fn_b_urgent = fns
+        queue = self.make_queue("fifo", demo)
+        events = [
+            self.push(queue, fn_a, "1"),
+            self.push(queue, fn_b, "2"),
+            self.push(queue, fn_a, "3"),
+            self.push(queue, fn_b_urgent, "4"),
+        ]
+        assert self.dispatch_all(queue) == [events[3], events[0], events[1], events[2]]
+        assert len(queue) == 0
+
+    def test_weighted_fair(self, fns):
+        demo, fn_a, fn_b, _ = fns
+        queue = self.make_queue(FairScheduling(weights={"a": 2}), demo)
+        events_a = [self.push(queue, fn_a, str(i)) for i in range(6)]
+        events_b = [self.push(queue, fn_b, str(i)) for i in range(3)]
+        order = self.dispatch_all(queue)
+        assert [event in events_a for event in order[:6]].count(True) == 4
+        assert [event in events_b for event in order[:6]].count(True) == 2
+
+    def test_user_fair(self, fns):
+        demo, fn_a, _, _ = fns
+        queue = self.make_queue("user_fair", demo)
+        flood = [self.push(queue, fn_a, "flood") for _ in range(3)]
+        alice = self.push(queue, fn_a, "1", username="alice")
+        bob = self.push(queue, fn_a, "2", username="bob")
+        assert self.dispatch_all(queue) == [flood[0], alice, bob, flood[1], flood[2]]
+
+    def test_user_fair_only_tracks_users_with_pending_events(self, fns):
+        demo, fn_a, _, fn_b_urgent = fns
+        queue = self.make_queue("user_fair", demo)
+        alice = self.push(queue, fn_a, "1", username="alice")
+        bob = self.push(queue, fn_b_urgent, "2", username="bob")
+        carol = self.push(queue, fn_a, "3", username="carol")
+        queue.event_queue_per_concurrency_id["a"].remove(carol)
+        queue.queue_size -= 1
+        assert self.dispatch_all(queue) == [bob, alice]
+        assert queue.scheduling.pending_per_user == {}
+        assert queue.scheduling.rank_per_user == {}
+
+
+class TestDynamicBatching:
+    def test_wait_time_adapts_to_arrival_rate(self):
+        stats = BatchStats()
+        assert stats.wait_time(3, max_wait=0.5, process_time=None) == 0
+        stats.add_arrival(0)
+        assert stats.wait_time(3, max_wait=0.5, process_time=None) == 0
+        for t in [0.1, 0.2, 0.3]:
+            stats.add_arrival(t)
+        assert stats.interarrival_time == pytest.approx(0.1)
+        assert stats.wait_time(3, max_wait=0.5, process_time=None) == pytest.approx(0.3)
+        assert stats.wait_time(3, max_wait=0.5, process_time=0.2) == 0.2
+        assert stats.wait_time(3, max_wait=0.05, process_time=None) == 0
+        stats.add_arrival(100.3, max_interval=1)
+        assert stats.interarrival_time == pytest.approx(0.55)
+
+    def test_batch_is_held_until_full(self):
+        with gr.Blocks() as demo:
+            text = gr.Textbox()
+            text.submit(
+                lambda x: x, text, text, batch=True, max_batch_size=3, max_batch_wait=10
+            )
+        fn = demo.fns[0]
+        queue = TestScheduling.make_queue("fifo", demo)
+        queue.batch_stats_per_fn[fn].interarrival_time = 1
+
+        events = [TestScheduling.push(queue, fn, str(i)) for i in range(2)]
+        assert queue.get_events() is None
+        assert queue.next_batch_deadline == pytest.approx(events[0].created_at + 1)
+
+        events.append(TestScheduling.push(queue, fn, "2"))
+        batch = queue.get_events()
+        assert batch is not None
+        assert batch[0] == events
+        assert queue.next_batch_deadline is None
+        assert queue.get_batch_metrics() == {
+            "lambda": {
+                "batches": 1,
+                "mean_batch_size": 3,
+                "batch_size_counts": {3: 1},
+            }
+        }
+
+    def test_held_batch_only_holds_its_function(self):
+        with gr.Blocks() as demo:
+            text = gr.Textbox()
+            text.submit(
+                lambda x: x,
+                text,
+                text,
+                batch=True,
+                max_batch_size=3,
+                max_batch_wait=10,
+                concurrency_id="group",
+            )
+            text.change(lambda x: x, text, text, concurrency_id="group")
+        batched_fn, fn = demo.fns.values()
+        queue = TestScheduling.make_queue("fifo", demo)
+
+        held = TestScheduling.push(queue, batched_fn, "0")
+        other = TestScheduling.push(queue, fn, "1")
+        # Without any arrival history, the batch is not held
+        assert queue.get_events()[0] == [held]
+
+        queue.batch_stats_per_fn[batched_fn].interarrival_time = 1
+        held = TestScheduling.push(queue, batched_fn, "2")
+        assert queue.get_events()[0] == [other]
+        assert queue.get_events() is None
+        assert queue.next_batch_deadline == pytest.approx(held.created_at + 2)
+
+
+class TestEventAnalytics:
+    def test_recent_events_are_bounded(self):
+        analytics = EventAnalytics(max_events=2)
+        for i in range(5):
+            analytics.add(str(i), "predict", "session", timestamp=60 * i)
+            analytics.set_status(str(i), "processing")
+            analytics.set_process_time(str(i), 0.2)
+            analytics.set_status(str(i), "success")
+        analytics.add("5", "predict", "session", timestamp=300)
+        assert len(analytics) == 3
+        assert [record["time"] for record in analytics.recent_events] == [180, 240]
+        assert analytics.get_summary(0, 300) == {
+            "unique_users": 1,
+            "total_requests": 6,
+            "avg_process_time": pytest.approx(0.2),
+        }
+        assert analytics.get_latency_histogram() == {0.25: 5}
+
+    def test_unique_users_are_counted_in_bounded_memory(self):
+        analytics = EventAnalytics(bucket_size=60)
+        for i in range(5000):
+            analytics.add(str(i), "predict", str(i % 2000), timestamp=i % 120)
+        assert all(
+            len(stats.sessions.registers) == 1 << UniqueCounter.PRECISION
+            for functions in analytics.buckets.values()
+            for stats in functions.values()
+        )
+        assert analytics.get_summary(0, 120)["unique_users"] == pytest.approx(
+            2000, rel=0.1
+        )
+
+        counter = UniqueCounter()
+        for session_hash in ["a", "b", "a"]:
+            counter.add(session_hash)
+        assert len(counter) == 2
+
+    def test_aggregates_per_bucket(self):
+        analytics = EventAnalytics(bucket_size=60, max_buckets=2)
+        analytics.add("a", "predict", "1", timestamp=10)
+        analytics.add("b", "chat", "2", timestamp=70)
+        analytics.add("c", "chat", "3", timestamp=80)
+        analytics.set_status("c", "cancelled")
+        assert analytics.get_status_counts(0, 120, "chat") == [
+            {"time": 60, "function": "chat", "status": "queued", "count": 1},
+            {"time": 60, "function": "chat", "status": "cancelled", "count": 1},
+        ]
+        assert analytics.get_summary(0, 59)["total_requests"] == 1
+
+        analytics.add("d", "predict", "4", timestamp=130)
+        assert sorted(analytics.buckets) == [60, 120]
+        analytics.set_status("a", "success")
+        assert analytics.get_summary(0, 200)["total_requests"] == 3
+
+    def test_old_buckets_are_rolled_up(self):
+        analytics = EventAnalytics(
+            bucket_size=60, max_buckets=2 * 60, rollup_size=3600, rollup_after=3600
+        )
+        analytics.add("a", "predict", "1", timestamp=10)
+        analytics.add("b", "predict", "2", timestamp=70)
+        analytics.set_process_time("b", 0.2)
+        analytics.set_status("b", "success")
+        analytics.add("c", "predict", "1", timestamp=3610)
+        analytics.add("d", "predict", "3", timestamp=7210)
+        assert sorted(analytics.buckets) == [7200]
+        assert sorted(analytics.rolled_up_buckets) == [0, 3600]
+        assert analytics.get_summary(0, 3599) == {
+            "unique_users": 2,
+            "total_requests": 2,
+            "avg_process_time": pytest.approx(0.2),
+        }
+        assert analytics.get_summary(0, 7260)["unique_users"] == 3
+
+        analytics.set_status("a", "success")
+        assert analytics.get_status_counts(0, 3599) == [
+            {"time": 0, "function": "predict", "status": "success", "count": 2}
+        ]
+
+        analytics.add("e", "predict", "4", timestamp=3 * 3600 + 10)
+        assert sorted(analytics.rolled_up_buckets) == [3600, 7200]
+        assert analytics.get_summary(0, 3599)["total_requests"] == 0
+
+
+class TestEstimations:
+    @pytest.mark.asyncio
+    async def test_estimations_are_coalesced_and_sent_on_change(self):
+        with gr.Blocks() as demo:
+            text = gr.Textbox()
+            text.submit(lambda x: x, text, text)
+        fn = demo.fns[0]
+        queue = TestScheduling.make_queue("fifo", demo)
+        queue.estimation_interval = 0.01
+
+        def push(session_hash):
+            event = TestScheduling.push(queue, fn, session_hash)
+            queue.pending_messages_per_session[session_hash] = MessageChannel()
+            queue.schedule_estimations(fn.concurrency_id)
+            return event
+
+        def ranks_sent(events):
+            ranks = []
+            for event in events:
+                messages = queue.pending_messages_per_session[event.session_hash]
+                ranks.append(
+                    [messages.get_nowait().rank for _ in range(messages.qsize())]
+                )
+            return ranks
+
+        events = [push(str(i)) for i in range(3)]
+        await asyncio.sleep(0.05)
+        assert ranks_sent(events) == [[0], [1], [2]]
+
+        events.append(push("3"))
+        await asyncio.sleep(0.05)
+        assert ranks_sent(events) == [[], [], [], [3]]
+
+        queue.get_events()
+        queue.schedule_estimations(fn.concurrency_id)
+        await asyncio.sleep(0.05)
+        assert ranks_sent(events[1:]) == [[0], [1], [2]]
+
+
+class TestProcessTime:
+    def test_estimate_follows_recent_process_times(self):
+        process_time = ProcessTime()
+        for _ in range(50):
+            process_time.add(10)
+        for _ in range(50):
+            process_time.add(1)
+        assert process_time.avg_time == pytest.approx(5.5)
+        assert process_time.estimate == pytest.approx(1, rel=0.1)
+
+    def test_quantiles(self):
+        process_time = ProcessTime()
+        assert process_time.quantile(0.5) is None
+        for i in range(100):
+            process_time.add(20 if i % 10 == 0 else 1)
+        assert process_time.quantile(0.5) == pytest.approx(1, rel=0.1)
+        assert process_time.quantile(0.95) == pytest.approx(20, rel=0.1)
+        assert process_time.quantile(0.99) == pytest.approx(20, rel=0.1)
+
+    def test_process_time_metrics(self):
+        with gr.Blocks() as demo:
+            text = gr.Textbox()
+            text.submit(lambda x: x, text, text, api_name="echo")
+        queue = TestScheduling.make_queue("fifo", demo)
+        queue.process_time_per_fn[demo.fns[0]].add(2)
+        assert queue.get_process_time_metrics() == {
+            "echo": {
+                "count": 1,
+                "avg_time": 2,
+                "recent_avg_time": 2,
+                "p50": pytest.approx(2, rel=0.1),
+                "p95": pytest.approx(2, rel=0.1),
+                "p99": pytest.approx(2, rel=0.1),
+            }
+        }
+
+
+class TestThreadPools:
+    def test_dedicated_thread_pools_cap_concurrency_and_add_workers(self):
+        with gr.Blocks() as demo:
+            text = gr.Textbox()
+            text.submit(lambda x: x, text, text, max_threads=2, concurrency_limit=5)
+            text.change(lambda x: x, text, text, max_threads=3, concurrency_limit=None)
+            text.blur(lambda x: x, text, text, concurrency_limit=None)
+        queue = TestScheduling.make_queue("fifo", demo)
+        for fn in demo.fns.values():
+            queue.create_event_queue_for_fn(fn)
+        limits = [
+            queue.event_queue_per_concurrency_id[fn.concurrency_id].concurrency_limit
+            for fn in demo.fns.values()
+        ]
+        assert limits == [2, 3, None]
+        assert demo.get_dedicated_thread_counts() == {
+            demo.fns[0].concurrency_id: 2,
+            demo.fns[1].concurrency_id: 3,
+        }
+
+
+class TestAdaptiveConcurrency:
+    def test_additive_increase_multiplicative_decrease(self, monkeypatch):
+        limit = AdaptiveConcurrencyLimit(min_limit=1, max_limit=4)
+        # The limit only grows while the group uses all of it
+        assert limit.update(1.0, concurrency=0) == 1
+        assert limit.update(1.0, concurrency=1) == 2
+        # It grows by about one for every `limit` events
+        assert [limit.update(1.0, concurrency=2) for _ in range(3)] == [2, 2, 3]
+        for _ in range(10):
+            limit.update(1.0, concurrency=4)
+        assert limit.concurrency_limit == 4
+
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now)
+        for _ in range(10):
+            limit.update(10.0, concurrency=4)
+        # A single episode of congestion only decreases the limit once
+        assert limit.concurrency_limit == 3
+        monkeypatch.setattr(time, "monotonic", lambda: now + 100)
+        assert limit.update(10.0, concurrency=4) == 2
+
+    def test_auto_concurrency_limit(self):
+        with gr.Blocks() as demo:
+            text = gr.Textbox()
+            text.submit(lambda x: x, text, text, concurrency_limit="auto")
+            text.change(
+                lambda x: x,
+                text,
+                text,
+                concurrency_limit=3,
+                concurrency_id=demo.fns[0].concurrency_id,
+            )
+        queue = TestScheduling.make_queue("fifo", demo)
+        queue.max_thread_count = 10
+        queue.create_event_queue_for_fn(demo.fns[0])
+        event_queue = queue.event_queue_per_concurrency_id[demo.fns[0].concurrency_id]
+        assert event_queue.adaptive_limit is not None
+        assert event_queue.adaptive_limit.max_limit == 10
+        assert event_queue.concurrency_limit == 1
+
+        queue.create_event_queue_for_fn(demo.fns[1])
+        assert event_queue.adaptive_limit.max_limit == 3
+        assert event_queue.concurrency_limit == 1
+        metrics = queue.get_adaptive_concurrency_metrics()
+        assert metrics[demo.fns[0].concurrency_id]["max_limit"] == 3
+
+
+class TestAdmissionControl:
+    @pytest.fixture
+    def fn(self):
+        with gr.Blocks() as demo:
+            text = gr.Textbox()
+            text.submit(lambda x: x, text, text)
+        return demo.fns[0]
+
+    def test_max_events_per_user(self, fn):
+        queue = TestScheduling.make_queue("fifo", None)
+        queue.max_events_per_user = 2
+        queue.create_event_queue_for_fn(fn)
+        events = [Event("session", fn, None, "alice") for _ in range(3)]  # type: ignore
+        assert queue.check_admission(events[0]) is None
+        assert queue.check_admission(events[1]) is None
+        assert "Too many requests." in queue.check_admission(events[2])
+        assert queue.check_admission(Event("session", fn, None, "bob")) is None  # type: ignore
+
+        queue.release_quota(events[0])
+        queue.release_quota(events[0])
+        assert queue.check_admission(events[2]) is None
+        assert queue.events_per_quota_key == {"alice": 2, "bob": 1}
+
+    def test_anonymous_users_are_counted_per_session(self, fn):
+        queue = TestScheduling.make_queue("fifo", None)
+        queue.max_events_per_user = 1
+        queue.create_event_queue_for_fn(fn)
+        # Both requests come through the same proxy
+        request = SimpleNamespace(client=SimpleNamespace(host="10.0.0.1"))
+        assert queue.check_admission(Event("a", fn, request, None)) is None  # type: ignore
+        assert queue.check_admission(Event("b", fn, request, None)) is None  # type: ignore
+        assert "Too many requests." in queue.check_admission(
+            Event("a", fn, request, None)  # type: ignore
+        )
+
+    def test_max_requests_per_minute(self, fn):
+        queue = TestScheduling.make_queue("fifo", None)
+        queue.max_requests_per_minute = 2
+        queue.create_event_queue_for_fn(fn)
+        for _ in range(2):
+            event = Event("session", fn, None, "alice")  # type: ignore
+            assert queue.check_admission(event) is None
+            queue.release_quota(event)
+        event = Event("session", fn, None, "alice")  # type: ignore
+        assert "Too many requests." in queue.check_admission(event)
+
+    @pytest.mark.asyncio
+    async def test_quota_is_not_taken_when_push_fails(self, monkeypatch):
+        with gr.Blocks() as demo:
+            text = gr.Textbox()
+            text.submit(lambda x: x, text, text)
+        queue = TestScheduling.make_queue("fifo", demo)
+        queue.max_events_per_user = 1
+        monkeypatch.setattr(queue, "create_event_queue_for_fn", lambda fn: None)
+        body = PredictBodyInternal(data=["a"], fn_index=0)
+        with pytest.raises(KeyError):
+            await queue.push(body, None, "alice")  # type: ignore
+        assert queue.events_per_quota_key == {}
+
+    def test_max_wait(self, fn):
+        queue = TestScheduling.make_queue("fifo", None)
+        queue.max_wait = 5
+        queue.create_event_queue_for_fn(fn)
+        event_queue = queue.event_queue_per_concurrency_id[fn.concurrency_id]
+        event_queue.concurrency_limit = 2
+        queue.process_time_per_fn[fn].add(2)
+        for i in range(5):
+            TestScheduling.push(queue, fn, str(i))
+        assert queue.predict_wait(event_queue) == pytest.approx(5)
+        assert queue.check_admission(Event("5", fn, None, None)) is None  # type: ignore
+
+        TestScheduling.push(queue, fn, "6")
+        assert "Queue is full." in queue.check_admission(Event("7", fn, None, None))  # type: ignore
+
+
+class TestProgressUpdates:
+    @pytest.mark.asyncio
+    async def test_progress_is_routed_by_event_id_and_coalesced(self):
+        with gr.Blocks() as demo:
+            text = gr.Textbox()
+            text.submit(lambda x: x, text, text)
+        queue = TestScheduling.make_queue("fifo", demo)
+        queue.start()
+        event = Event("session", demo.fns[0], None, None)  # type: ignore
+        queue.pending_messages_per_session["session"] = MessageChannel()
+        queue.active_events[event._id] = event
+
+        def report_progress():
+            for i in range(100):
+                iterable = TrackedIterable(None, i, 100, None, None, None)
+                queue.set_progress(event._id, [iterable])
+
+        await asyncio.to_thread(report_progress)
+        queue.set_progress("unknown", [TrackedIterable(None, 0, 1, None, None, None)])
+        await asyncio.sleep(0.25)
+        messages = queue.pending_messages_per_session["session"]
+        progress = [messages.get_nowait() for _ in range(messages.qsize())]
+        assert 1 <= len(progress) <= 2
+        assert progress[-1].progress_data[0].index == 99
+        queue.close()
+
+
+class TestCoalescing:
+    @staticmethod
+    def make_event(fn, session_hash, data):
+        event = Event(session_hash, fn, None, None)  # type: ignore
+        event.data = PredictBodyInternal(data=data, fn_index=fn._id)
+        return event
+
+    @pytest.mark.asyncio
+    async def test_follower_takes_over_removed_leader(self):
+        with gr.Blocks() as demo:
+            text = gr.Textbox()
+            state = gr.State()
+            text.submit(lambda x: x, text, text, coalesce=True)
+            text.change(lambda x: x, text, text)
+            text.blur(lambda x, s: x, [text, state], text, coalesce=True)
+        fn, not_coalesced_fn, stateful_fn = demo.fns[0], demo.fns[1], demo.fns[2]
+        queue = TestScheduling.make_queue("fifo", demo)
+
+        leader = self.make_event(fn, "1", ["a"])
+        assert queue.coalesce(leader) is None
+        assert queue.coalesce(self.make_event(fn, "2", ["b"])) is None
+        assert queue.coalesce(self.make_event(not_coalesced_fn, "3", ["a"])) is None
+        assert queue.coalesce(self.make_event(stateful_fn, "4", ["a", None])) is None
+        followers = [self.make_event(fn, str(i), ["a"]) for i in range(5, 7)]
+        assert all(queue.coalesce(follower) is leader for follower in followers)
+        assert leader.followers == followers
+
+        queue.create_event_queue_for_fn(fn)
+        event_queue = queue.event_queue_per_concurrency_id[fn.concurrency_id]
+        event_queue.append(leader)
+        queue.queue_size += 1
+        await queue.clean_events(session_hash="5")
+        await queue.clean_events(session_hash="1")
+        assert list(event_queue) == [followers[1]]
+        assert followers[1].leader is None
+        assert queue.followers_per_session == {}
+        assert queue.coalesce(self.make_event(fn, "7", ["a"])) is followers[1]
+
+    def test_calls_that_depend_on_the_user_are_not_coalesced(self):
+        def greet(x, request: gr.Request):
+            return x
+
+        def select(x, evt: gr.SelectData):
+            return x
+
+        with gr.Blocks() as demo:
+            text = gr.Textbox()
+            text.submit(lambda x: x, text, text, coalesce=True)
+            text.change(greet, text, text, coalesce=True)
+            text.select(select, text, text, coalesce=True)
+        fn, request_fn, event_data_fn = demo.fns[0], demo.fns[1], demo.fns[2]
+
+        assert Queue.get_coalesce_key(self.make_event(request_fn, "1", ["a"])) is None
+        assert (
+            Queue.get_coalesce_key(self.make_event(event_data_fn, "1", ["a"])) is None
+        )
+        event, other_event = (self.make_event(fn, str(i), ["a"]) for i in range(2))
+        other_event.data.event_data = {"index": 1}
+        assert Queue.get_coalesce_key(event) != Queue.get_coalesce_key(other_event)
@@ -0,0 +1,120 @@
+import functools
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from gradio.result_cache import ResultCache
+
+
+class TestResultCache:
+    def test_key_depends_on_fn_and_inputs(self):
+        key = ResultCache.get_key("0", ["a", np.array([1, 2])])
+        assert key == ResultCache.get_key("0", ["a", np.array([1, 2])])
+        assert key != ResultCache.get_key("1", ["a", np.array([1, 2])])
+        assert key != ResultCache.get_key("0", ["a", np.array([1, 3])])
+        assert ResultCache.get_key("0", [lambda x: x]) is None
+
+    def test_namespace_depends_on_code(self):
+        def upper(x):
+            return x.upper()
+
+        namespace = ResultCache.get_namespace(upper, 0)
+        assert namespace == ResultCache.get_namespace(functools.partial(upper), 0)
+        assert namespace != ResultCache.get_namespace(upper, 1)
+
+        def upper(x):  # noqa: F811
+            return x.lower()
+
+        assert namespace != ResultCache.get_namespace(upper, 0)
+
+    def test_default_disk_folder_is_per_app_and_cache(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("GRADIO_EXAMPLES_CACHE", str(tmp_path))
+        cache, other = ResultCache(disk=True), ResultCache(disk=True)
+        assert cache.disk_dir.parent == other.disk_dir.parent  # type: ignore
+        assert cache.disk_dir.parent.parent == tmp_path / "results"  # type: ignore
+        assert cache.disk_dir != other.disk_dir
+
+    def test_memory_is_bounded_by_size(self):
+        cache = ResultCache(max_memory=30)
+        cache.set("a", ["x" * 8])
+        cache.set("b", ["y" * 8])
+        assert cache.get("a") == ["x" * 8]
+        cache.set("c", ["z" * 8])
+        assert cache.get("b") is None
+        assert cache.get("a") == ["x" * 8]
+        assert cache.get("c") == ["z" * 8]
+        cache.set("d", ["w" * 100])
+        assert cache.get("d") is None
+
+        metrics = cache.get_metrics()
+        assert metrics["hits"] == metrics["memory_hits"] == 3
+        assert metrics["misses"] == 2
+        assert metrics["evictions"] == 1
+        assert metrics["memory_entries"] == 2
+        assert metrics["memory_bytes"] <= 30
+
+    def test_results_expire(self, monkeypatch):
+        cache = ResultCache(ttl=10)
+        cache.set("a", [1])
+        assert cache.get("a") == [1]
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+        assert cache.get("a") is None
+
+    def test_results_with_deleted_files_are_missing(self, tmp_path):
+        path = tmp_path / "out.txt"
+        path.write_text("hi")
+        file = {"path": str(path), "meta": {"_type": "gradio.FileData"}}
+        cache = ResultCache()
+        cache.set("a", [file])
+        assert cache.get("a") == [file]
+        path.unlink()
+        assert cache.get("a") is None
+
+    def test_disk_tier(self, tmp_path):
+        cache = ResultCache(max_memory=30, disk=tmp_path, max_disk=100)
+        cache.set("a", ["x" * 8])
+        cache.set("b", ["y" * 8])
+        cache.set("c", ["z" * 8])
+        assert (tmp_path / "a.json").exists()
+        # Reading "a" from disk moves it back to memory, and evicts "b" to disk
+        assert cache.get("a") == ["x" * 8]
+        assert cache.get_metrics()["disk_hits"] == 1
+        assert not (tmp_path / "a.json").exists()
+        assert (tmp_path / "b.json").exists()
+
+        # Results on disk are available after a restart
+        restarted = ResultCache(disk=tmp_path)
+        assert restarted.get("b") == ["y" * 8]
+        assert restarted.get("c") is None
+
+        cache.clear()
+        assert not list(tmp_path.iterdir())
+
+    @pytest.mark.asyncio
+    async def test_disk_tier_is_used_off_the_event_loop(self, tmp_path, monkeypatch):
+        cache = ResultCache(max_memory=30, disk=tmp_path, max_disk=100)
+        main_thread = threading.get_ident()
+        disk_threads = []
+        write_to_disk = cache.write_to_disk
+        get_from_disk = cache.get_from_disk
+
+        def record(method):
+            def wrapper(*args):
+                disk_threads.append(threading.get_ident())
+                return method(*args)
+
+            return wrapper
+
+        monkeypatch.setattr(cache, "write_to_disk", record(write_to_disk))
+        monkeypatch.setattr(cache, "get_from_disk", record(get_from_disk))
+        await cache.async_set("a", ["x" * 8])
+        await cache.async_set("b", ["y" * 8])
+        await cache.async_set("c", ["z" * 8])
+        assert await cache.async_get("c") == ["z" * 8]
+        assert await cache.async_get("a") == ["x" * 8]
+        assert await cache.async_get("d") is None
+        assert disk_threads
+        assert main_thread not in disk_threads
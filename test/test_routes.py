@@ -21,6 +21,7 @@ import starlette.routing
 from fastapi import FastAPI, Request
 from fastapi.testclient import TestClient
 from gradio_client import media_data
+from websockets.sync.client import connect as connect_websocket
 
 import gradio as gr
 from gradio import (
@@ -203,6 +204,23 @@ class TestRoutes:
         output = dict(response.json())
         assert output["data"] == [["Hello test", "Hello test2"]]
 
+    def test_predict_route_batched_generator(self):
+        def batch_fn(x):
+            yield ([f"Hello {word}" for word in x],)
+
+        with gr.Blocks() as demo:
+            text = gr.Textbox()
+            btn = gr.Button()
+            btn.click(batch_fn, inputs=text, outputs=text, batch=True, api_name="pred")
+
+        demo.queue(api_open=True)
+        app, _, _ = demo.launch(prevent_thread_lock=True)
+        client = TestClient(app)
+        response = client.post(f"{API_PREFIX}/api/pred/", json={"data": ["test"]})
+        output = dict(response.json())
+        assert output["data"] == ["Hello test"]
+        assert "finished_items" not in output
+
     def test_state(self):
         def predict(input, history):
             if history is None:
@@ -775,6 +793,109 @@ class TestQueueRoutes:
 
         assert io._queue.server_app == io.server_app
 
+    def test_queue_websocket(self, capsys):
+        with gr.Blocks() as demo:
+            inp = gr.Textbox()
+            out = gr.Textbox()
+            inp.submit(lambda x: x[::-1], inp, out)
+            demo.unload(lambda: print("UNLOADED"))
+        _, url, _ = demo.launch(prevent_thread_lock=True)
+        ws_url = url.replace("http", "ws", 1) + "gradio_api/queue/ws?session_hash=ws"
+        try:
+            with connect_websocket(ws_url) as websocket:
+                websocket.send(
+                    json.dumps({"type": "join", "id": 1, "body": {"data": ["abc"]}})
+                )
+                message = json.loads(websocket.recv())
+                assert message["msg"] == "join_failed"
+                assert message["id"] == 1
+
+                for i in range(2):
+                    websocket.send(
+                        json.dumps(
+                            {
+                                "type": "join",
+                                "id": i,
+                                "body": {"data": ["abc"], "fn_index": 0},
+                            }
+                        )
+                    )
+                event_ids = set()
+                completed = []
+                while len(completed) < 2:
+                    message = json.loads(websocket.recv())
+                    if message["msg"] == "joined":
+                        event_ids.add(message["event_id"])
+                    else:
+                        # The reply to a join comes before the messages of its event
+                        assert message["event_id"] in event_ids
+                    if message["msg"] == "process_completed":
+                        completed.append(message["output"]["data"])
+                assert completed == [["cba"], ["cba"]]
+            # The session is closed with the connection
+            time.sleep(0.5)
+            assert "UNLOADED" in capsys.readouterr().out
+            assert "ws" not in demo._queue.pending_messages_per_session
+        finally:
+            demo.close()
+
+    def test_queue_websocket_rejects_invalid_frames(self):
+        msgpack = pytest.importorskip("msgpack")
+        with gr.Blocks() as demo:
+            inp = gr.Textbox()
+            out = gr.Textbox()
+            inp.submit(lambda x: x[::-1], inp, out)
+        _, url, _ = demo.launch(prevent_thread_lock=True, max_file_size=10)
+        ws_url = url.replace("http", "ws", 1) + "gradio_api/queue/ws?session_hash=ws"
+        try:
+            with connect_websocket(ws_url) as websocket:
+                # Inline files are checked against the maximum file size
+                file = {"path": "a.txt", "meta": {"_type": "gradio.FileData"}}
+                websocket.send(
+                    msgpack.packb(
+                        {
+                            "type": "join",
+                            "id": 1,
+                            "body": {
+                                "data": [{**file, "bytes": b"x" * 100}],
+                                "fn_index": 0,
+                            },
+                        }
+                    )
+                )
+                message = json.loads(websocket.recv())
+                assert message["msg"] == "join_failed"
+                assert message["id"] == 1
+
+                for frame in [
+                    "[1]",
+                    "{",
+                    json.dumps({"type": "cancel", "id": 1, "body": {}}),
+                    b"\xc1",
+                ]:
+                    websocket.send(frame)
+                    message = json.loads(websocket.recv())
+                    assert message["msg"] == "frame_failed"
+                    assert message["status_code"] == 422
+
+                # The connection and the session are still usable
+                websocket.send(
+                    json.dumps(
+                        {
+                            "type": "join",
+                            "id": 2,
+                            "body": {"data": ["ab"], "fn_index": 0},
+                        }
+                    )
+                )
+                while (message := json.loads(websocket.recv()))[
+                    "msg"
+                ] != "process_completed":
+                    pass
+                assert message["output"]["data"] == ["ba"]
+        finally:
+            demo.close()
+
 
 class TestDevMode:
     def test_mount_gradio_app_set_dev_mode_false(self):
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import copy
 import json
 import os
 import sys
@@ -17,7 +18,9 @@ from hypothesis import strategies as st
 from gradio import EventData, Request
 from gradio.external_utils import format_ner_list
 from gradio.utils import (
+    CopyOnWriteDict,
     FileSize,
+    StreamingDiff,
     UnhashableKeyDict,
     _parse_file_size,
     abspath,
@@ -40,6 +43,7 @@ from gradio.utils import (
     sagemaker_check,
     sanitize_list_for_csv,
     sanitize_value_for_csv,
+    state_fingerprint,
     tex2svg,
     validate_url,
 )
@@ -523,6 +527,49 @@ def test_diff(old, new, expected_diff):
     assert diff(old, new) == expected_diff
 
 
+def test_streaming_diff():
+    values = [
+        [{"role": "user", "content": "Hi"}],
+        [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": ""}],
+        [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "He"}],
+        [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello"}],
+        [{"role": "user", "content": "Hey"}, {"role": "assistant", "content": "Hello"}],
+        [{"role": "user", "content": "Hey"}],
+        {"role": "user", "content": "Hey"},
+        {"role": "user", "content": "Hey", "metadata": None},
+    ]
+    streaming_diff = StreamingDiff(values[0])
+    for old, new in zip(values, values[1:], strict=False):
+        assert streaming_diff.update(new) == diff(old, new)
+        assert streaming_diff.value is new
+
+
+def test_state_fingerprint():
+    array = np.arange(100_000, dtype=np.float64)
+    value = {"history": [{"role": "user", "content": "Hi"}], "array": array}
+    fingerprint = state_fingerprint(value)
+    assert state_fingerprint(value) == fingerprint
+
+    value["history"].append({"role": "assistant", "content": "Hello"})
+    assert state_fingerprint(value) != fingerprint
+    fingerprint = state_fingerprint(value)
+
+    array[0] = -1
+    assert state_fingerprint(value) != fingerprint
+    fingerprint = state_fingerprint(value)
+
+    value["array"] = array.copy()
+    assert state_fingerprint(value) != fingerprint
+
+    assert state_fingerprint([1, 2]) != state_fingerprint((1, 2))
+    assert state_fingerprint({1, 2}) == state_fingerprint({2, 1})
+    # hash(-1) == hash(-2), so builtin hashes cannot tell these apart
+    assert state_fingerprint(-1) != state_fingerprint(-2)
+    assert state_fingerprint([-1]) != state_fingerprint([-2])
+    assert state_fingerprint({"a": -1}) != state_fingerprint({"a": -2})
+    assert state_fingerprint(["ab", "c"]) != state_fingerprint(["a", "bc"])
+
+
 class TestFunctionParams:
     def test_regular_function(self):
         def func(a, b=10, c="default", d=None):
@@ -670,6 +717,35 @@ class TestUnhashableKeyDict:
             d["nonexistent"]
 
 
+class TestCopyOnWriteDict:
+    def test_reads_through_and_writes_to_copy(self):
+        base = {1: "a", 2: "b", 3: "c"}
+        d = CopyOnWriteDict(base)
+        d[2] = "B"
+        d[4] = "d"
+        del d[3]
+        assert dict(d) == {1: "a", 2: "B", 4: "d"}
+        assert list(d) == [1, 2, 4]
+        assert len(d) == 3
+        assert 3 not in d
+        assert base == {1: "a", 2: "b", 3: "c"}
+        with pytest.raises(KeyError):
+            d[3]
+        with pytest.raises(KeyError):
+            del d[3]
+        d[3] = "C"
+        assert d[3] == "C"
+
+    def test_copies_are_independent(self):
+        d = CopyOnWriteDict({1: "a"})
+        d[2] = "b"
+        d2 = copy.copy(d)
+        d2[1] = "A"
+        del d2[2]
+        assert dict(d) == {1: "a", 2: "b"}
+        assert dict(d2) == {1: "A"}
+
+
 class TestSafeDeepCopy:
     def test_safe_deepcopy_dict(self):
         original = {"key1": [1, 2, {"nested_key": "value"}], "key2": "simple_string"}
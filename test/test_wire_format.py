@@ -0,0 +1,122 @@
+from pathlib import Path
+
+import httpx
+import pytest
+from gradio_client import Client
+
+import gradio as gr
+from gradio import wire_format
+
+
+def make_file(directory: Path, name: str, size: int) -> str:
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / name
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+class TestInlineFiles:
+    def test_small_files_in_cache_are_inlined(self, tmp_path):
+        cache = tmp_path / "cache"
+        small = make_file(cache, "small.txt", 10)
+        large = make_file(cache, "large.txt", 100)
+        outside = make_file(tmp_path / "elsewhere", "outside.txt", 10)
+        data = [
+            {"path": small, "meta": {"_type": "gradio.FileData"}},
+            {"path": large, "meta": {"_type": "gradio.FileData"}},
+            {"path": outside, "meta": {"_type": "gradio.FileData"}},
+            "not a file",
+        ]
+
+        inlined = wire_format.inline_files(data, str(cache), max_size=50)
+
+        assert inlined[0]["bytes"] == b"x" * 10
+        assert "bytes" not in inlined[1]
+        assert "bytes" not in inlined[2]
+        assert inlined[3] == "not a file"
+
+    def test_inline_files_are_saved_as_uploads(self, tmp_path):
+        data = {
+            "data": [
+                {
+                    "path": "cat.png",
+                    "orig_name": "cat.png",
+                    "bytes": b"meow",
+                    "meta": {"_type": "gradio.FileData"},
+                }
+            ]
+        }
+
+        data, paths = wire_format.save_inline_files(data, str(tmp_path))
+
+        file = data["data"][0]
+        assert "bytes" not in file
+        assert paths == [file["path"]]
+        assert Path(file["path"]).read_bytes() == b"meow"
+        assert Path(file["path"]).name == "cat.png"
+        assert file["size"] == 4
+
+        with pytest.raises(ValueError):
+            wire_format.save_inline_files(
+                {
+                    "path": "a.txt",
+                    "bytes": b"1234",
+                    "meta": {"_type": "gradio.FileData"},
+                },
+                str(tmp_path),
+                max_file_size=2,
+            )
+
+
+class TestMsgpack:
+    def test_queue_data_sends_files_inline(self, tmp_path):
+        msgpack = pytest.importorskip("msgpack")
+
+        def write(text):
+            path = tmp_path / "out.txt"
+            path.write_text(text)
+            return str(path)
+
+        with gr.Blocks() as demo:
+            inp = gr.Textbox()
+            out = gr.File()
+            inp.submit(write, inp, out)
+
+        _, url, _ = demo.launch(prevent_thread_lock=True, _frontend=False)
+        try:
+            session_hash = "msgpack"
+            httpx.post(
+                f"{url}gradio_api/queue/join",
+                json={"data": ["hi"], "fn_index": 0, "session_hash": session_hash},
+            )
+            with httpx.stream(
+                "GET",
+                f"{url}gradio_api/queue/data",
+                params={"session_hash": session_hash},
+                headers={
+                    "Accept": f"{wire_format.MSGPACK_MEDIA_TYPE}, text/event-stream"
+                },
+            ) as response:
+                assert response.headers["content-type"].startswith(
+                    wire_format.MSGPACK_MEDIA_TYPE
+                )
+                unpacker = msgpack.Unpacker()
+                for chunk in response.iter_bytes():
+                    unpacker.feed(chunk)
+                messages = list(unpacker)
+        finally:
+            demo.close()
+        completed = next(m for m in messages if m["msg"] == "process_completed")
+        assert completed["output"]["data"][0]["bytes"] == b"hi"
+
+    def test_client(self, connect):
+        pytest.importorskip("msgpack")
+
+        with gr.Blocks() as demo:
+            inp = gr.Textbox()
+            out = gr.Textbox()
+            inp.submit(lambda x: x[::-1], inp, out, api_name="reverse")
+
+        with connect(demo) as client:
+            msgpack_client = Client(client.src, wire_format="msgpack")
+            assert msgpack_client.predict("hello", api_name="/reverse") == "olleh"